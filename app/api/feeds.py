@@ -0,0 +1,81 @@
+"""Import feed management endpoints."""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List
+from app.database import get_db
+from app.models import ImportFeed, FeedSku
+from app.schemas import FeedCreate, FeedUpdate, FeedResponse
+
+router = APIRouter(prefix="/api/feeds", tags=["feeds"])
+
+
+@router.get("", response_model=List[FeedResponse])
+def list_feeds(db: Session = Depends(get_db)):
+    """List all import feeds."""
+    feeds = db.query(ImportFeed).order_by(ImportFeed.name).all()
+    return [FeedResponse.model_validate(f) for f in feeds]
+
+
+@router.get("/{feed_id}", response_model=FeedResponse)
+def get_feed(feed_id: int, db: Session = Depends(get_db)):
+    """Get a single import feed by ID."""
+    feed = db.query(ImportFeed).filter(ImportFeed.id == feed_id).first()
+    if not feed:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    return FeedResponse.model_validate(feed)
+
+
+@router.post("", response_model=FeedResponse, status_code=201)
+def create_feed(feed: FeedCreate, db: Session = Depends(get_db)):
+    """Create a new import feed."""
+    new_feed = ImportFeed(**feed.model_dump())
+    db.add(new_feed)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Feed '{feed.name}' already exists")
+    db.refresh(new_feed)
+    return FeedResponse.model_validate(new_feed)
+
+
+@router.put("/{feed_id}", response_model=FeedResponse)
+def update_feed(
+    feed_id: int,
+    feed_update: FeedUpdate,
+    db: Session = Depends(get_db)
+):
+    """Update an existing import feed."""
+    feed = db.query(ImportFeed).filter(ImportFeed.id == feed_id).first()
+    if not feed:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    
+    update_data = feed_update.model_dump(exclude_unset=True)
+    for key, value in update_data.items():
+        setattr(feed, key, value)
+    
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Feed '{feed_update.name}' already exists")
+    db.refresh(feed)
+    return FeedResponse.model_validate(feed)
+
+
+@router.delete("/{feed_id}", status_code=204)
+def delete_feed(feed_id: int, db: Session = Depends(get_db)):
+    """
+    Delete an import feed.
+    
+    Its products are kept; only the record of which SKUs it owned is dropped.
+    """
+    feed = db.query(ImportFeed).filter(ImportFeed.id == feed_id).first()
+    if not feed:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    
+    db.query(FeedSku).filter(FeedSku.feed_id == feed_id).delete(synchronize_session=False)
+    db.delete(feed)
+    db.commit()
+    return None
@@ -0,0 +1,276 @@
+"""Import history (ledger), preview and control endpoints (start, cancel, pause, resume)."""
+import os
+import math
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.schemas import ImportControlResponse, ImportJobResponse, ImportJobListResponse, ImportPreviewResponse
+from app.services.import_job_service import (
+    get_import_job, list_import_jobs, claim_staged_import, upload_file_path
+)
+from app.services.import_preview import preview_import_file, SAMPLE_HEAD, MAX_PREVIEW_ROWS
+from app.tasks.import_tasks import (
+    import_products_task, import_route_options, queue_import, update_progress, get_progress, record_import_job,
+    get_import_control, set_import_control, clear_import_control,
+    get_checkpoint, save_checkpoint, clear_checkpoint,
+    CONTROL_CANCEL, CONTROL_PAUSE, TERMINAL_STATUSES, STAGED_STATUSES
+)
+
+router = APIRouter(prefix="/api/imports", tags=["imports"])
+
+
+@router.get("", response_model=ImportJobListResponse)
+def list_imports(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=100),
+    status: Optional[str] = None,
+    file_name: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    feed_id: Optional[int] = None,
+    batch_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    List imports, newest first, with duration and rows/sec of each run.
+    
+    batch_id selects the imports claimed by one scan of the ingest directory.
+    """
+    jobs, total = list_import_jobs(
+        db=db,
+        page=page,
+        per_page=per_page,
+        status=status,
+        file_name=file_name,
+        content_hash=content_hash,
+        feed_id=feed_id,
+        batch_id=batch_id,
+        created_from=created_from,
+        created_to=created_to
+    )
+    
+    pages = math.ceil(total / per_page) if total > 0 else 0
+    
+    return ImportJobListResponse(
+        items=[ImportJobResponse.model_validate(j) for j in jobs],
+        total=total,
+        page=page,
+        per_page=per_page,
+        pages=pages
+    )
+
+
+@router.get("/{task_id}", response_model=ImportJobResponse)
+def get_import(task_id: str, db: Session = Depends(get_db)):
+    """Get the ledger entry of an import."""
+    job = get_import_job(db, task_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return ImportJobResponse.model_validate(job)
+
+
+@router.get("/{task_id}/preview", response_model=ImportPreviewResponse)
+def preview_import(
+    task_id: str,
+    rows: int = Query(20, ge=1, le=MAX_PREVIEW_ROWS),
+    sample: str = Query(SAMPLE_HEAD),
+    seed: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Preview the file of a staged, queued or paused import.
+    
+    Returns the header mapping, the first rows (sample=head) or rows from
+    random offsets in the file (sample=random), each with the error the
+    import would report for it, the sample's error rate and an estimate
+    of the number of rows. Only a bounded part of the file is read, so
+    the preview takes about as long for any file size.
+    """
+    job = get_import_job(db, task_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    file_path = upload_file_path(task_id)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=410, detail="Uploaded file is no longer available")
+    try:
+        preview = preview_import_file(file_path, rows=rows, sample=sample, seed=seed)
+    except ValueError as e:
+        # Unknown sample mode, or a file that cannot be imported (UnsupportedFormatError)
+        raise HTTPException(status_code=400, detail=str(e))
+    return ImportPreviewResponse(task_id=task_id, file_name=job.file_name, **preview)
+
+
+@router.post("/{task_id}/start", response_model=ImportControlResponse, status_code=202)
+def start_import(task_id: str, dry_run: bool = Query(False), db: Session = Depends(get_db)):
+    """
+    Start a staged import, or a dry run of it.
+    
+    A dry run validates the whole file and looks up its SKUs without
+    writing products; it ends with status "validated" and keeps the file,
+    so the import can be started afterwards.
+    """
+    job = get_import_job(db, task_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    file_path = upload_file_path(task_id)
+    if job.status in STAGED_STATUSES and not os.path.exists(file_path):
+        raise HTTPException(status_code=410, detail="Uploaded file is no longer available")
+    
+    # Counters of an earlier dry run are replaced by this run's
+    previous_status = job.status
+    message = "Dry run queued, waiting to start..." if dry_run else "Task queued, waiting to start..."
+    if not claim_staged_import(
+        db, task_id, STAGED_STATUSES,
+        status="queued", message=message, total_rows=0, processed=0,
+        created_count=0, updated_count=0, unchanged_count=0, removed_count=0,
+        error_count=0, error_samples=[], duration_seconds=None, rows_per_sec=None,
+        stats=None, started_at=None, finished_at=None
+    ):
+        raise HTTPException(status_code=409, detail=f"Import is not staged (status '{previous_status}')")
+    
+    try:
+        queue_import(task_id, file_path, job.file_size or os.path.getsize(file_path), job.feed_id, dry_run)
+    except Exception as e:
+        # Leave the import staged so it can be started again
+        record_import_job(task_id, status=previous_status, message=f"Error starting import task: {str(e)}")
+        update_progress(task_id, previous_status, 0, 0, f"Error starting import task: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error starting import task: {str(e)}")
+    
+    return ImportControlResponse(
+        task_id=task_id, status="queued", message="Dry run started" if dry_run else "Import started"
+    )
+
+
+def _get_active_progress(task_id: str) -> dict:
+    """Progress of a task that is still queued or running."""
+    progress = get_progress(task_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Task not found or expired")
+    if progress.get("status") in TERMINAL_STATUSES:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Import already finished with status '{progress['status']}'"
+        )
+    if progress.get("status") in STAGED_STATUSES:
+        raise HTTPException(status_code=409, detail="Import has not been started")
+    return progress
+
+
+@router.post("/{task_id}/cancel", response_model=ImportControlResponse, status_code=202)
+def cancel_import(task_id: str, db: Session = Depends(get_db)):
+    """
+    Cancel an import.
+    
+    A running import stops after committing its current chunk; products
+    already imported are kept. A paused or staged import is cancelled
+    immediately and its file deleted.
+    """
+    job = get_import_job(db, task_id)
+    if job and job.status in STAGED_STATUSES:
+        file_path = upload_file_path(task_id)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        update_progress(task_id, "cancelled", 0, 0, "Staged import cancelled")
+        record_import_job(
+            task_id,
+            status="cancelled",
+            message="Staged import cancelled",
+            finished_at=datetime.now(timezone.utc)
+        )
+        return ImportControlResponse(task_id=task_id, status="cancelled", message="Import cancelled")
+    
+    checkpoint = get_checkpoint(task_id)
+    if checkpoint:
+        clear_checkpoint(task_id)
+        clear_import_control(task_id)
+        file_path = checkpoint.get("file_path")
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+        progress = get_progress(task_id) or {}
+        update_progress(
+            task_id, "cancelled", checkpoint["processed"], progress.get("total", 0),
+            f"Import cancelled while paused after {checkpoint['processed']} products. "
+            f"Created: {checkpoint['created']}, Updated: {checkpoint['updated']}",
+            progress.get("errors", [])
+        )
+        record_import_job(
+            task_id,
+            status="cancelled",
+            message=f"Import cancelled while paused after {checkpoint['processed']} products",
+            finished_at=datetime.now(timezone.utc)
+        )
+        return ImportControlResponse(task_id=task_id, status="cancelled", message="Import cancelled")
+
+    _get_active_progress(task_id)
+    set_import_control(task_id, CONTROL_CANCEL)
+    return ImportControlResponse(
+        task_id=task_id,
+        status="cancelling",
+        message="Cancellation requested; the import stops after its current chunk"
+    )
+
+
+@router.post("/{task_id}/pause", response_model=ImportControlResponse, status_code=202)
+def pause_import(task_id: str):
+    """
+    Pause an import after its current chunk.
+    
+    The task commits the chunk, saves a checkpoint and exits, freeing its
+    database session and worker slot until it is resumed.
+    """
+    if get_checkpoint(task_id):
+        raise HTTPException(status_code=409, detail="Import is already paused")
+
+    _get_active_progress(task_id)
+    if get_import_control(task_id) == CONTROL_CANCEL:
+        raise HTTPException(status_code=409, detail="Import is being cancelled")
+
+    set_import_control(task_id, CONTROL_PAUSE)
+    return ImportControlResponse(
+        task_id=task_id,
+        status="pausing",
+        message="Pause requested; the import stops after its current chunk"
+    )
+
+
+@router.post("/{task_id}/resume", response_model=ImportControlResponse, status_code=202)
+def resume_import(task_id: str):
+    """Resume a paused import from its checkpoint, or withdraw a pending pause."""
+    checkpoint = get_checkpoint(task_id)
+    if not checkpoint:
+        if get_import_control(task_id) == CONTROL_PAUSE:
+            clear_import_control(task_id)
+            return ImportControlResponse(
+                task_id=task_id, status="running", message="Pending pause request withdrawn"
+            )
+        _get_active_progress(task_id)
+        raise HTTPException(status_code=409, detail="Import is not paused")
+
+    file_path = checkpoint["file_path"]
+    if not os.path.exists(file_path):
+        clear_checkpoint(task_id)
+        raise HTTPException(status_code=410, detail="Uploaded file is no longer available")
+
+    clear_import_control(task_id)
+    clear_checkpoint(task_id)
+    progress = get_progress(task_id) or {}
+    update_progress(
+        task_id, "queued", checkpoint["processed"], progress.get("total", 0),
+        "Import resumed, waiting to start...", progress.get("errors", [])
+    )
+    record_import_job(task_id, status="queued", message="Import resumed, waiting to start...")
+    try:
+        import_products_task.apply_async(
+            args=[task_id, file_path],
+            kwargs={"checkpoint": checkpoint},
+            **import_route_options(os.path.getsize(file_path))
+        )
+    except Exception as e:
+        # Keep the import resumable if the task could not be queued
+        save_checkpoint(task_id, checkpoint)
+        raise HTTPException(status_code=500, detail=f"Error resuming import task: {str(e)}")
+
+    return ImportControlResponse(task_id=task_id, status="queued", message="Import resumed")
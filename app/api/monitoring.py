@@ -0,0 +1,81 @@
+"""Monitoring endpoints for operational visibility."""
+import json
+import redis
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.config import settings
+from app.database import get_pool_status
+from app.services import metrics, sql_profiler
+from app.tasks.celery_app import get_queue_depths
+
+router = APIRouter(prefix="/api/monitoring", tags=["monitoring"])
+
+# Redis connection for reading snapshots published by worker processes
+redis_client = redis.from_url(settings.REDIS_URL)
+
+
+@router.get("/db-pool")
+def db_pool_status():
+    """
+    Connection pool status for this web process.
+    
+    Reports pool size, connections in use, overflow connections in use and
+    cumulative checkout wait time.
+    """
+    return get_pool_status()
+
+
+@router.get("/sql-profile")
+def sql_profile():
+    """
+    Aggregated SQL profile per endpoint and per import chunk.
+    
+    ``web`` covers this web process; ``workers`` holds the snapshots Celery
+    worker processes publish after each import.
+    """
+    workers = {}
+    try:
+        for key in redis_client.scan_iter("sql_profile:worker:*"):
+            data = redis_client.get(key)
+            if data:
+                workers[key.decode('utf-8').split(":", 2)[2]] = json.loads(data)
+    except redis.RedisError:
+        pass
+
+    return {
+        "slow_query_ms": settings.SQL_SLOW_QUERY_MS,
+        "repeated_statement_threshold": settings.SQL_REPEATED_STATEMENT_THRESHOLD,
+        "web": sql_profiler.aggregate.snapshot(),
+        "workers": workers,
+    }
+
+
+@router.delete("/sql-profile", status_code=204)
+def reset_sql_profile():
+    """Reset the aggregated SQL profile of this web process."""
+    sql_profiler.aggregate.reset()
+    return None
+
+
+@router.get("/queues")
+def queue_depths():
+    """Messages waiting per Celery queue (lane), split by priority step."""
+    try:
+        return get_queue_depths()
+    except redis.RedisError as e:
+        raise HTTPException(status_code=503, detail=f"Broker unavailable: {str(e)}")
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Service-wide metrics in Prometheus text format.
+    
+    Includes every web and worker process that published a snapshot in the
+    last day, labelled by ``process``.
+    """
+    try:
+        snapshots = metrics.collect_snapshots()
+    except redis.RedisError:
+        snapshots = {metrics.process_key(): metrics.registry.snapshot()}
+    return PlainTextResponse(metrics.render(snapshots), media_type="text/plain; version=0.0.4")
@@ -1,36 +1,101 @@
 """Product CRUD endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from app.database import get_db
+import orjson
+from app.config import settings
+from app.database import get_db, get_async_db, get_async_read_db
 from app.models import Product
 from app.schemas import (
-    ProductCreate, ProductUpdate, ProductResponse, ProductListResponse
+    ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductChangesResponse,
+    CatalogStatsResponse
 )
+from app.services.catalog_stats import get_catalog_stats_async
+from app.services.change_feed import get_changes_async, get_catalog_generation_async, CursorExpiredError
 from app.services.product_service import (
     get_product_by_sku, create_product, update_product,
-    get_products, delete_all_products
+    get_product_rows_async, delete_all_products, PRODUCT_FIELDS
 )
-from app.services.webhook_service import trigger_webhooks_sync
+from app.tasks.webhook_tasks import enqueue_webhooks
 from app.models import WebhookEventType
 import math
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names this ETag (weak comparison, as RFC 9110 requires)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _cache_headers(etag: Optional[str]) -> dict:
+    """Cache-Control (and ETag): caches may reuse a response for PRODUCT_CACHE_MAX_AGE_SECONDS, then revalidate."""
+    if etag is None:
+        return {"Cache-Control": "no-cache"}
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.PRODUCT_CACHE_MAX_AGE_SECONDS}, must-revalidate",
+    }
+
+
+def _parse_fields(fields: Optional[str]) -> tuple:
+    """Requested product columns (fields=sku,name), in PRODUCT_FIELDS order; all by default."""
+    if not fields:
+        return PRODUCT_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(PRODUCT_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(PRODUCT_FIELDS)}"
+        )
+    return tuple(field for field in PRODUCT_FIELDS if field in requested)
+
+
+def _product_etag(product: Product) -> str:
+    """Strong ETag of one product, from its updated_at and change_seq."""
+    updated_us = int(product.updated_at.timestamp() * 1_000_000)
+    return f'"product-{product.id}-{updated_us}-{product.change_seq or 0}"'
+
+
 @router.get("", response_model=ProductListResponse)
-def list_products(
+async def list_products(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
-    per_page: int = Query(50, ge=1, le=100),
+    per_page: int = Query(50, ge=1, le=settings.PRODUCT_LIST_MAX_PER_PAGE),
     sku: Optional[str] = None,
     name: Optional[str] = None,
     description: Optional[str] = None,
     active: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. sku,name"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """List products with pagination and filtering."""
-    products, total = get_products(
+    """
+    List products with pagination and filtering.
+    
+    With fields= only those columns are selected and returned. Rows are
+    serialised straight to JSON with orjson, without building ORM entities
+    or Pydantic models, so large pages stay cheap.
+    
+    The ETag comes from the catalog generation, read before the count and
+    page queries; a matching If-None-Match gets 304 without running them.
+    """
+    columns = _parse_fields(fields)
+    generation = await get_catalog_generation_async(db)
+    etag = f'"products-{generation}"' if generation is not None else None
+    if etag and _etag_matches(request, etag):
+        return Response(status_code=304, headers={**response.headers, **_cache_headers(etag)})
+    
+    rows, total = await get_product_rows_async(
         db=db,
+        fields=columns,
         page=page,
         per_page=per_page,
         sku_filter=sku,
@@ -41,21 +106,74 @@ def list_products(
     
     pages = math.ceil(total / per_page) if total > 0 else 0
     
-    return ProductListResponse(
-        items=[ProductResponse.model_validate(p) for p in products],
-        total=total,
-        page=page,
-        per_page=per_page,
-        pages=pages
+    # Same JSON as ProductListResponse (UTC datetimes end in "Z", like Pydantic's)
+    content = orjson.dumps(
+        {
+            "items": [dict(zip(columns, row)) for row in rows],
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": pages,
+        },
+        option=orjson.OPT_UTC_Z
+    )
+    return Response(
+        content=content, media_type="application/json", headers={**response.headers, **_cache_headers(etag)}
     )
 
 
+@router.get("/stats", response_model=CatalogStatsResponse)
+async def get_catalog_stats(db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Total, active and inactive product counts.
+    
+    Maintained by database triggers in the transactions that write products,
+    so the answer takes the same time for any catalog size.
+    """
+    return CatalogStatsResponse(**await get_catalog_stats_async(db))
+
+
+@router.get("/changes", response_model=ProductChangesResponse)
+async def list_product_changes(
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=settings.CHANGE_FEED_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Products created, updated and deleted since a cursor.
+    
+    Start without a cursor (the whole catalog), then pass next_cursor back
+    until has_more is false; keep the last next_cursor for the next sync.
+    Deletes, including bulk deletes and feed snapshot deletions and
+    deactivations, come as "delete" entries. Served
+    by the primary, so a cursor never runs ahead of a lagging replica.
+    A cursor older than the tombstone retention gets 410 and the client
+    has to sync again from the start.
+    """
+    try:
+        page = await get_changes_async(db, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    return ProductChangesResponse.model_validate(page, from_attributes=True)
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    """Get a single product by ID."""
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a single product by ID; 304 if If-None-Match has its current ETag."""
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    etag = _product_etag(product)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={**response.headers, **_cache_headers(etag)})
+    response.headers.update(_cache_headers(etag))
     return ProductResponse.model_validate(product)
 
 
@@ -72,10 +190,9 @@ def create_product_endpoint(product: ProductCreate, db: Session = Depends(get_db
     
     # Trigger webhook
     try:
-        trigger_webhooks_sync(
-            db,
+        enqueue_webhooks(
             WebhookEventType.PRODUCT_CREATED,
-            ProductResponse.model_validate(new_product).model_dump()
+            ProductResponse.model_validate(new_product).model_dump(mode="json")
         )
     except Exception:
         pass  # Don't fail if webhook fails
@@ -99,10 +216,9 @@ def update_product_endpoint(
     
     # Trigger webhook
     try:
-        trigger_webhooks_sync(
-            db,
+        enqueue_webhooks(
             WebhookEventType.PRODUCT_UPDATED,
-            ProductResponse.model_validate(updated_product).model_dump()
+            ProductResponse.model_validate(updated_product).model_dump(mode="json")
         )
     except Exception:
         pass  # Don't fail if webhook fails
@@ -117,14 +233,13 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    product_data = ProductResponse.model_validate(product).model_dump()
+    product_data = ProductResponse.model_validate(product).model_dump(mode="json")
     db.delete(product)
     db.commit()
     
     # Trigger webhook
     try:
-        trigger_webhooks_sync(
-            db,
+        enqueue_webhooks(
             WebhookEventType.PRODUCT_DELETED,
             product_data
         )
@@ -2,15 +2,31 @@
 import json
 import asyncio
 import redis
+from typing import Dict, Optional
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from app.config import settings
+from app.database import SessionLocal
+from app.services.import_job_service import get_import_job, job_to_progress
 
 router = APIRouter(prefix="/api", tags=["progress"])
 
 # Redis connection for progress tracking
 redis_client = redis.from_url(settings.REDIS_URL)
 
+# Statuses after which the task stops updating progress
+STOP_STATUSES = ('completed', 'error', 'cancelled', 'paused', 'staged', 'validated')
+
+
+def ledger_progress(task_id: str) -> Optional[Dict]:
+    """Progress from the import job ledger, for tasks whose Redis key has expired."""
+    db = SessionLocal()
+    try:
+        job = get_import_job(db, task_id)
+        return job_to_progress(job) if job else None
+    finally:
+        db.close()
+
 
 @router.get("/stream/{task_id}")
 async def stream_progress(task_id: str):
@@ -19,6 +35,7 @@ async def stream_progress(task_id: str):
     """
     async def event_generator():
         last_progress = -1
+        last_status = None
         error_count = 0
         max_errors = 30  # Increased to 30 seconds to wait for task to start
         initial_wait = 0
@@ -26,7 +43,7 @@ async def stream_progress(task_id: str):
         while True:
             # Get progress from Redis
             progress_key = f"import_progress:{task_id}"
-            progress_data = redis_client.get(progress_key)
+            progress_data = await asyncio.to_thread(redis_client.get, progress_key)
             
             if progress_data:
                 try:
@@ -36,13 +53,14 @@ async def stream_progress(task_id: str):
                     current_progress = progress_dict.get('progress', 0)
                     status = progress_dict.get('status', 'unknown')
                     
-                    # Send update if progress changed
-                    if current_progress != last_progress or status in ['completed', 'error']:
+                    # Send update if progress or status changed
+                    if current_progress != last_progress or status != last_status or status in STOP_STATUSES:
                         yield f"data: {json.dumps(progress_dict)}\n\n"
                         last_progress = current_progress
+                        last_status = status
                         
-                        # Stop if completed or error
-                        if status in ['completed', 'error']:
+                        # Stop once the task is no longer running
+                        if status in STOP_STATUSES:
                             break
                     
                     error_count = 0  # Reset error count on successful read
@@ -52,6 +70,12 @@ async def stream_progress(task_id: str):
                         yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to parse progress data'})}\n\n"
                         break
             else:
+                # Finished long ago: the Redis key expired but the ledger remembers
+                progress_dict = await asyncio.to_thread(ledger_progress, task_id)
+                if progress_dict and progress_dict['status'] in STOP_STATUSES:
+                    yield f"data: {json.dumps(progress_dict)}\n\n"
+                    break
+                
                 # No progress data yet, wait a bit
                 # Give more time initially for task to start
                 initial_wait += 1
@@ -85,10 +109,13 @@ async def get_progress(task_id: str):
     Get current progress for a task (polling fallback).
     """
     progress_key = f"import_progress:{task_id}"
-    progress_data = redis_client.get(progress_key)
+    progress_data = await asyncio.to_thread(redis_client.get, progress_key)
     
     if not progress_data:
-        raise HTTPException(status_code=404, detail="Task not found or expired")
+        progress_dict = await asyncio.to_thread(ledger_progress, task_id)
+        if not progress_dict:
+            raise HTTPException(status_code=404, detail="Task not found or expired")
+        return progress_dict
     
     try:
         progress_dict = json.loads(progress_data.decode('utf-8'))
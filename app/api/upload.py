@@ -1,75 +1,484 @@
 """File upload endpoints."""
 import os
 import uuid
-import json
+import hashlib
+import logging
 import redis
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from sqlalchemy.orm import Session
 from app.config import settings
-from app.schemas import UploadResponse
-from app.tasks.import_tasks import import_products_task
+from app.database import get_db
+from app.schemas import (
+    UploadResponse, UploadSessionCreate, UploadSessionResponse, UploadChunkResponse, UploadSessionComplete
+)
+from app.services import import_job_service
+from app.services.admission import check_admission
+from app.services.feed_service import get_feed_by_name
+from app.services.import_formats import UnsupportedFormatError, detect_format, describe_format
+from app.services import upload_sessions
+from app.services.upload_sessions import UploadSessionError
+from app.tasks.import_tasks import queue_import, update_progress
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/upload", tags=["upload"])
 
+# Redis connection for progress tracking and idempotency keys
+redis_client = redis.from_url(settings.REDIS_URL)
+
+# Read size when streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+def _idempotency_redis_key(idempotency_key: str) -> str:
+    return f"upload_idempotency:{idempotency_key}"
 
-@router.post("", response_model=UploadResponse)
-async def upload_csv(file: UploadFile = File(...)):
+
+# The multipart body is parsed by the handler, after admission; documented here
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "required": ["file"],
+                "properties": {"file": {"type": "string", "format": "binary"}},
+            }
+        }
+    },
+}
+
+
+@router.post("", response_model=UploadResponse, openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_csv(
+    request: Request,
+    response: Response,
+    skip_duplicates: bool = Query(False),
+    feed: Optional[str] = Query(None),
+    stage: bool = Query(False),
+    dry_run: bool = Query(False),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    client_id: Optional[str] = Header(None, alias="X-Client-Id"),
+    db: Session = Depends(get_db)
+):
     """
-    Upload CSV file for product import.
+    Upload a product file for import: CSV, NDJSON or Parquet, optionally
+    gzip- or zstd-compressed (detected from the content, not the name).
     
+    The file is streamed to disk while its SHA-256 is computed, and a
+    ledger entry is created before the task is queued.
     Returns task_id immediately to avoid timeout.
+    
+    A retried request with the same Idempotency-Key returns the task_id of
+    the first request instead of queueing another import. A file identical
+    to an import completed within DUPLICATE_UPLOAD_WINDOW_HOURS is reported
+    in duplicate_of; with skip_duplicates=true it is not imported again and
+    the earlier task_id is returned.
+    
+    With feed=<name> the file is a full snapshot of that import feed:
+    the feed's products missing from it are deactivated or deleted
+    after the import completes.
+    
+    With stage=true the file is saved but not imported: preview it with
+    GET /api/imports/{task_id}/preview, then start the import or a dry run
+    with POST /api/imports/{task_id}/start. dry_run=true queues a dry run
+    right away; it reports what the import would do and keeps the file.
+    
+    Uploads beyond the in-flight, queued-bytes, free-disk or per-client
+    limits are refused with 429, a Retry-After header and an estimate of
+    their position in the import queue. These checks run before the body
+    is read (against Content-Length), so a refused upload is neither
+    received nor spooled to disk.
     """
-    # Validate file type
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="File must be a CSV file")
+    # Per-client quotas fall back to the caller's address
+    client_id = client_id or (request.client.host if request.client else None)
+    # Database, Redis and broker round-trips run in the threadpool; only the
+    # file streaming runs on the event loop
+    task_id, feed_id, replay = await run_in_threadpool(
+        _admit_upload, feed, idempotency_key, client_id, int(request.headers.get("content-length") or 0), db
+    )
+    if replay:
+        response.headers["Idempotent-Replayed"] = "true"
+        return replay
     
-    # Create upload directory if it doesn't exist
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    try:
+        async with request.form(max_files=1) as form:
+            file = form.get("file")
+            if not isinstance(file, UploadFile):
+                raise RequestValidationError(
+                    [{"type": "missing", "loc": ("body", "file"), "msg": "Field required", "input": None}]
+                )
+            return await _save_and_queue(
+                file, task_id, import_job_service.upload_file_path(task_id),
+                skip_duplicates, idempotency_key, client_id, feed_id, stage, dry_run, db
+            )
+    except Exception:
+        # Let the client retry with the same key
+        if idempotency_key:
+            await run_in_threadpool(redis_client.delete, _idempotency_redis_key(idempotency_key))
+        raise
+
+
+def _admit_upload(
+    feed: Optional[str],
+    idempotency_key: Optional[str],
+    client_id: Optional[str],
+    upload_size: int,
+    db: Session
+) -> Tuple[str, Optional[int], Optional[UploadResponse]]:
+    """
+    Checks of an upload before its file is read: feed, Idempotency-Key and admission limits.
+    
+    Returns:
+        Tuple of (task_id, feed_id, response of the original upload if the
+        Idempotency-Key was already used, else None)
+    """
+    feed_id = None
+    if feed:
+        import_feed = get_feed_by_name(db, feed)
+        if not import_feed:
+            raise HTTPException(status_code=404, detail=f"Feed '{feed}' not found")
+        feed_id = import_feed.id
     
-    # Generate unique task ID and file path
+    # Generate unique task ID
     task_id = str(uuid.uuid4())
-    file_path = os.path.join(settings.UPLOAD_DIR, f"{task_id}.csv")
+    
+    # Claim the idempotency key before doing any work, so concurrent retries
+    # cannot both start an import
+    if idempotency_key:
+        if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Idempotency-Key must be at most {MAX_IDEMPOTENCY_KEY_LENGTH} characters"
+            )
+        key = _idempotency_redis_key(idempotency_key)
+        if not redis_client.set(key, task_id, ex=settings.IDEMPOTENCY_KEY_TTL, nx=True):
+            original_task_id = redis_client.get(key)
+            if original_task_id:
+                return task_id, feed_id, UploadResponse(
+                    task_id=original_task_id.decode('utf-8'),
+                    message="Upload already received with this Idempotency-Key."
+                )
+            # Expired between SET and GET: nothing to replay
+            redis_client.set(key, task_id, ex=settings.IDEMPOTENCY_KEY_TTL)
+    
+    rejection = check_admission(db, upload_size, client_id)
+    if rejection:
+        if idempotency_key:
+            redis_client.delete(_idempotency_redis_key(idempotency_key))
+        raise HTTPException(
+            status_code=429,
+            detail=rejection,
+            headers={"Retry-After": str(rejection["retry_after"])}
+        )
+    return task_id, feed_id, None
+
+
+async def _save_and_queue(
+    file: UploadFile,
+    task_id: str,
+    file_path: str,
+    skip_duplicates: bool,
+    idempotency_key: Optional[str],
+    client_id: Optional[str],
+    feed_id: Optional[int],
+    stage: bool,
+    dry_run: bool,
+    db: Session
+) -> UploadResponse:
+    """Save the upload, then register and queue (or stage) its import."""
+    # Create upload directory if it doesn't exist
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     
     # Save file
+    file_size = 0
+    sha256 = hashlib.sha256()
     try:
         with open(file_path, "wb") as f:
-            content = await file.read()
-            
-            # Check file size
-            if len(content) > settings.MAX_UPLOAD_SIZE:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE / (1024*1024)}MB"
-                )
-            
-            f.write(content)
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                
+                # Check file size
+                if file_size > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE / (1024*1024)}MB"
+                    )
+                
+                sha256.update(chunk)
+                f.write(chunk)
     except Exception as e:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
     
-    # Initialize progress in Redis immediately
-    redis_client = redis.from_url(settings.REDIS_URL)
-    initial_progress = {
-        "status": "queued",
-        "progress": 0,
-        "total": 0,
-        "percentage": 0,
-        "message": "Task queued, waiting to start...",
-        "errors": []
-    }
-    redis_client.setex(f"import_progress:{task_id}", 3600, json.dumps(initial_progress))
-    
-    # Start Celery task
+    return await run_in_threadpool(
+        _register_and_queue, task_id, file_path, file.filename, file_size, sha256.hexdigest(),
+        skip_duplicates, idempotency_key, client_id, feed_id, stage, dry_run, db
+    )
+
+
+def _register_and_queue(
+    task_id: str,
+    file_path: str,
+    file_name: Optional[str],
+    file_size: int,
+    content_hash: str,
+    skip_duplicates: bool,
+    idempotency_key: Optional[str],
+    client_id: Optional[str],
+    feed_id: Optional[int],
+    stage: bool,
+    dry_run: bool,
+    db: Session
+) -> UploadResponse:
+    """Check a saved upload against recent imports, record it in the ledger and queue (or stage) its import."""
+    try:
+        file_format = describe_format(*detect_format(file_path))
+    except UnsupportedFormatError as e:
+        os.remove(file_path)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Same bytes as a recent completed import: it would produce nothing new
+    duplicate = import_job_service.find_completed_import(
+        db, content_hash, settings.DUPLICATE_UPLOAD_WINDOW_HOURS
+    )
+    if duplicate and skip_duplicates:
+        os.remove(file_path)
+        if idempotency_key:
+            redis_client.set(
+                _idempotency_redis_key(idempotency_key), duplicate.task_id, ex=settings.IDEMPOTENCY_KEY_TTL
+            )
+        return UploadResponse(
+            task_id=duplicate.task_id,
+            message="Identical file was already imported. Import skipped.",
+            duplicate_of=duplicate.task_id,
+            skipped=True
+        )
+    
+    # Persistent record of the import, kept after the progress key expires
+    staged = stage and not dry_run
+    staged_message = "File staged. Preview it, then start the import or a dry run."
+    try:
+        import_job_service.create_import_job(
+            db, task_id, file_name, file_size, content_hash,
+            status="staged" if staged else "queued",
+            client_id=client_id, feed_id=feed_id, file_format=file_format,
+            message=staged_message if staged else None
+        )
+    except Exception as e:
+        os.remove(file_path)
+        raise HTTPException(status_code=500, detail=f"Error recording import job: {str(e)}")
+    
+    duplicate_note = f" An identical file was already imported by task {duplicate.task_id}." if duplicate else ""
+    if staged:
+        update_progress(task_id, "staged", 0, 0, staged_message)
+        return UploadResponse(
+            task_id=task_id,
+            message=staged_message + duplicate_note,
+            duplicate_of=duplicate.task_id if duplicate else None
+        )
+    
+    # Initialize progress in Redis immediately and start the Celery task
     try:
-        import_products_task.delay(task_id, file_path)
+        queue_import(task_id, file_path, file_size, feed_id=feed_id, dry_run=dry_run)
     except Exception as e:
         # Clean up file and progress if task creation fails
         if os.path.exists(file_path):
             os.remove(file_path)
         redis_client.delete(f"import_progress:{task_id}")
+        try:
+            import_job_service.update_import_job(
+                db, task_id, status="error", message=f"Error starting import task: {str(e)}"
+            )
+        except Exception as ledger_error:
+            logger.error(f"Error updating import job: {str(ledger_error)}")
         raise HTTPException(status_code=500, detail=f"Error starting import task: {str(e)}")
     
+    message = "File uploaded successfully. Dry run started." if dry_run else "File uploaded successfully. Import started."
     return UploadResponse(
         task_id=task_id,
-        message="File uploaded successfully. Import started."
+        message=message + duplicate_note,
+        duplicate_of=duplicate.task_id if duplicate else None
     )
 
+
+def _session_error(e: UploadSessionError) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@router.post("/sessions", response_model=UploadSessionResponse, status_code=201)
+def create_upload_session(
+    request: Request,
+    body: UploadSessionCreate,
+    client_id: Optional[str] = Header(None, alias="X-Client-Id"),
+    db: Session = Depends(get_db)
+):
+    """
+    Start a resumable upload of a large file.
+    
+    Send the file as numbered chunks of chunk_size bytes (the last may be
+    shorter) with PUT /api/upload/sessions/{upload_id}/chunks/{index}, in
+    any order and over several connections at once. GET the session to see
+    which chunks are missing after an interruption, then finalise with
+    POST /api/upload/sessions/{upload_id}/complete. feed, stage, dry_run
+    and skip_duplicates work as for POST /api/upload. Admission limits are
+    checked here, against the declared file_size.
+    """
+    feed_id = None
+    if body.feed:
+        import_feed = get_feed_by_name(db, body.feed)
+        if not import_feed:
+            raise HTTPException(status_code=404, detail=f"Feed '{body.feed}' not found")
+        feed_id = import_feed.id
+    
+    client_id = client_id or (request.client.host if request.client else None)
+    rejection = check_admission(db, body.file_size, client_id)
+    if rejection:
+        raise HTTPException(
+            status_code=429,
+            detail=rejection,
+            headers={"Retry-After": str(rejection["retry_after"])}
+        )
+    
+    try:
+        session = upload_sessions.create_session(
+            body.file_name, body.file_size, body.chunk_size,
+            feed_id=feed_id, stage=body.stage, dry_run=body.dry_run,
+            skip_duplicates=body.skip_duplicates, client_id=client_id
+        )
+    except UploadSessionError as e:
+        raise _session_error(e)
+    return UploadSessionResponse(**session)
+
+
+@router.get("/sessions/{upload_id}", response_model=UploadSessionResponse)
+def get_upload_session(upload_id: str):
+    """Chunks received and missing so far, to resume an interrupted upload."""
+    try:
+        return UploadSessionResponse(**upload_sessions.get_session(upload_id))
+    except UploadSessionError as e:
+        raise _session_error(e)
+
+
+@router.put("/sessions/{upload_id}/chunks/{index}", response_model=UploadChunkResponse)
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    chunk_sha256: str = Header(..., alias="X-Chunk-SHA256")
+):
+    """
+    Store one chunk (the raw request body) at its offset in the file.
+    
+    X-Chunk-SHA256 is the hex SHA-256 of the chunk; a chunk whose bytes do
+    not match it is not counted and must be sent again. The body is
+    streamed to disk, never held in memory as a whole.
+    """
+    try:
+        stored = await upload_sessions.write_chunk(upload_id, index, chunk_sha256, request.stream())
+    except UploadSessionError as e:
+        raise _session_error(e)
+    return UploadChunkResponse(**stored)
+
+
+@router.post("/sessions/{upload_id}/complete", response_model=UploadResponse)
+def complete_upload_session(
+    upload_id: str,
+    body: Optional[UploadSessionComplete] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Finalise an upload once every chunk has arrived and queue its import.
+    
+    The chunks were written in place, so the file is only renamed, not
+    copied. It is read once to compute its SHA-256 (checked against sha256
+    if given, and used for duplicate detection). Finalising again returns
+    the same task_id.
+    """
+    try:
+        session = upload_sessions.get_session(upload_id)
+    except UploadSessionError as e:
+        raise _session_error(e)
+    if session["task_id"]:
+        return UploadResponse(task_id=session["task_id"], message="Upload session already finalised.")
+    if session["missing_chunks"]:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": f"{len(session['missing_chunks'])} chunks are missing",
+                "missing_chunks": session["missing_chunks"],
+            }
+        )
+    if not upload_sessions.claim_finalisation(upload_id):
+        raise HTTPException(status_code=409, detail="Upload session is being finalised")
+    
+    try:
+        # A chunk resent while finalisation started may still be writing, and no longer counts until it ends
+        if not upload_sessions.wait_for_writes(upload_id):
+            raise HTTPException(status_code=409, detail="Chunks are still being written; finalise again once they end")
+        missing = upload_sessions.get_session(upload_id)["missing_chunks"]
+        if missing:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": f"{len(missing)} chunks are missing", "missing_chunks": missing}
+            )
+        
+        part_path = upload_sessions.part_file_path(upload_id)
+        content_hash = upload_sessions.hash_file(part_path)
+        if body and body.sha256 and body.sha256.lower() != content_hash:
+            raise HTTPException(
+                status_code=400,
+                detail="File checksum mismatch; check the chunks and finalise again"
+            )
+        
+        task_id = str(uuid.uuid4())
+        file_path = import_job_service.upload_file_path(task_id)
+        os.replace(part_path, file_path)
+    except Exception:
+        upload_sessions.release_finalisation(upload_id)
+        raise
+    
+    try:
+        result = _register_and_queue(
+            task_id, file_path, session["file_name"], session["file_size"], content_hash,
+            session["skip_duplicates"], None, session["client_id"], session["feed_id"],
+            session["stage"], session["dry_run"], db
+        )
+    except HTTPException:
+        # The file has been removed; the session cannot be finalised again
+        upload_sessions.delete_session(upload_id)
+        raise
+    except Exception:
+        # Put the file back so the session can be finalised again, or give the session up
+        try:
+            os.replace(file_path, part_path)
+            upload_sessions.release_finalisation(upload_id)
+        except Exception as restore_error:
+            logger.error(f"Error restoring upload session {upload_id}: {str(restore_error)}")
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            upload_sessions.delete_session(upload_id)
+        raise
+    upload_sessions.mark_finalised(upload_id, result.task_id)
+    return result
+
+
+@router.delete("/sessions/{upload_id}", status_code=204)
+def delete_upload_session(upload_id: str):
+    """Abort an upload session and delete its chunks."""
+    try:
+        upload_sessions.get_session(upload_id)
+    except UploadSessionError as e:
+        raise _session_error(e)
+    upload_sessions.delete_session(upload_id)
+    return None
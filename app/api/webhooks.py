@@ -1,8 +1,10 @@
 """Webhook management endpoints."""
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models import Webhook, WebhookEventType
 from app.schemas import (
     WebhookCreate, WebhookUpdate, WebhookResponse, WebhookTestResponse
@@ -14,9 +16,9 @@ router = APIRouter(prefix="/api/webhooks", tags=["webhooks"])
 
 
 @router.get("", response_model=List[WebhookResponse])
-def list_webhooks(db: Session = Depends(get_db)):
+async def list_webhooks(db: AsyncSession = Depends(get_async_db)):
     """List all webhooks."""
-    webhooks = db.query(Webhook).order_by(Webhook.id.desc()).all()
+    webhooks = await db.scalars(select(Webhook).order_by(Webhook.id.desc()))
     return [WebhookResponse.model_validate(w) for w in webhooks]
 
 
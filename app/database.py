@@ -1,25 +1,339 @@
 """Database configuration and session management."""
-from sqlalchemy import create_engine
+import asyncio
+import logging
+import time
+import threading
+import uuid
+from typing import AsyncIterator, Dict, Optional
+from fastapi import Request, Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.config import settings
+from app.services import sql_profiler
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    echo=settings.DEBUG
-)
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Cumulative checkout statistics for the current process's pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.failures = 0
+
+    def record_wait(self, seconds: float, failed: bool = False):
+        with self._lock:
+            if failed:
+                self.failures += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.failures,
+                "checkout_wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+                "checkout_wait_ms_avg": round(self.wait_seconds_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "checkout_wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class _TimedCheckoutMixin:
+    """Times how long callers wait to get a connection from the pool."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record_wait(time.perf_counter() - start, failed=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckoutMixin, NullPool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# Async drivers by backend, for the async engine
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(database_url: str) -> str:
+    """DATABASE_URL with the backend's async driver (asyncpg for Postgres)."""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _engine_options(role: str, is_async: bool = False, database_url: Optional[str] = None) -> Dict:
+    """Build create_engine() (or create_async_engine()) keyword arguments for a process role."""
+    if role == "worker":
+        pool_size, max_overflow, echo = (
+            settings.DB_POOL_SIZE_WORKER, settings.DB_MAX_OVERFLOW_WORKER, settings.DB_ECHO_WORKER
+        )
+    else:
+        pool_size, max_overflow, echo = (
+            settings.DB_POOL_SIZE_WEB, settings.DB_MAX_OVERFLOW_WEB, settings.DB_ECHO_WEB
+        )
+
+    if settings.DB_PGBOUNCER_MODE:
+        # PgBouncer owns the pooling; keeping our own pool on top of it only
+        # pins server connections. psycopg2 never prepares statements server-side.
+        options = {"poolclass": InstrumentedNullPool, "echo": echo}
+        if is_async and make_url(database_url or settings.DATABASE_URL).get_backend_name() == "postgresql":
+            # asyncpg prepares every statement; in transaction mode the next
+            # statement may run on another server connection, so cache nothing
+            # and never reuse a statement name
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        return options
+
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_pre_ping": True,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "echo": echo,
+    }
+
+
+# Statement timing for per-request / per-chunk SQL profiles
+sql_profiler.install()
+
+# Create database engine (connects lazily on first checkout)
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.PROCESS_ROLE))
+engine_role = settings.PROCESS_ROLE
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for read endpoints in the web process, created on first use so
+# Celery workers (sync only) never load the async driver
+async_engine: Optional[AsyncEngine] = None
+
+# Async session factory; bound by get_async_engine(). Objects stay loaded
+# after commit, as responses are built from them after the session closes
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, class_=AsyncSession)
+
+# Optional read replica (DATABASE_REPLICA_URL) for product reads, same setup
+async_replica_engine: Optional[AsyncEngine] = None
+AsyncReplicaSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, class_=AsyncSession)
+
+# Set after a successful write; the client's reads stay on the primary until it expires
+RECENT_WRITE_COOKIE = "recent_write"
+
+# Replication delay of a standby in seconds: 0 when it has replayed everything
+# it received (or is not a standby), NULL when unknown
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
 # Base class for models
 Base = declarative_base()
 
 
+def configure_engine(role: str):
+    """
+    Rebuild the engine for a process role and rebind SessionLocal.
+    
+    Called in each Celery worker child after fork, so the child gets its own
+    pool sized for the worker role instead of sharing the parent's sockets.
+    """
+    global engine, engine_role, async_engine, async_replica_engine
+    engine.dispose(close=False)
+    engine = create_engine(settings.DATABASE_URL, **_engine_options(role))
+    engine_role = role
+    SessionLocal.configure(bind=engine)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+        async_engine = None
+    if async_replica_engine is not None:
+        async_replica_engine.sync_engine.dispose(close=False)
+        async_replica_engine = None
+    pool_stats.reset()
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """The async engine of this process (asyncpg for Postgres), created on first use."""
+    global async_engine
+    if async_engine is None:
+        async_engine = create_async_engine(
+            async_database_url(settings.DATABASE_URL), **_engine_options(engine_role, is_async=True)
+        )
+        AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
+
+
+def get_async_replica_engine() -> AsyncEngine:
+    """The async engine of the read replica, created on first use."""
+    global async_replica_engine
+    if async_replica_engine is None:
+        options = _engine_options(engine_role, is_async=True, database_url=settings.DATABASE_REPLICA_URL)
+        if make_url(settings.DATABASE_REPLICA_URL).get_backend_name() == "postgresql":
+            # An unreachable replica must fail fast, not after asyncpg's 60s default
+            options["connect_args"] = {
+                **options.get("connect_args", {}), "timeout": settings.REPLICA_CONNECT_TIMEOUT_SECONDS
+            }
+        async_replica_engine = create_async_engine(async_database_url(settings.DATABASE_REPLICA_URL), **options)
+        AsyncReplicaSessionLocal.configure(bind=async_replica_engine)
+    return async_replica_engine
+
+
+async def dispose_async_engine():
+    """Close the async engines' pooled connections (on app shutdown)."""
+    global async_engine, async_replica_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+        async_replica_engine = None
+
+
+class ReplicaLagMonitor:
+    """
+    Replication lag of the read replica, measured at most every
+    REPLICA_LAG_CHECK_SECONDS per process so routing adds no query per request.
+    
+    An unreachable replica, a check taking longer than
+    REPLICA_LAG_CHECK_TIMEOUT_SECONDS or an unknown lag reads as None, which
+    routes reads to the primary until the next successful check. Requests
+    arriving while a check runs read from the primary instead of waiting.
+    """
+
+    def __init__(self):
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self.checked_at is not None and time.monotonic() - self.checked_at < settings.REPLICA_LAG_CHECK_SECONDS
+
+    async def current_lag(self) -> Optional[float]:
+        if self._fresh():
+            return self.lag_seconds
+        if self._lock.locked():
+            return None
+        async with self._lock:
+            replica = get_async_replica_engine()
+            try:
+                if replica.dialect.name != "postgresql":
+                    lag = 0.0
+                else:
+                    lag = await asyncio.wait_for(self._measure(replica), settings.REPLICA_LAG_CHECK_TIMEOUT_SECONDS)
+                self.lag_seconds = float(lag) if lag is not None else None
+                self.error = None
+            except Exception as e:
+                self.lag_seconds = None
+                self.error = str(e) or f"Lag check timed out after {settings.REPLICA_LAG_CHECK_TIMEOUT_SECONDS}s"
+                logger.warning(f"Replica lag check failed, reading from the primary: {self.error}")
+            self.checked_at = time.monotonic()
+        return self.lag_seconds
+    
+    @staticmethod
+    async def _measure(replica: AsyncEngine) -> Optional[float]:
+        async with replica.connect() as connection:
+            return await connection.scalar(text(REPLICA_LAG_SQL))
+
+    def snapshot(self) -> Dict:
+        return {
+            "lag_seconds": round(self.lag_seconds, 3) if self.lag_seconds is not None else None,
+            "max_lag_seconds": settings.REPLICA_MAX_LAG_SECONDS,
+            "checked_seconds_ago": round(time.monotonic() - self.checked_at, 1) if self.checked_at is not None else None,
+            "error": self.error,
+        }
+
+
+replica_lag = ReplicaLagMonitor()
+
+
+def recently_wrote(request: Request) -> bool:
+    """Whether the client wrote within READ_YOUR_WRITES_SECONDS (recent-write cookie)."""
+    try:
+        written_at = float(request.cookies.get(RECENT_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - written_at < settings.READ_YOUR_WRITES_SECONDS
+
+
+def get_pool_status() -> Dict:
+    """Current pool occupancy and checkout wait statistics for this process."""
+    pool = engine.pool
+    status = {
+        "role": engine_role,
+        "pool_class": type(pool).__name__,
+        "pgbouncer_mode": settings.DB_PGBOUNCER_MODE,
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "in_use": pool.checkedout(),
+            # QueuePool.overflow() starts at -pool_size and counts up
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    if settings.DATABASE_REPLICA_URL:
+        status["replica"] = replica_lag.snapshot()
+        if async_replica_engine is not None and isinstance(async_replica_engine.pool, QueuePool):
+            status["replica"]["pool"] = {
+                "size": async_replica_engine.pool.size(),
+                "in_use": async_replica_engine.pool.checkedout(),
+            }
+    if async_engine is not None and isinstance(async_engine.pool, QueuePool):
+        async_pool = async_engine.pool
+        status["async_pool"] = {
+            "size": async_pool.size(),
+            "checked_in": async_pool.checkedin(),
+            "in_use": async_pool.checkedout(),
+            "overflow": max(async_pool.overflow(), 0),
+            "max_overflow": async_pool._max_overflow,
+        }
+    status.update(pool_stats.snapshot())
+    return status
+
+
 def get_db():
     """Dependency for getting database session."""
     db = SessionLocal()
@@ -28,3 +342,34 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for getting an async database session (read-only endpoints)."""
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request, response: Response) -> AsyncIterator[AsyncSession]:
+    """
+    Dependency for an async session for reads the replica may serve.
+    
+    Uses DATABASE_REPLICA_URL when it is set, its lag is known and within
+    REPLICA_MAX_LAG_SECONDS, and the client has not written recently
+    (read-your-own-writes); otherwise the primary. The choice is reported
+    in the X-Read-Source response header.
+    """
+    use_replica = False
+    if settings.DATABASE_REPLICA_URL and not recently_wrote(request):
+        lag = await replica_lag.current_lag()
+        use_replica = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+    
+    if use_replica:
+        get_async_replica_engine()
+        session_factory = AsyncReplicaSessionLocal
+    else:
+        get_async_engine()
+        session_factory = AsyncSessionLocal
+    response.headers["X-Read-Source"] = "replica" if use_replica else "primary"
+    async with session_factory() as db:
+        yield db
@@ -1,20 +1,52 @@
-"""FastAPI application entry point."""
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+"""FastAPI application entry point.
+
+The schema is managed by Alembic migrations (``alembic upgrade head``), which
+run once per deploy. Importing this module does no DDL and opens no database
+connections; the engine connects on first use.
+"""
+import time
+from contextlib import asynccontextmanager
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.api import upload, products, webhooks, sse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from app.api import upload, products, webhooks, sse, imports, monitoring, feeds
 from app.config import settings
+from app.database import dispose_async_engine, RECENT_WRITE_COOKIE
+from app.services.sql_profiler import profile_unit
+from app.services.static_assets import StaticAssets, asset_response
+from app.services import metrics
+import logging
 import os
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Publish metrics in the background; on shutdown withdraw them and close the
+    async engine's connections (the engine is created on first use).
+    """
+    metrics.start_publisher()
+    yield
+    try:
+        await run_in_threadpool(metrics.unpublish)
+    except Exception as e:
+        logger.debug(f"Error withdrawing metrics: {str(e)}")
+    await dispose_async_engine()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Product Importer API",
     description="API for importing and managing products from CSV files",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -26,28 +58,156 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class _WeakETagGZipResponder(GZipResponder):
+    """GZipResponder that marks the ETag of a response it compresses as weak."""
+    
+    async def __call__(self, scope, receive, send):
+        async def send_weakened(message):
+            if message["type"] == "http.response.start" and not self.content_encoding_set:
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if headers.get("content-encoding") == "gzip" and etag and etag.startswith('"'):
+                    headers["etag"] = f"W/{etag}"
+            await send(message)
+        
+        await super().__call__(scope, receive, send_weakened)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzip responses of at least GZIP_MIN_SIZE bytes for clients that accept it.
+    
+    Event streams are never compressed (the gzip stream would hold events
+    back), and responses that already have a Content-Encoding (precompressed
+    static assets) pass through. A compressed response's ETag becomes weak,
+    as it no longer names the uncompressed bytes; the product endpoints
+    compare If-None-Match weakly.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            if (
+                "gzip" in headers.get("accept-encoding", "")
+                and "text/event-stream" not in headers.get("accept", "")
+                and not scope["path"].startswith("/api/stream/")
+            ):
+                responder = _WeakETagGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.GZIP_MIN_SIZE,
+    compresslevel=settings.GZIP_COMPRESS_LEVEL
+)
+
+# Cold start timings, filled in by the middleware on the first request
+startup_metrics = {
+    "import_ms": None,
+    "first_request_ms": None,
+}
+
+
+@app.middleware("http")
+async def record_first_request(request: Request, call_next):
+    """Record time from app import to the first request being served."""
+    if startup_metrics["first_request_ms"] is None:
+        startup_metrics["first_request_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+        logger.info(
+            f"Cold start: app import {startup_metrics['import_ms']}ms, "
+            f"first request served after {startup_metrics['first_request_ms']}ms"
+        )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def profile_sql(request: Request, call_next):
+    """Attribute SQL statements to the request; add DB cost headers with SQL_PROFILING_HEADERS."""
+    with profile_unit("http", f"{request.method} {request.url.path}") as profile:
+        response = await call_next(request)
+        endpoint = request.scope.get("endpoint")
+        if endpoint is not None:
+            profile.name = f"{request.method} {endpoint.__name__}"
+
+    if settings.SQL_PROFILING_HEADERS:
+        response.headers["X-DB-Query-Count"] = str(profile.query_count)
+        response.headers["X-DB-Time-Ms"] = f"{profile.db_time * 1000:.2f}"
+        response.headers["X-DB-Repeated-Statements"] = str(len(profile.repeated_statements))
+    return response
+
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    """Record request latency per route for the metrics endpoint."""
+    started = time.perf_counter()
+    response = await call_next(request)
+    endpoint = request.scope.get("endpoint")
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=endpoint.__name__ if endpoint is not None else "unmatched",
+        status=response.status_code
+    )
+    try:
+        # Redis is only written every PUBLISH_INTERVAL, and then off the event loop
+        if metrics.publish_due():
+            await run_in_threadpool(metrics.publish, False)
+    except Exception as e:
+        logger.debug(f"Error publishing metrics: {str(e)}")
+    return response
+
+
+@app.middleware("http")
+async def mark_recent_write(request: Request, call_next):
+    """Keep a client's reads on the primary for a while after its own successful write."""
+    response = await call_next(request)
+    if (
+        settings.DATABASE_REPLICA_URL
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            RECENT_WRITE_COOKIE,
+            f"{time.time():.3f}",
+            max_age=settings.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+
 # Health check endpoint (define before static files)
 @app.get("/api/health")
 def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return {"status": "healthy", "startup": startup_metrics}
 
 # Include routers
 app.include_router(upload.router)
 app.include_router(products.router)
 app.include_router(webhooks.router)
 app.include_router(sse.router)
+app.include_router(imports.router)
+app.include_router(monitoring.router)
+app.include_router(feeds.router)
 
-# Mount static files
+# Static files: fingerprinted, precompressed, served from memory
 static_dir = os.path.join(os.path.dirname(__file__), "static")
 if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+    static_assets = StaticAssets(static_dir)
     
-    # Serve index.html for root and non-API routes
-    from fastapi.responses import FileResponse
-    from fastapi import Request
-    from fastapi.responses import Response
+    @app.get("/static/{asset_path:path}")
+    async def serve_static(request: Request, asset_path: str):
+        """Serve a static asset; fingerprinted URLs are cached as immutable."""
+        asset, immutable = static_assets.lookup(asset_path)
+        if asset is None:
+            return Response(status_code=404)
+        return asset_response(request, asset, immutable)
     
+    # Serve index.html for root and non-API routes
     @app.get("/{full_path:path}")
     async def serve_frontend(request: Request, full_path: str):
         """Serve frontend for non-API routes."""
@@ -55,9 +215,10 @@ if os.path.exists(static_dir):
         if full_path.startswith("api/") or full_path.startswith("docs") or full_path.startswith("redoc") or full_path.startswith("openapi.json"):
             return Response(status_code=404)
         
-        # Serve index.html for all other routes (SPA routing)
-        index_path = os.path.join(static_dir, "index.html")
-        if os.path.exists(index_path):
-            return FileResponse(index_path)
+        # Serve index.html for all other routes (SPA routing), with fingerprinted asset URLs
+        index = static_assets.get_index()
+        if index is not None:
+            return asset_response(request, index)
         return Response(status_code=404)
 
+startup_metrics["import_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
@@ -1,7 +1,10 @@
 """SQLAlchemy database models."""
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Enum as SQLEnum
+from sqlalchemy import (
+    Column, Integer, BigInteger, Float, String, Text, Boolean, DateTime, JSON, ForeignKey, FetchedValue,
+    Identity, Enum as SQLEnum
+)
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from sqlalchemy import Index
 import enum
 import uuid
@@ -16,6 +19,12 @@ class WebhookEventType(str, enum.Enum):
     IMPORT_COMPLETED = "import.completed"
 
 
+class FeedMissingAction(str, enum.Enum):
+    """What a feed snapshot import does with products missing from the file."""
+    DEACTIVATE = "deactivate"
+    DELETE = "delete"
+
+
 class Product(Base):
     """Product model."""
     __tablename__ = "products"
@@ -27,10 +36,18 @@ class Product(Base):
     active = Column(Boolean, default=True, nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    # Position in the change feed, stamped by a trigger on every insert and
+    # update: the writing transaction's id and the next product_change_seq
+    # value. The 0 default only remains where the trigger does not exist
+    # (schemas built with create_all, e.g. benchmarks)
+    change_txid = Column(BigInteger, nullable=False, server_default=text("0"), server_onupdate=FetchedValue())
+    change_seq = Column(BigInteger, nullable=False, server_default=text("0"), server_onupdate=FetchedValue())
     
-    # Case-insensitive unique index on SKU
     __table_args__ = (
+        # Case-insensitive unique index on SKU
         Index('ix_products_sku_lower', func.lower(sku), unique=True),
+        # Change feed order
+        Index('ix_products_change', 'change_txid', 'change_seq'),
     )
     
     def __repr__(self):
@@ -51,3 +68,135 @@ class Webhook(Base):
     def __repr__(self):
         return f"<Webhook(id={self.id}, url='{self.url}', event_type='{self.event_type}')>"
 
+
+class ImportJob(Base):
+    """Ledger entry for one import, kept after its Redis progress expires."""
+    __tablename__ = "import_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String(36), nullable=False, unique=True, index=True)
+    file_name = Column(String(500), nullable=True)
+    file_size = Column(BigInteger, nullable=True)
+    file_format = Column(String(20), nullable=True)  # e.g. "csv", "ndjson+gzip", "parquet"
+    content_hash = Column(String(64), nullable=True, index=True)
+    client_id = Column(String(255), nullable=True, index=True)
+    feed_id = Column(Integer, ForeignKey("import_feeds.id", ondelete="SET NULL"), nullable=True, index=True)
+    batch_id = Column(String(36), nullable=True, index=True)  # ingest directory scan that claimed the file
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    message = Column(Text, nullable=True)
+    total_rows = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    created_count = Column(Integer, nullable=False, default=0)
+    updated_count = Column(Integer, nullable=False, default=0)
+    unchanged_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    removed_count = Column(Integer, nullable=False, default=0)
+    error_samples = Column(JSON, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    rows_per_sec = Column(Float, nullable=True)
+    stats = Column(JSON, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<ImportJob(task_id='{self.task_id}', status='{self.status}', file_name='{self.file_name}')>"
+
+
+class ImportFeed(Base):
+    """Named source of full catalog snapshots (e.g. one supplier)."""
+    __tablename__ = "import_feeds"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False, unique=True, index=True)
+    description = Column(Text, nullable=True)
+    missing_action = Column(SQLEnum(FeedMissingAction), nullable=False, default=FeedMissingAction.DEACTIVATE)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<ImportFeed(id={self.id}, name='{self.name}', missing_action='{self.missing_action}')>"
+
+
+class FeedSku(Base):
+    """SKU owned by a feed, with the last import that contained it."""
+    __tablename__ = "feed_skus"
+    
+    feed_id = Column(Integer, ForeignKey("import_feeds.id", ondelete="CASCADE"), primary_key=True)
+    sku_lower = Column(String(255), primary_key=True)
+    last_seen_task = Column(String(36), nullable=False)
+    
+    __table_args__ = (
+        # Lookups by SKU across feeds (shared ownership check)
+        Index('ix_feed_skus_sku_lower', 'sku_lower'),
+    )
+    
+    def __repr__(self):
+        return f"<FeedSku(feed_id={self.feed_id}, sku_lower='{self.sku_lower}')>"
+
+
+class ProductTombstone(Base):
+    """Deleted product, kept for the change feed until TOMBSTONE_RETENTION_DAYS have passed."""
+    __tablename__ = "product_tombstones"
+    
+    change_seq = Column(BigInteger, primary_key=True)
+    change_txid = Column(BigInteger, nullable=False)
+    product_id = Column(Integer, nullable=False)
+    sku = Column(String(255), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    
+    __table_args__ = (
+        Index('ix_product_tombstones_change', 'change_txid', 'change_seq'),
+    )
+    
+    def __repr__(self):
+        return f"<ProductTombstone(product_id={self.product_id}, sku='{self.sku}', change_seq={self.change_seq})>"
+
+
+class CatalogStats(Base):
+    """Product counts as of the last compaction (single row, id 1); pending changes are in catalog_stats_deltas."""
+    __tablename__ = "catalog_stats"
+    
+    id = Column(Integer, primary_key=True)
+    total = Column(BigInteger, nullable=False, default=0)
+    active = Column(BigInteger, nullable=False, default=0)
+    compacted_at = Column(DateTime(timezone=True), nullable=True)
+    reconciled_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<CatalogStats(total={self.total}, active={self.active})>"
+
+
+class CatalogStatsDelta(Base):
+    """Change of the product counts by one statement, written by triggers in the writing transaction."""
+    __tablename__ = "catalog_stats_deltas"
+    
+    id = Column(BigInteger, Identity(), primary_key=True)
+    total_delta = Column(BigInteger, nullable=False, default=0)
+    active_delta = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<CatalogStatsDelta(total_delta={self.total_delta}, active_delta={self.active_delta})>"
+
+
+class CatalogGeneration(Base):
+    """Catalog generation as of the last compaction (single row, id 1); pending bumps are in catalog_generation_bumps."""
+    __tablename__ = "catalog_generation"
+    
+    id = Column(Integer, primary_key=True)
+    generation = Column(BigInteger, nullable=False)
+    
+    def __repr__(self):
+        return f"<CatalogGeneration(generation={self.generation})>"
+
+
+class CatalogGenerationBump(Base):
+    """One statement that changed products, written by triggers in the writing transaction."""
+    __tablename__ = "catalog_generation_bumps"
+    
+    id = Column(BigInteger, Identity(), primary_key=True)
+    
+    def __repr__(self):
+        return f"<CatalogGenerationBump(id={self.id})>"
@@ -1,8 +1,8 @@
 """Pydantic schemas for request/response validation."""
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
-from app.models import WebhookEventType
+from app.models import WebhookEventType, FeedMissingAction
 
 
 class ProductBase(BaseModel):
@@ -50,6 +50,33 @@ class ProductListResponse(BaseModel):
     pages: int
 
 
+class CatalogStatsResponse(BaseModel):
+    """Product counts of the catalog."""
+    total: int
+    active: int
+    inactive: int
+    pending_deltas: int  # Statement deltas not yet compacted
+    compacted_at: Optional[datetime] = None
+    reconciled_at: Optional[datetime] = None
+    exact: bool  # Counted from the table (no maintained counts)
+
+
+class ProductChange(BaseModel):
+    """One entry of the product change feed."""
+    op: str  # "upsert" or "delete"
+    product_id: int
+    sku: str
+    change_seq: int
+    product: Optional[ProductResponse] = None  # Current state; None for deletes
+
+
+class ProductChangesResponse(BaseModel):
+    """Page of the product change feed."""
+    changes: List[ProductChange]
+    next_cursor: str
+    has_more: bool
+
+
 class WebhookBase(BaseModel):
     """Base webhook schema."""
     url: str = Field(..., min_length=1, max_length=1000)
@@ -98,6 +125,47 @@ class UploadResponse(BaseModel):
     """Schema for upload response."""
     task_id: str
     message: str
+    duplicate_of: Optional[str] = None
+    skipped: bool = False
+
+
+class UploadSessionCreate(BaseModel):
+    """Schema for starting a resumable upload session."""
+    file_name: str = Field(..., min_length=1, max_length=500)
+    file_size: int = Field(..., gt=0)
+    chunk_size: Optional[int] = None  # Default UPLOAD_SESSION_CHUNK_SIZE
+    feed: Optional[str] = None
+    stage: bool = False
+    dry_run: bool = False
+    skip_duplicates: bool = False
+
+
+class UploadSessionResponse(BaseModel):
+    """State of a resumable upload session."""
+    upload_id: str
+    file_name: str
+    file_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: List[int]
+    missing_chunks: List[int]
+    bytes_received: int
+    expires_in: int  # Seconds until the session expires without activity
+    task_id: Optional[str] = None  # Import created when the session was finalised
+
+
+class UploadChunkResponse(BaseModel):
+    """Schema for a stored chunk."""
+    upload_id: str
+    index: int
+    size: int
+    received_chunks: int
+    total_chunks: int
+
+
+class UploadSessionComplete(BaseModel):
+    """Schema for finalising an upload session."""
+    sha256: Optional[str] = None  # Optional SHA-256 of the whole file, checked before importing
 
 
 class ProgressResponse(BaseModel):
@@ -110,3 +178,109 @@ class ProgressResponse(BaseModel):
     message: Optional[str] = None
     errors: List[str] = []
 
+
+
+class ImportControlResponse(BaseModel):
+    """Schema for import cancel/pause/resume response."""
+    task_id: str
+    status: str
+    message: str
+
+
+class ImportJobResponse(BaseModel):
+    """Schema for an import job ledger entry."""
+    id: int
+    task_id: str
+    file_name: Optional[str] = None
+    file_size: Optional[int] = None
+    file_format: Optional[str] = None
+    content_hash: Optional[str] = None
+    client_id: Optional[str] = None
+    feed_id: Optional[int] = None
+    batch_id: Optional[str] = None
+    status: str
+    message: Optional[str] = None
+    total_rows: int
+    processed: int
+    created_count: int
+    updated_count: int
+    unchanged_count: int
+    error_count: int
+    removed_count: int
+    error_samples: Optional[List[str]] = None
+    duration_seconds: Optional[float] = None
+    rows_per_sec: Optional[float] = None
+    stats: Optional[Dict[str, Any]] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ImportJobListResponse(BaseModel):
+    """Schema for paginated import job list response."""
+    items: List[ImportJobResponse]
+    total: int
+    page: int
+    per_page: int
+    pages: int
+
+
+class ImportPreviewRow(BaseModel):
+    """Schema for a sample row of an import preview."""
+    row: Optional[int] = None
+    offset: Optional[int] = None
+    sku: str
+    name: str
+    description: str
+    error: Optional[str] = None
+
+
+class ImportPreviewResponse(BaseModel):
+    """Schema for an import preview (header mapping, sample rows, expected error rate)."""
+    task_id: str
+    file_name: Optional[str] = None
+    file_format: str
+    file_size: int
+    sample: str
+    columns: List[str]
+    mapping: Dict[str, Optional[str]]
+    missing_columns: List[str]
+    ignored_columns: List[str]
+    rows: List[ImportPreviewRow]
+    sample_errors: int
+    estimated_error_rate: Optional[float] = None
+    estimated_total_rows: Optional[int] = None
+    total_rows_exact: bool
+
+
+class FeedBase(BaseModel):
+    """Base import feed schema."""
+    name: str = Field(..., min_length=1, max_length=255)
+    description: Optional[str] = None
+    missing_action: FeedMissingAction = FeedMissingAction.DEACTIVATE
+
+
+class FeedCreate(FeedBase):
+    """Schema for creating an import feed."""
+    pass
+
+
+class FeedUpdate(BaseModel):
+    """Schema for updating an import feed."""
+    name: Optional[str] = Field(None, min_length=1, max_length=255)
+    description: Optional[str] = None
+    missing_action: Optional[FeedMissingAction] = None
+
+
+class FeedResponse(FeedBase):
+    """Schema for import feed response."""
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,139 @@
+"""Admission control for uploads, based on the import job ledger."""
+import math
+import os
+import shutil
+import redis
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import ImportJob
+from app.services.upload_sessions import open_session_bytes
+
+# Ledger statuses of imports holding a worker slot or waiting for one
+INFLIGHT_STATUSES = ("queued", "reading", "importing")
+# Paused and staged imports keep their file on disk until started, resumed or cancelled
+ON_DISK_STATUSES = INFLIGHT_STATUSES + ("paused", "staged", "validated")
+
+# Assumed import duration when there is no history yet
+DEFAULT_IMPORT_SECONDS = 60
+MAX_RETRY_AFTER_SECONDS = 3600
+
+
+def _recent(query, since: datetime):
+    return query.filter(ImportJob.updated_at >= since)
+
+
+def average_import_seconds(db: Session, sample: int = 20) -> float:
+    """Mean duration of the most recent completed imports."""
+    durations = db.query(ImportJob.duration_seconds).filter(
+        ImportJob.status == "completed",
+        ImportJob.duration_seconds.isnot(None)
+    ).order_by(ImportJob.id.desc()).limit(sample).all()
+    if not durations:
+        return DEFAULT_IMPORT_SECONDS
+    return sum(d for (d,) in durations) / len(durations)
+
+
+def _retry_after(seconds: float) -> int:
+    return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(seconds)))
+
+
+def queue_position(upload_size: int) -> Optional[int]:
+    """
+    Position an import of this size would take in its queue lane.
+    
+    Counts the messages waiting in the lane (see import_route_options())
+    at the import's priority or a higher one; imports already running are
+    not ahead of it.
+    
+    Returns:
+        1-based position, or None if the broker cannot be read
+    """
+    # Imported here: the task modules import this one
+    from app.tasks.celery_app import get_queue_depths
+    from app.tasks.import_tasks import import_route_options
+    
+    route = import_route_options(upload_size)
+    try:
+        waiting = get_queue_depths()[route["queue"]]["by_priority"]
+    except redis.RedisError:
+        return None
+    # Lower numbers are served first
+    return 1 + sum(count for step, count in waiting.items() if int(step) <= route["priority"])
+
+
+def check_admission(db: Session, upload_size: int, client_id: Optional[str]) -> Optional[Dict]:
+    """
+    Decide whether a new upload may be accepted.
+    
+    The checks read the ledger and are not atomic, so concurrent uploads
+    can overshoot a limit by a few imports; they exist to shed bursts,
+    not to enforce exact quotas.
+    
+    Args:
+        db: Database session
+        upload_size: Expected size of the upload in bytes (request Content-Length)
+        client_id: Client identifier for the per-client quota
+    
+    Returns:
+        None if the upload is admitted, otherwise a dict with the limit hit
+        (reason), a message (detail), retry_after seconds and queue_position
+        (see queue_position())
+    """
+    since = datetime.now(timezone.utc) - timedelta(seconds=settings.ADMISSION_STALE_SECONDS)
+    inflight = _recent(db.query(ImportJob).filter(ImportJob.status.in_(INFLIGHT_STATUSES)), since)
+    inflight_count = inflight.count()
+    
+    limit = settings.MAX_INFLIGHT_IMPORTS
+    if limit and inflight_count >= limit:
+        # A slot frees up roughly every (average duration / limit) seconds
+        excess = inflight_count - limit + 1
+        return {
+            "reason": "max_inflight_imports",
+            "detail": f"Too many imports in progress ({inflight_count}/{limit})",
+            "retry_after": _retry_after(average_import_seconds(db) * excess / limit),
+            "queue_position": queue_position(upload_size)
+        }
+    
+    client_limit = settings.MAX_INFLIGHT_IMPORTS_PER_CLIENT
+    if client_limit and client_id:
+        client_count = inflight.filter(ImportJob.client_id == client_id).count()
+        if client_count >= client_limit:
+            return {
+                "reason": "max_inflight_imports_per_client",
+                "detail": f"Too many imports in progress for this client ({client_count}/{client_limit})",
+                "retry_after": _retry_after(average_import_seconds(db)),
+                "queue_position": queue_position(upload_size)
+            }
+    
+    max_bytes = settings.MAX_QUEUED_BYTES
+    if max_bytes:
+        queued_bytes = _recent(
+            db.query(func.coalesce(func.sum(ImportJob.file_size), 0)).filter(
+                ImportJob.status.in_(ON_DISK_STATUSES)
+            ),
+            since
+        ).scalar() + open_session_bytes()
+        if queued_bytes + upload_size > max_bytes:
+            return {
+                "reason": "max_queued_bytes",
+                "detail": f"Too much data waiting to be imported ({queued_bytes} bytes queued)",
+                "retry_after": _retry_after(average_import_seconds(db)),
+                "queue_position": queue_position(upload_size)
+            }
+    
+    min_free = settings.MIN_FREE_DISK_BYTES
+    if min_free:
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        free = shutil.disk_usage(settings.UPLOAD_DIR).free
+        if free - upload_size < min_free:
+            return {
+                "reason": "min_free_disk_bytes",
+                "detail": "Not enough free disk space for uploads",
+                "retry_after": _retry_after(average_import_seconds(db)),
+                "queue_position": queue_position(upload_size)
+            }
+    
+    return None
@@ -0,0 +1,135 @@
+"""Catalog statistics: total, active and inactive product counts without counting the table.
+
+On Postgres, statement-level triggers on products append one row per
+INSERT, UPDATE or DELETE statement to catalog_stats_deltas, in the writing
+transaction. The counts are the catalog_stats row plus the pending deltas;
+compaction folds the deltas into the row every CATALOG_STATS_COMPACT_SECONDS,
+so reading them costs the same for any catalog size. Reconciliation counts
+the table now and then and records any drift as a correcting delta.
+"""
+from datetime import datetime, timezone
+from typing import Dict
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models import Product, CatalogStats, CatalogStatsDelta
+
+STATS_ROW_ID = 1
+
+
+def _counts_statement():
+    """Base counts plus pending deltas, in one statement so both come from the same snapshot."""
+    pending = select(
+        func.coalesce(func.sum(CatalogStatsDelta.total_delta), 0).label("total"),
+        func.coalesce(func.sum(CatalogStatsDelta.active_delta), 0).label("active"),
+        func.count().label("pending"),
+    ).subquery()
+    return select(
+        (CatalogStats.total + pending.c.total).label("total"),
+        (CatalogStats.active + pending.c.active).label("active"),
+        pending.c.pending,
+        CatalogStats.compacted_at,
+        CatalogStats.reconciled_at,
+    ).select_from(CatalogStats).join(pending, text("true")).where(CatalogStats.id == STATS_ROW_ID)
+
+
+def _exact_counts_statement():
+    return select(
+        func.count().label("total"),
+        func.count().filter(Product.active.is_(True)).label("active"),
+    ).select_from(Product)
+
+
+async def get_catalog_stats_async(db: AsyncSession) -> Dict:
+    """
+    Total, active and inactive product counts.
+    
+    Without the triggers (not Postgres) the products table is counted.
+    
+    Returns:
+        Dict with total, active, inactive, pending_deltas, compacted_at,
+        reconciled_at and exact (whether the table was counted)
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        row = (await db.execute(_counts_statement())).one_or_none()
+        if row is not None:
+            # sum() of bigint is numeric on Postgres
+            total, active = int(row.total), int(row.active)
+            return {
+                "total": total,
+                "active": active,
+                "inactive": total - active,
+                "pending_deltas": row.pending,
+                "compacted_at": row.compacted_at,
+                "reconciled_at": row.reconciled_at,
+                "exact": False,
+            }
+    row = (await db.execute(_exact_counts_statement())).one()
+    return {
+        "total": row.total,
+        "active": row.active,
+        "inactive": row.total - row.active,
+        "pending_deltas": 0,
+        "compacted_at": None,
+        "reconciled_at": None,
+        "exact": True,
+    }
+
+
+def compact_catalog_stats(db: Session) -> int:
+    """
+    Fold pending deltas into the catalog_stats row (Postgres only).
+    
+    Deltas committed while this runs stay pending for the next compaction.
+    
+    Returns:
+        Number of deltas folded
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return 0
+    folded = db.execute(text("""
+        WITH folded AS (
+            DELETE FROM catalog_stats_deltas RETURNING total_delta, active_delta
+        ), sums AS (
+            SELECT count(*) AS n, coalesce(sum(total_delta), 0) AS total, coalesce(sum(active_delta), 0) AS active
+            FROM folded
+        )
+        UPDATE catalog_stats
+        SET total = catalog_stats.total + sums.total,
+            active = catalog_stats.active + sums.active,
+            compacted_at = now()
+        FROM sums
+        WHERE catalog_stats.id = :id
+        RETURNING sums.n
+    """), {"id": STATS_ROW_ID}).scalar()
+    db.commit()
+    return folded or 0
+
+
+def reconcile_catalog_stats(db: Session) -> Dict:
+    """
+    Count the products table and correct any drift of the maintained counts (Postgres only).
+    
+    The table count and the maintained counts are read in one REPEATABLE
+    READ snapshot, so writes committing meanwhile are in neither, and the
+    difference is recorded as a delta.
+    
+    Returns:
+        Dict with the total and active drift that was corrected
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return {"total_drift": 0, "active_drift": 0}
+    db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    exact = db.execute(_exact_counts_statement()).one()
+    maintained = db.execute(_counts_statement()).one()
+    drift = {
+        "total_drift": exact.total - int(maintained.total),
+        "active_drift": exact.active - int(maintained.active),
+    }
+    if drift["total_drift"] or drift["active_drift"]:
+        db.add(CatalogStatsDelta(total_delta=drift["total_drift"], active_delta=drift["active_drift"]))
+    db.query(CatalogStats).filter(CatalogStats.id == STATS_ROW_ID).update(
+        {"reconciled_at": datetime.now(timezone.utc)}, synchronize_session=False
+    )
+    db.commit()
+    return drift
@@ -0,0 +1,222 @@
+"""Product change feed: products written and deleted since a cursor, and tombstone pruning."""
+import asyncio
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import redis
+from sqlalchemy import delete, func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import CatalogGeneration, CatalogGenerationBump, Product, ProductTombstone
+
+# Feed position below which tombstones have been pruned
+PRUNED_THROUGH_KEY = "product_tombstones:pruned_through"
+
+OP_UPSERT = "upsert"
+OP_DELETE = "delete"
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def _client() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+class CursorExpiredError(Exception):
+    """Tombstones the cursor has not seen were pruned; the client has to resync."""
+
+
+def encode_cursor(position: Tuple[int, int]) -> str:
+    """Opaque cursor of a (change_txid, change_seq) feed position."""
+    return base64.urlsafe_b64encode(f"{position[0]}:{position[1]}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Feed position of a cursor.
+    
+    Raises:
+        ValueError: The cursor was not issued by encode_cursor()
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        txid, seq = raw.split(":")
+        return int(txid), int(seq)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def _pruned_through() -> Optional[Tuple[int, int]]:
+    value = _client().get(PRUNED_THROUGH_KEY)
+    return decode_cursor(value.decode()) if value else None
+
+
+async def _visible_horizon(db: AsyncSession) -> Optional[int]:
+    """
+    Oldest transaction still running on Postgres (None elsewhere).
+    
+    Sequence values are taken before commit, so a later position can become
+    visible before an earlier one. Only changes of transactions older than
+    every running one are returned; they are all committed, and any write
+    that commits later has a larger change_txid.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    return await db.scalar(text("SELECT txid_snapshot_xmin(txid_current_snapshot())"))
+
+
+async def get_changes_async(db: AsyncSession, cursor: Optional[str] = None, limit: int = 500) -> Dict:
+    """
+    Products written and deleted after a cursor, in change feed order.
+    
+    A product appears once, with its current state, however often it
+    changed since the cursor; a product deactivated by a feed snapshot
+    comes as a delete (its tombstone follows the update), until it is
+    written again. Both queries walk the (change_txid,
+    change_seq) indexes from the cursor, so a sync costs what changed, not
+    the catalog size.
+    
+    Args:
+        db: Async database session (primary)
+        cursor: Cursor of a previous page; None starts from the beginning
+        limit: Maximum number of changes
+    
+    Returns:
+        Dict with changes (op, product_id, sku, product or None for deletes),
+        next_cursor and has_more
+    
+    Raises:
+        ValueError: Invalid cursor
+        CursorExpiredError: Tombstones after the cursor were pruned
+    """
+    position = decode_cursor(cursor) if cursor else (0, 0)
+    pruned_through = await asyncio.to_thread(_pruned_through)
+    if cursor and pruned_through and position < pruned_through:
+        raise CursorExpiredError(
+            f"Cursor is older than the {settings.TOMBSTONE_RETENTION_DAYS}-day tombstone retention"
+        )
+    
+    horizon = await _visible_horizon(db)
+    
+    def window(model):
+        filters = [tuple_(model.change_txid, model.change_seq) > tuple_(*position)]
+        if horizon is not None:
+            filters.append(model.change_txid < horizon)
+        return (
+            select(model).where(*filters)
+            .order_by(model.change_txid, model.change_seq).limit(limit + 1)
+        )
+    
+    products = list(await db.scalars(window(Product)))
+    tombstones = list(await db.scalars(window(ProductTombstone)))
+    
+    changes: List[Tuple[Tuple[int, int], Dict]] = [
+        ((p.change_txid, p.change_seq), {"op": OP_UPSERT, "product_id": p.id, "sku": p.sku, "product": p})
+        for p in products
+    ]
+    changes += [
+        ((t.change_txid, t.change_seq), {"op": OP_DELETE, "product_id": t.product_id, "sku": t.sku, "product": None})
+        for t in tombstones
+    ]
+    changes.sort(key=lambda change: change[0])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    
+    if changes:
+        position = changes[-1][0]
+    # Only the last change of a product on the page (an update followed by
+    # its deactivation tombstone)
+    last = {change["product_id"]: key for key, change in changes}
+    changes = [(key, change) for key, change in changes if last[change["product_id"]] == key]
+    return {
+        "changes": [dict(change, change_seq=key[1]) for key, change in changes],
+        "next_cursor": encode_cursor(position),
+        "has_more": has_more,
+    }
+
+
+async def get_catalog_generation_async(db: AsyncSession) -> Optional[int]:
+    """
+    Number that changes whenever a product is created, updated or deleted.
+    
+    Statement-level triggers append a row to catalog_generation_bumps for
+    every statement that changes products, in the writing transaction; the
+    generation is the catalog_generation row plus the bumps not yet
+    compacted, read in one statement. Every commit that writes products
+    adds at least one bump, whatever the commit order, and compaction moves
+    bumps into the row without changing the sum. Read from the session's
+    own database (primary or replica), so it matches the data the session
+    reads. None without the row (schemas built without migrations).
+    
+    Args:
+        db: Async database session the response data is read with
+    
+    Returns:
+        Catalog generation, or None if there is none
+    """
+    pending = select(func.count()).select_from(CatalogGenerationBump).scalar_subquery()
+    return await db.scalar(
+        select(CatalogGeneration.generation + pending).where(CatalogGeneration.id == 1)
+    )
+
+
+def compact_catalog_generation(db: Session) -> int:
+    """
+    Fold pending generation bumps into the catalog_generation row (Postgres only).
+    
+    Keeps the bumps a generation read counts few. Bumps committed while
+    this runs stay pending for the next compaction.
+    
+    Returns:
+        Number of bumps folded
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return 0
+    folded = db.execute(text("""
+        WITH folded AS (
+            DELETE FROM catalog_generation_bumps RETURNING id
+        ), sums AS (
+            SELECT count(*) AS n FROM folded
+        )
+        UPDATE catalog_generation
+        SET generation = catalog_generation.generation + sums.n
+        FROM sums
+        WHERE catalog_generation.id = 1
+        RETURNING sums.n
+    """)).scalar()
+    db.commit()
+    return folded or 0
+
+
+def prune_tombstones(db: Session) -> int:
+    """
+    Delete tombstones older than TOMBSTONE_RETENTION_DAYS.
+    
+    Records the newest pruned position first, so a cursor from before it
+    gets CursorExpiredError instead of silently missing deletes.
+    
+    Returns:
+        Number of tombstones deleted
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+    newest = db.query(ProductTombstone.change_txid, ProductTombstone.change_seq).filter(
+        ProductTombstone.deleted_at < cutoff
+    ).order_by(ProductTombstone.change_txid.desc(), ProductTombstone.change_seq.desc()).first()
+    if newest is None:
+        return 0
+    
+    pruned_through = _pruned_through()
+    if pruned_through is None or tuple(newest) > pruned_through:
+        _client().set(PRUNED_THROUGH_KEY, encode_cursor(tuple(newest)))
+    count = db.execute(
+        delete(ProductTombstone).where(
+            tuple_(ProductTombstone.change_txid, ProductTombstone.change_seq) <= tuple_(*newest)
+        )
+    ).rowcount
+    db.commit()
+    return count
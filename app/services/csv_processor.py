@@ -1,8 +1,23 @@
 """CSV processing service."""
 import csv
 import io
-from typing import Iterator, Dict, List, Optional
+import itertools
+import time
+import logging
+from typing import BinaryIO, Iterator, Dict, List, Optional, TextIO
 from app.models import Product
+from app.services.import_stats import ImportStageStats
+
+logger = logging.getLogger(__name__)
+
+# Engines for iter_csv_batches()
+CSV_ENGINE_ROWS = "rows"          # dict per row: parse_csv_text + validate_csv_row + row_to_product_dict
+CSV_ENGINE_BATCHED = "batched"    # csv.reader, header resolved once, rows validated as column arrays
+CSV_ENGINE_PYARROW = "pyarrow"    # pyarrow's CSV reader (optional dependency), same validation
+CSV_ENGINES = (CSV_ENGINE_ROWS, CSV_ENGINE_BATCHED, CSV_ENGINE_PYARROW)
+
+# Rows per validated batch
+CSV_BATCH_ROWS = 10000
 
 
 def parse_csv_file(file_content: bytes) -> Iterator[Dict[str, str]]:
@@ -16,7 +31,33 @@ def parse_csv_file(file_content: bytes) -> Iterator[Dict[str, str]]:
         Dictionary with row data (keys are lowercase column names)
     """
     text_content = file_content.decode('utf-8-sig')  # Handle BOM
-    reader = csv.DictReader(io.StringIO(text_content))
+    return parse_csv_text(text_content)
+
+
+def parse_csv_text(text_content: str) -> Iterator[Dict[str, str]]:
+    """
+    Parse decoded CSV text and yield rows as dictionaries.
+    
+    Args:
+        text_content: CSV file content as text
+        
+    Yields:
+        Dictionary with row data (keys are lowercase column names)
+    """
+    return parse_csv_stream(io.StringIO(text_content))
+
+
+def parse_csv_stream(text_stream: TextIO) -> Iterator[Dict[str, str]]:
+    """
+    Parse CSV from a text stream and yield rows as dictionaries.
+    
+    Args:
+        text_stream: Text stream opened with newline=''
+        
+    Yields:
+        Dictionary with row data (keys are lowercase column names)
+    """
+    reader = csv.DictReader(text_stream)
     
     for row in reader:
         # Normalize keys to lowercase and strip whitespace
@@ -79,3 +120,245 @@ def row_to_product_dict(row: Dict[str, str]) -> Dict:
         'active': True  # Default to active
     }
 
+
+class RowBatch:
+    """
+    A block of CSV rows after validation and normalisation.
+    
+    products are ready for bulk_upsert_products(); errors use the same
+    messages and 1-based data row numbers as validate_csv_row().
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.products: List[Dict] = []
+        self.errors: List[str] = []
+        # Lowercased SKUs of rows rejected for another reason (e.g. missing name)
+        self.rejected_skus: List[str] = []
+
+
+def resolve_columns(header: List[str]) -> Dict[str, int]:
+    """
+    Map normalised column names to their position in the header.
+    
+    Matches parse_csv_text(): names are lowercased and stripped, empty
+    names are ignored and when a name repeats the last column wins.
+    """
+    positions = {}
+    for idx, name in enumerate(header):
+        key = name.lower().strip()
+        if key:
+            positions[key] = idx
+    return positions
+
+
+def validate_columns(
+    batch: RowBatch,
+    first_row_number: int,
+    skus: List[str],
+    names: List[str],
+    descriptions: List[str]
+) -> RowBatch:
+    """
+    Validate one block of rows given as raw column arrays.
+    
+    Same rules and messages as validate_csv_row() and row_to_product_dict().
+    
+    Args:
+        batch: Batch to append products and errors to
+        first_row_number: Row number of the first row of the block
+        skus, names, descriptions: Raw values, '' when absent
+    
+    Returns:
+        The batch
+    """
+    products = batch.products
+    errors = batch.errors
+    row_number = first_row_number
+    for sku, name, description in zip(
+        map(str.strip, skus), map(str.strip, names), map(str.strip, descriptions)
+    ):
+        if not sku:
+            errors.append(f"Row {row_number}: SKU is required")
+        elif not name:
+            errors.append(f"Row {row_number}: Name is required")
+            batch.rejected_skus.append(sku.lower())
+        else:
+            products.append({
+                'sku': sku,
+                'name': name,
+                'description': description or None,
+                'active': True
+            })
+        row_number += 1
+    batch.rows += len(skus)
+    return batch
+
+
+def _column(block: List[List[str]], idx: Optional[int]) -> List[str]:
+    """Values of one column; '' for rows too short to have it."""
+    if idx is None:
+        return [''] * len(block)
+    return [row[idx] if len(row) > idx else '' for row in block]
+
+
+def record_block_stats(stats: Optional[ImportStageStats], rows: int, parse_seconds: float, validate_seconds: float):
+    """Add the parse and validate time of one block of rows to the import stats."""
+    if stats is not None:
+        stats.add("parse", parse_seconds, rows)
+        stats.add("validate", validate_seconds, rows)
+
+
+def _batched_engine(stream: BinaryIO, batch_size: int, stats: Optional[ImportStageStats]) -> Iterator[RowBatch]:
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))  # Handle BOM
+    header = next(reader, None)
+    if header is None:
+        return
+    positions = resolve_columns(header)
+    sku_idx, name_idx, desc_idx = (positions.get(key) for key in ('sku', 'name', 'description'))
+    rows = filter(None, reader)  # DictReader skips blank lines too
+    row_number = 1
+    while True:
+        start = time.perf_counter()
+        block = list(itertools.islice(rows, batch_size))
+        parsed = time.perf_counter()
+        if not block:
+            return
+        batch = validate_columns(
+            RowBatch(),
+            row_number,
+            _column(block, sku_idx),
+            _column(block, name_idx),
+            _column(block, desc_idx)
+        )
+        record_block_stats(stats, len(block), parsed - start, time.perf_counter() - parsed)
+        row_number += len(block)
+        yield batch
+
+
+def _rows_engine(stream: BinaryIO, batch_size: int, stats: Optional[ImportStageStats]) -> Iterator[RowBatch]:
+    rows = parse_csv_stream(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))  # Handle BOM
+    row_number = 1
+    while True:
+        start = time.perf_counter()
+        block = list(itertools.islice(rows, batch_size))
+        parsed = time.perf_counter()
+        if not block:
+            return
+        batch = RowBatch()
+        for idx, row in enumerate(block, start=row_number):
+            is_valid, error_msg = validate_csv_row(row, idx)
+            if not is_valid:
+                batch.errors.append(error_msg)
+                if row.get('sku'):
+                    batch.rejected_skus.append(row['sku'].strip().lower())
+                continue
+            try:
+                batch.products.append(row_to_product_dict(row))
+            except Exception as e:
+                batch.errors.append(f"Row {idx}: {str(e)}")
+        batch.rows = len(block)
+        record_block_stats(stats, len(block), parsed - start, time.perf_counter() - parsed)
+        row_number += len(block)
+        yield batch
+
+
+def _pyarrow_engine(stream: BinaryIO, stats: Optional[ImportStageStats]) -> Iterator[RowBatch]:
+    """
+    Parse with pyarrow's multithreaded CSV reader, validate in Python.
+    
+    Differs from the other engines on malformed input: a row whose field
+    count differs from the header is rejected as a whole (reported with
+    its line number in the file) and is not counted in the row numbers of
+    the rows after it. The header must fit on one line.
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    
+    header = next(csv.reader([stream.readline().decode('utf-8-sig')]), None)
+    if not header:
+        return
+    positions = resolve_columns(header)
+    column_names = [f"c{idx}" for idx in range(len(header))]
+    wanted = {key: column_names[positions[key]] for key in ('sku', 'name', 'description') if key in positions}
+    
+    malformed = []
+    
+    def on_invalid_row(row):
+        malformed.append(
+            f"Line {row.number}: expected {row.expected_columns} fields, found {row.actual_columns}"
+        )
+        return 'skip'
+    
+    reader = pa_csv.open_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(column_names=column_names),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=on_invalid_row),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in column_names},
+            include_columns=list(wanted.values()) or column_names[:1]
+        )
+    )
+    row_number = 1
+    while True:
+        start = time.perf_counter()
+        try:
+            record_batch = reader.read_next_batch()
+        except StopIteration:
+            break
+        parsed = time.perf_counter()
+        count = record_batch.num_rows
+        
+        def column(key):
+            if key not in wanted:
+                return [''] * count
+            return record_batch.column(wanted[key]).to_pylist()
+        
+        batch = validate_columns(RowBatch(), row_number, column('sku'), column('name'), column('description'))
+        batch.errors.extend(malformed)
+        malformed.clear()
+        record_block_stats(stats, count, parsed - start, time.perf_counter() - parsed)
+        row_number += count
+        yield batch
+    if malformed:
+        batch = RowBatch()
+        batch.errors.extend(malformed)
+        yield batch
+
+
+def iter_csv_batches(
+    stream: BinaryIO,
+    engine: str = CSV_ENGINE_BATCHED,
+    batch_size: int = CSV_BATCH_ROWS,
+    stats: Optional[ImportStageStats] = None
+) -> Iterator[RowBatch]:
+    """
+    Parse, validate and normalise a CSV file in blocks of rows.
+    
+    The file is decoded and parsed incrementally; it is never held in
+    memory as a whole. The pyarrow engine falls back to the batched engine
+    when pyarrow is not installed.
+    
+    Args:
+        stream: Binary stream of the CSV file
+        engine: One of CSV_ENGINES
+        batch_size: Rows per batch (pyarrow uses its own block size)
+        stats: Optional import stats; parsing and validation are timed as
+            the "parse" and "validate" stages
+    
+    Yields:
+        RowBatch per block of rows
+    """
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine '{engine}', expected one of {', '.join(CSV_ENGINES)}")
+    if engine == CSV_ENGINE_PYARROW:
+        try:
+            import pyarrow.csv  # noqa: F401
+        except ImportError:
+            logger.warning("pyarrow is not installed; using the batched CSV engine")
+            engine = CSV_ENGINE_BATCHED
+        else:
+            return _pyarrow_engine(stream, stats)
+    if engine == CSV_ENGINE_ROWS:
+        return _rows_engine(stream, batch_size, stats)
+    return _batched_engine(stream, batch_size, stats)
@@ -0,0 +1,98 @@
+"""Import feed service: SKU ownership and removal of products missing from a snapshot."""
+from typing import Dict, Iterable, Optional
+from sqlalchemy import func, select, insert, update, delete, exists
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, aliased
+from app.config import settings
+from app.models import Product, ProductTombstone, ImportFeed, FeedSku, FeedMissingAction
+
+
+def get_feed_by_name(db: Session, name: str) -> Optional[ImportFeed]:
+    """Get an import feed by name."""
+    return db.query(ImportFeed).filter(ImportFeed.name == name).first()
+
+
+def mark_feed_skus(db: Session, feed_id: int, task_id: str, skus_lower: Iterable[str]) -> None:
+    """
+    Record that a feed's current import contains these SKUs.
+    
+    One INSERT ... ON CONFLICT DO UPDATE per call; SKUs must already be
+    lowercased and unique. Rows are written in SKU order, like product
+    chunks, so concurrent imports lock them in the same order.
+    """
+    rows = [{"feed_id": feed_id, "sku_lower": sku, "last_seen_task": task_id} for sku in sorted(skus_lower)]
+    if not rows:
+        return
+    
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(FeedSku).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FeedSku.feed_id, FeedSku.sku_lower],
+        set_={"last_seen_task": stmt.excluded.last_seen_task}
+    )
+    db.execute(stmt)
+    db.commit()
+
+
+def reconcile_feed(db: Session, feed: ImportFeed, task_id: str) -> Dict:
+    """
+    Deactivate or delete products that the feed owned but its latest snapshot lacks.
+    
+    Runs after a snapshot import has marked every SKU it contained with its
+    task_id. Everything happens in set-based statements inside one
+    transaction; no product rows are loaded into Python. On Postgres each
+    deactivated product also gets a tombstone, after its update in the
+    change feed, so sync clients drop it as they would a deleted one. SKUs
+    also owned by another feed are released from this feed but left
+    untouched. If more than
+    FEED_MAX_MISSING_RATIO of the feed's SKUs are missing (e.g. a truncated
+    file), nothing is removed.
+    
+    Args:
+        db: Database session
+        feed: Feed that was imported
+        task_id: Task that imported the snapshot
+    
+    Returns:
+        Dict with missing (SKUs not in the snapshot), removed (products
+        deactivated or deleted), action and skipped
+    """
+    missing_filter = (FeedSku.feed_id == feed.id, FeedSku.last_seen_task != task_id)
+    owned = db.query(func.count()).select_from(FeedSku).filter(FeedSku.feed_id == feed.id).scalar()
+    missing = db.query(func.count()).select_from(FeedSku).filter(*missing_filter).scalar()
+    result = {"missing": missing, "removed": 0, "action": feed.missing_action.value, "skipped": False}
+    if not missing:
+        return result
+    
+    max_ratio = settings.FEED_MAX_MISSING_RATIO
+    if max_ratio < 1 and missing > owned * max_ratio:
+        result["skipped"] = True
+        return result
+    
+    other = aliased(FeedSku)
+    missing_skus = select(FeedSku.sku_lower).where(
+        *missing_filter,
+        ~exists().where(other.sku_lower == FeedSku.sku_lower, other.feed_id != feed.id)
+    )
+    if feed.missing_action == FeedMissingAction.DELETE:
+        stmt = delete(Product).where(func.lower(Product.sku).in_(missing_skus))
+    else:
+        stmt = update(Product).where(
+            func.lower(Product.sku).in_(missing_skus),
+            Product.active.is_(True)
+        ).values(active=False)
+        if db.get_bind().dialect.name == "postgresql":
+            # Same positions as the tombstones of deletes (products_record_tombstones)
+            deactivated = stmt.returning(Product.id, Product.sku).cte("deactivated")
+            stmt = insert(ProductTombstone).from_select(
+                ["change_seq", "change_txid", "product_id", "sku"],
+                select(
+                    func.nextval("product_change_seq"), func.txid_current(), deactivated.c.id, deactivated.c.sku
+                )
+            )
+    result["removed"] = db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    
+    # The feed no longer owns what its latest snapshot lacked
+    db.execute(delete(FeedSku).where(*missing_filter))
+    db.commit()
+    return result
@@ -0,0 +1,234 @@
+"""Import file formats: content-based detection and readers producing validated row batches."""
+import gzip
+import io
+import itertools
+import json
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from app.services.csv_processor import (
+    RowBatch, CSV_BATCH_ROWS, CSV_ENGINE_BATCHED,
+    iter_csv_batches, record_block_stats, resolve_columns, validate_columns
+)
+from app.services.import_stats import ImportStageStats
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+FORMAT_PARQUET = "parquet"
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+PARQUET_MAGIC = b"PAR1"
+UTF8_BOM = b"\xef\xbb\xbf"
+
+# Bytes inspected (after decompression) to tell NDJSON from CSV
+SNIFF_BYTES = 4096
+
+
+class UnsupportedFormatError(ValueError):
+    """The file's format is recognised but cannot be imported here."""
+
+
+def _zstd_reader(raw: BinaryIO) -> BinaryIO:
+    try:
+        import zstandard
+    except ImportError:
+        raise UnsupportedFormatError("zstd-compressed files need the zstandard package")
+    return zstandard.ZstdDecompressor().stream_reader(raw)
+
+
+@contextmanager
+def open_import_file(file_path: str, compression: Optional[str]) -> Iterator[BinaryIO]:
+    """Open an import file, decompressing it as a stream when needed."""
+    with open(file_path, 'rb') as raw:
+        if compression == COMPRESSION_GZIP:
+            with gzip.GzipFile(fileobj=raw) as stream:
+                yield stream
+        elif compression == COMPRESSION_ZSTD:
+            with _zstd_reader(raw) as stream:
+                yield stream
+        else:
+            yield raw
+
+
+def detect_format(file_path: str) -> Tuple[str, Optional[str]]:
+    """
+    Detect the format of an import file from its content, not its name.
+    
+    Returns:
+        Tuple of (format, compression); compression is None, "gzip" or "zstd"
+    
+    Raises:
+        UnsupportedFormatError: Compressed Parquet, or a missing optional
+            dependency (pyarrow for Parquet, zstandard for zstd)
+    """
+    with open(file_path, 'rb') as f:
+        magic = f.read(4)
+    
+    if magic == PARQUET_MAGIC:
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise UnsupportedFormatError("Parquet files need the pyarrow package")
+        return FORMAT_PARQUET, None
+    
+    compression = None
+    if magic.startswith(GZIP_MAGIC):
+        compression = COMPRESSION_GZIP
+    elif magic == ZSTD_MAGIC:
+        compression = COMPRESSION_ZSTD
+    
+    try:
+        with open_import_file(file_path, compression) as stream:
+            head = stream.read(SNIFF_BYTES)
+    except UnsupportedFormatError:
+        raise
+    except Exception as e:
+        raise UnsupportedFormatError(f"Could not decompress file: {str(e)}")
+    
+    if head.startswith(PARQUET_MAGIC):
+        raise UnsupportedFormatError("Compressed Parquet files are not supported; upload the .parquet file")
+    if head.startswith(UTF8_BOM):
+        head = head[len(UTF8_BOM):]
+    if head.lstrip().startswith(b"{"):
+        return FORMAT_NDJSON, compression
+    return FORMAT_CSV, compression
+
+
+def describe_format(file_format: str, compression: Optional[str]) -> str:
+    """Format label for the ledger and messages, e.g. "csv+gzip"."""
+    return f"{file_format}+{compression}" if compression else file_format
+
+
+def _text(value) -> str:
+    """Field value as CSV would carry it; '' for missing or null."""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _ndjson_batches(stream: BinaryIO, batch_size: int, stats: Optional[ImportStageStats]) -> Iterator[RowBatch]:
+    """
+    One JSON object per line; keys are matched like CSV headers.
+    
+    Blank lines are skipped and not numbered, as in CSV. A line that is not
+    a JSON object is reported as an error for its row.
+    """
+    lines = filter(str.strip, io.TextIOWrapper(stream, encoding='utf-8-sig'))
+    row_number = 1
+    while True:
+        start = time.perf_counter()
+        block = list(itertools.islice(lines, batch_size))
+        if not block:
+            return
+        batch = RowBatch()
+        validate_seconds = 0.0
+        # Rows are validated in runs of well-formed lines so numbering stays exact
+        run_start = row_number
+        skus: List[str] = []
+        names: List[str] = []
+        descriptions: List[str] = []
+        
+        def flush():
+            nonlocal validate_seconds
+            started = time.perf_counter()
+            validate_columns(batch, run_start, skus, names, descriptions)
+            validate_seconds += time.perf_counter() - started
+            skus.clear()
+            names.clear()
+            descriptions.clear()
+        
+        for line in block:
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                flush()
+                batch.errors.append(f"Row {row_number}: Invalid JSON ({str(e)})")
+                batch.rows += 1
+                row_number += 1
+                run_start = row_number
+                continue
+            fields = {}
+            for key, value in record.items():
+                fields[key.lower().strip()] = value
+            skus.append(_text(fields.get('sku')))
+            names.append(_text(fields.get('name')))
+            descriptions.append(_text(fields.get('description')))
+            row_number += 1
+        flush()
+        record_block_stats(stats, len(block), time.perf_counter() - start - validate_seconds, validate_seconds)
+        yield batch
+
+
+def _parquet_batches(file_path: str, batch_size: int, stats: Optional[ImportStageStats]) -> Iterator[RowBatch]:
+    """Read a Parquet file one record batch at a time (never the whole file)."""
+    import pyarrow.parquet as pq
+    
+    parquet_file = pq.ParquetFile(file_path)
+    names = parquet_file.schema_arrow.names
+    positions = resolve_columns(names)
+    wanted = {key: names[positions[key]] for key in ('sku', 'name', 'description') if key in positions}
+    
+    row_number = 1
+    batches = parquet_file.iter_batches(batch_size=batch_size, columns=list(wanted.values()) or None)
+    while True:
+        start = time.perf_counter()
+        record_batch = next(batches, None)
+        if record_batch is None:
+            return
+        parsed = time.perf_counter()
+        count = record_batch.num_rows
+        
+        def column(key):
+            if key not in wanted:
+                return [''] * count
+            return [_text(value) for value in record_batch.column(wanted[key]).to_pylist()]
+        
+        batch = validate_columns(RowBatch(), row_number, column('sku'), column('name'), column('description'))
+        record_block_stats(stats, count, parsed - start, time.perf_counter() - parsed)
+        row_number += count
+        yield batch
+
+
+def iter_import_batches(
+    file_path: str,
+    file_format: str,
+    compression: Optional[str] = None,
+    csv_engine: str = CSV_ENGINE_BATCHED,
+    batch_size: int = CSV_BATCH_ROWS,
+    stats: Optional[ImportStageStats] = None
+) -> Iterator[RowBatch]:
+    """
+    Validated row batches from an import file of any supported format.
+    
+    Compressed files are decompressed as a stream and Parquet files are read
+    one record batch at a time, so no format is loaded into memory whole.
+    
+    Args:
+        file_path: Path to the uploaded file
+        file_format: Format from detect_format()
+        compression: Compression from detect_format()
+        csv_engine: Engine for CSV files (see csv_processor.CSV_ENGINES)
+        batch_size: Rows per batch
+        stats: Optional import stats ("parse" and "validate" stages)
+    
+    Yields:
+        RowBatch per block of rows
+    """
+    if file_format == FORMAT_PARQUET:
+        yield from _parquet_batches(file_path, batch_size, stats)
+        return
+    with open_import_file(file_path, compression) as stream:
+        if file_format == FORMAT_NDJSON:
+            yield from _ndjson_batches(stream, batch_size, stats)
+        else:
+            yield from iter_csv_batches(stream, csv_engine, batch_size, stats)
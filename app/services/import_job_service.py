@@ -0,0 +1,202 @@
+"""Import job ledger service."""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import ImportJob
+
+# Errors kept on the ledger entry once the Redis progress document is gone
+MAX_ERROR_SAMPLES = 100
+
+
+def upload_file_path(task_id: str) -> str:
+    """Where the uploaded file of an import is kept until it has been imported."""
+    return os.path.join(settings.UPLOAD_DIR, f"{task_id}.upload")
+
+
+def create_import_job(
+    db: Session,
+    task_id: str,
+    file_name: Optional[str],
+    file_size: Optional[int],
+    content_hash: Optional[str],
+    status: str = "queued",
+    client_id: Optional[str] = None,
+    feed_id: Optional[int] = None,
+    file_format: Optional[str] = None,
+    message: Optional[str] = None,
+    batch_id: Optional[str] = None
+) -> ImportJob:
+    """Create the ledger entry for a newly queued import."""
+    job = ImportJob(
+        task_id=task_id,
+        file_name=file_name,
+        file_size=file_size,
+        file_format=file_format,
+        content_hash=content_hash,
+        client_id=client_id,
+        feed_id=feed_id,
+        batch_id=batch_id,
+        status=status,
+        message=message or "Task queued, waiting to start...",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_import_job(db: Session, task_id: str) -> Optional[ImportJob]:
+    """Get an import job by task ID."""
+    return db.query(ImportJob).filter(ImportJob.task_id == task_id).first()
+
+
+def find_completed_import(db: Session, content_hash: str, window_hours: int) -> Optional[ImportJob]:
+    """
+    Most recent completed import of a file with the same content.
+    
+    Args:
+        db: Database session
+        content_hash: SHA-256 of the uploaded file
+        window_hours: How far back to look
+    
+    Returns:
+        The matching job, or None
+    """
+    since = datetime.now(timezone.utc) - timedelta(hours=window_hours)
+    return db.query(ImportJob).filter(
+        ImportJob.content_hash == content_hash,
+        ImportJob.status == "completed",
+        ImportJob.created_at >= since
+    ).order_by(ImportJob.id.desc()).first()
+
+
+def find_newer_feed_import(db: Session, feed_id: int, task_id: str) -> Optional[ImportJob]:
+    """
+    A completed snapshot of the feed recorded after the given import.
+    
+    Args:
+        db: Database session
+        feed_id: Import feed
+        task_id: Task whose ledger entry the snapshot must be newer than
+    
+    Returns:
+        The newest such job, or None
+    """
+    own_id = db.query(ImportJob.id).filter(ImportJob.task_id == task_id).scalar_subquery()
+    return db.query(ImportJob).filter(
+        ImportJob.feed_id == feed_id,
+        ImportJob.status == "completed",
+        ImportJob.id > own_id
+    ).order_by(ImportJob.id.desc()).first()
+
+
+def update_import_job(db: Session, task_id: str, errors: List[str] = None, **fields) -> None:
+    """
+    Update counters and status of an import job.
+    
+    Args:
+        db: Database session
+        task_id: Task identifier
+        errors: Row errors so far; the count and the first MAX_ERROR_SAMPLES are stored
+        **fields: ImportJob columns to set
+    """
+    if errors is not None:
+        fields["error_count"] = len(errors)
+        fields["error_samples"] = errors[:MAX_ERROR_SAMPLES]
+    if fields:
+        db.query(ImportJob).filter(ImportJob.task_id == task_id).update(fields, synchronize_session=False)
+        db.commit()
+
+
+def claim_staged_import(db: Session, task_id: str, staged_statuses: tuple, **fields) -> bool:
+    """
+    Move a staged import on to another status, at most once.
+    
+    The status check and the update are one statement, so of two concurrent
+    requests to start the same import only one succeeds.
+    
+    Args:
+        db: Database session
+        task_id: Task identifier
+        staged_statuses: Statuses the import may be started from
+        **fields: ImportJob columns to set, including the new status
+    
+    Returns:
+        True if the import was staged and has been updated
+    """
+    claimed = db.query(ImportJob).filter(
+        ImportJob.task_id == task_id,
+        ImportJob.status.in_(staged_statuses)
+    ).update(fields, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+
+def list_import_jobs(
+    db: Session,
+    page: int = 1,
+    per_page: int = 50,
+    status: Optional[str] = None,
+    file_name: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    feed_id: Optional[int] = None,
+    batch_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> tuple[List[ImportJob], int]:
+    """
+    Get paginated import jobs, newest first, with optional filters.
+    
+    Returns:
+        Tuple of (jobs_list, total_count)
+    """
+    query = db.query(ImportJob)
+    
+    if status:
+        query = query.filter(ImportJob.status == status)
+    
+    if file_name:
+        query = query.filter(ImportJob.file_name.ilike(f"%{file_name}%"))
+    
+    if content_hash:
+        query = query.filter(ImportJob.content_hash == content_hash)
+    
+    if feed_id:
+        query = query.filter(ImportJob.feed_id == feed_id)
+    
+    if batch_id:
+        query = query.filter(ImportJob.batch_id == batch_id)
+    
+    if created_from:
+        query = query.filter(ImportJob.created_at >= created_from)
+    
+    if created_to:
+        query = query.filter(ImportJob.created_at < created_to)
+    
+    total = query.count()
+    
+    offset = (page - 1) * per_page
+    jobs = query.order_by(ImportJob.id.desc()).offset(offset).limit(per_page).all()
+    
+    return jobs, total
+
+
+def job_to_progress(job: ImportJob) -> Dict:
+    """Build a progress document from a ledger entry (after the Redis key expired)."""
+    # The live document counts valid rows only
+    total = max(job.total_rows - job.error_count, job.processed)
+    return {
+        "status": job.status,
+        "progress": job.processed,
+        "total": total,
+        "percentage": (job.processed / total * 100) if total else 0,
+        "message": job.message or "",
+        "errors": job.error_samples or [],
+        "error_count": job.error_count,
+        "rows_per_sec": job.rows_per_sec,
+        "elapsed_seconds": job.duration_seconds,
+        "stages": job.stats,
+        "source": "ledger",
+    }
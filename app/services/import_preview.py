@@ -0,0 +1,263 @@
+"""Import preview: header mapping, sample rows and expected error rate of an uploaded file."""
+import csv
+import json
+import os
+import random
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from app.services.csv_processor import RowBatch, resolve_columns, validate_columns
+from app.services.import_formats import (
+    FORMAT_CSV, FORMAT_NDJSON, FORMAT_PARQUET, UTF8_BOM,
+    detect_format, describe_format, open_import_file, _text
+)
+
+SAMPLE_HEAD = "head"
+SAMPLE_RANDOM = "random"
+SAMPLE_MODES = (SAMPLE_HEAD, SAMPLE_RANDOM)
+
+MAX_PREVIEW_ROWS = 200
+
+# Random offsets tried per requested row (a line hit twice is sampled once)
+RANDOM_TRIES_PER_ROW = 3
+# Parquet row groups read for a random sample
+MAX_PREVIEW_ROW_GROUPS = 4
+
+COLUMNS = ('sku', 'name', 'description')
+REQUIRED_COLUMNS = ('sku', 'name')
+
+
+def _preview_row(row: Optional[int], sku: str, name: str, description: str, offset: Optional[int] = None) -> Dict:
+    """One sample row with the error the import would report for it, if any."""
+    batch = validate_columns(RowBatch(), row or 0, [sku], [name], [description])
+    error = batch.errors[0].split(": ", 1)[1] if batch.errors else None
+    preview = {"row": row, "sku": sku, "name": name, "description": description, "error": error}
+    if offset is not None:
+        preview["offset"] = offset
+    return preview
+
+
+def _decoded_lines(stream: BinaryIO, consumed: List[int]) -> Iterator[str]:
+    """Decode a byte stream line by line, adding the bytes read to consumed[0]."""
+    first = True
+    for line in iter(stream.readline, b''):
+        consumed[0] += len(line)
+        if first and line.startswith(UTF8_BOM):
+            line = line[len(UTF8_BOM):]
+        first = False
+        yield line.decode('utf-8', errors='replace')
+
+
+def _csv_values(record: List[str], positions: Dict[str, int]) -> Tuple[str, str, str]:
+    return tuple(
+        record[positions[key]] if key in positions and len(record) > positions[key] else ''
+        for key in COLUMNS
+    )
+
+
+def _ndjson_values(line: str) -> Tuple[Optional[Tuple[str, str, str]], List[str], Optional[str]]:
+    """(values, keys, error) of one NDJSON line; values is None for invalid JSON."""
+    try:
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("expected a JSON object")
+    except ValueError as e:
+        return None, [], f"Invalid JSON ({str(e)})"
+    fields = {key.lower().strip(): value for key, value in record.items()}
+    return tuple(_text(fields.get(key)) for key in COLUMNS), list(record.keys()), None
+
+
+def _text_head(stream: BinaryIO, file_format: str, rows: int) -> Dict:
+    """First rows of a CSV or NDJSON stream, numbered like the import numbers them."""
+    consumed = [0]
+    lines = _decoded_lines(stream, consumed)
+    header: List[str] = []
+    header_bytes = 0
+    sample = []
+    if file_format == FORMAT_CSV:
+        reader = csv.reader(lines)
+        header = next(reader, None) or []
+        header_bytes = consumed[0]
+        positions = resolve_columns(header)
+        for record in filter(None, reader):
+            sample.append(_preview_row(len(sample) + 1, *_csv_values(record, positions)))
+            if len(sample) == rows:
+                break
+    else:
+        seen_keys: Dict[str, None] = {}
+        for line in filter(str.strip, lines):
+            values, keys, error = _ndjson_values(line)
+            seen_keys.update(dict.fromkeys(keys))
+            if values is None:
+                sample.append({"row": len(sample) + 1, "sku": "", "name": "", "description": "", "error": error})
+            else:
+                sample.append(_preview_row(len(sample) + 1, *values))
+            if len(sample) == rows:
+                break
+        header = list(seen_keys)
+    at_end = len(sample) < rows or not any(line.strip() for line in iter(stream.readline, b''))
+    return {
+        "columns": header,
+        "rows": sample,
+        "header_bytes": header_bytes,
+        "average_row_bytes": (consumed[0] - header_bytes) / len(sample) if sample else None,
+        "exact_total": len(sample) if at_end else None,
+    }
+
+
+def _text_random(f: BinaryIO, file_format: str, file_size: int, rows: int, rng: random.Random) -> Dict:
+    """
+    Rows at random byte offsets of an uncompressed CSV or NDJSON file.
+    
+    Each offset is moved forward to the start of the next line, so the cost
+    does not depend on the file size. A CSV value spanning several lines
+    (quoted newline) can be sampled from the middle and misparsed.
+    """
+    consumed = [0]
+    header: List[str] = []
+    if file_format == FORMAT_CSV:
+        header = next(csv.reader(_decoded_lines(f, consumed)), None) or []
+    data_start = consumed[0]
+    positions = resolve_columns(header)
+    
+    lines: Dict[int, bytes] = {}
+    if file_size > data_start:
+        for _ in range(rows * RANDOM_TRIES_PER_ROW):
+            offset = rng.randrange(data_start, file_size)
+            # Landing right after a newline keeps that line
+            f.seek(max(offset - 1, data_start))
+            if offset > data_start:
+                f.readline()
+            start = f.tell()
+            line = f.readline()
+            if line.strip():
+                lines[start] = line
+                if len(lines) == rows:
+                    break
+    
+    sample = []
+    seen_keys: Dict[str, None] = {}
+    for start in sorted(lines):
+        line = lines[start].decode('utf-8', errors='replace')
+        if file_format == FORMAT_CSV:
+            record = next(csv.reader([line]), [])
+            sample.append(_preview_row(None, *_csv_values(record, positions), offset=start))
+            continue
+        values, keys, error = _ndjson_values(line)
+        seen_keys.update(dict.fromkeys(keys))
+        if values is None:
+            sample.append({"row": None, "sku": "", "name": "", "description": "", "error": error, "offset": start})
+        else:
+            sample.append(_preview_row(None, *values, offset=start))
+    if file_format == FORMAT_NDJSON:
+        header = list(seen_keys)
+    # A line is picked by the length of the line before it, so its own
+    # length is not biased and the plain mean estimates the row size
+    average = sum(map(len, lines.values())) / len(lines) if lines else None
+    return {
+        "columns": header,
+        "rows": sample,
+        "header_bytes": data_start,
+        "average_row_bytes": average,
+        "exact_total": 0 if file_size <= data_start else None,
+    }
+
+
+def _parquet_preview(file_path: str, sample: str, rows: int, rng: random.Random) -> Dict:
+    """First rows, or rows from random row groups, of a Parquet file; the row count comes from its footer."""
+    import pyarrow.parquet as pq
+    
+    parquet_file = pq.ParquetFile(file_path)
+    names = parquet_file.schema_arrow.names
+    positions = resolve_columns(names)
+    wanted = {key: names[positions[key]] for key in COLUMNS if key in positions}
+    metadata = parquet_file.metadata
+    
+    def values(table, idx):
+        return tuple(
+            _text(table.column(wanted[key])[idx].as_py()) if key in wanted else ''
+            for key in COLUMNS
+        )
+    
+    preview_rows = []
+    if sample == SAMPLE_RANDOM and metadata.num_row_groups:
+        groups = sorted(rng.sample(range(metadata.num_row_groups), min(MAX_PREVIEW_ROW_GROUPS, metadata.num_row_groups)))
+        first_row = [0]
+        for idx in range(metadata.num_row_groups):
+            first_row.append(first_row[-1] + metadata.row_group(idx).num_rows)
+        per_group = -(-rows // len(groups))
+        for group in groups:
+            table = parquet_file.read_row_group(group, columns=list(wanted.values()) or None)
+            for idx in sorted(rng.sample(range(table.num_rows), min(per_group, table.num_rows))):
+                preview_rows.append(_preview_row(first_row[group] + idx + 1, *values(table, idx)))
+        preview_rows = preview_rows[:rows]
+    else:
+        batch = next(parquet_file.iter_batches(batch_size=rows, columns=list(wanted.values()) or None), None)
+        for idx in range(batch.num_rows if batch is not None else 0):
+            preview_rows.append(_preview_row(idx + 1, *values(batch, idx)))
+    return {"columns": names, "rows": preview_rows, "exact_total": metadata.num_rows}
+
+
+def preview_import_file(file_path: str, rows: int = 20, sample: str = SAMPLE_HEAD, seed: Optional[int] = None) -> Dict:
+    """
+    Preview an uploaded file without importing it.
+    
+    Reads a bounded number of bytes whatever the file size: the first rows,
+    or with sample="random" rows at random byte offsets (random row groups
+    for Parquet). Compressed files cannot be read at random offsets and are
+    previewed from the head. Sample rows go through the import's validation.
+    
+    Args:
+        file_path: Path to the uploaded file
+        rows: Number of sample rows (at most MAX_PREVIEW_ROWS)
+        sample: "head" or "random"
+        seed: Seed for the random sample, to repeat a preview
+    
+    Returns:
+        Dict with file_format, sample mode, columns, mapping of product
+        fields to columns, missing_columns, ignored_columns, rows,
+        sample_errors, estimated_error_rate, estimated_total_rows and
+        total_rows_exact
+    
+    Raises:
+        UnsupportedFormatError: The file cannot be imported
+    """
+    if sample not in SAMPLE_MODES:
+        raise ValueError(f"Unknown sample mode '{sample}', expected one of {', '.join(SAMPLE_MODES)}")
+    rows = max(1, min(rows, MAX_PREVIEW_ROWS))
+    rng = random.Random(seed)
+    file_format, compression = detect_format(file_path)
+    file_size = os.path.getsize(file_path)
+    if sample == SAMPLE_RANDOM and compression:
+        sample = SAMPLE_HEAD
+    
+    if file_format == FORMAT_PARQUET:
+        preview = _parquet_preview(file_path, sample, rows, rng)
+    elif sample == SAMPLE_RANDOM:
+        with open(file_path, 'rb') as f:
+            preview = _text_random(f, file_format, file_size, rows, rng)
+    else:
+        with open_import_file(file_path, compression) as stream:
+            preview = _text_head(stream, file_format, rows)
+    
+    # Estimate the row count from the average size of the sampled lines
+    estimated_total = preview["exact_total"]
+    if estimated_total is None and not compression and preview["average_row_bytes"]:
+        estimated_total = round((file_size - preview["header_bytes"]) / preview["average_row_bytes"])
+    
+    columns = preview["columns"]
+    positions = resolve_columns(columns)
+    mapped = {positions[key] for key in COLUMNS if key in positions}
+    sample_errors = sum(1 for row in preview["rows"] if row["error"])
+    return {
+        "file_format": describe_format(file_format, compression),
+        "file_size": file_size,
+        "sample": sample,
+        "columns": columns,
+        "mapping": {key: columns[positions[key]] if key in positions else None for key in COLUMNS},
+        "missing_columns": [key for key in REQUIRED_COLUMNS if key not in positions],
+        "ignored_columns": [name for idx, name in enumerate(columns) if idx not in mapped],
+        "rows": preview["rows"],
+        "sample_errors": sample_errors,
+        "estimated_error_rate": round(sample_errors / len(preview["rows"]), 4) if preview["rows"] else None,
+        "estimated_total_rows": estimated_total,
+        "total_rows_exact": preview["exact_total"] is not None,
+    }
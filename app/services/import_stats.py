@@ -0,0 +1,85 @@
+"""Per-stage import instrumentation."""
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+from app.services import metrics
+
+STAGES = ("parse", "validate", "lookup", "write")
+
+
+class ImportStageStats:
+    """
+    Cumulative wall time and item counts per import stage, plus throughput.
+    
+    Stages:
+        parse     reading, decoding and parsing the file (streamed in blocks)
+        validate  row validation and conversion to product dicts
+        lock      waiting for the SKU-bucket advisory locks of a chunk
+                  (Postgres only; time spent behind concurrent imports)
+        lookup    querying existing SKUs for a chunk
+        write     inserts, updates and the commit of a chunk
+        feed      recording feed SKUs and removing missing products
+                  (feed imports only)
+    
+    Items are rows.
+    """
+
+    def __init__(self, rate_window: int = 10):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict] = {name: {"seconds": 0.0, "items": 0} for name in STAGES}
+        # (timestamp, rows written) samples for the current rows/sec
+        self._samples = deque(maxlen=rate_window)
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        """Time a block and add it to a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, items)
+
+    def add(self, name: str, seconds: float, items: int = 0):
+        stage = self.stages.setdefault(name, {"seconds": 0.0, "items": 0})
+        stage["seconds"] += seconds
+        stage["items"] += items
+        metrics.IMPORT_STAGE_SECONDS.inc(seconds, stage=name)
+
+    def mark_progress(self, processed: int):
+        """Record how many rows have been written so far."""
+        self._samples.append((time.perf_counter(), processed))
+
+    @property
+    def rows_per_sec(self) -> Optional[float]:
+        """Write throughput over the last few chunks."""
+        if len(self._samples) < 2:
+            return None
+        (t0, p0), (t1, p1) = self._samples[0], self._samples[-1]
+        if t1 <= t0:
+            return None
+        return (p1 - p0) / (t1 - t0)
+
+    def eta_seconds(self, processed: int, total: int) -> Optional[float]:
+        rate = self.rows_per_sec
+        if not rate or total <= processed:
+            return None if total > processed else 0.0
+        return (total - processed) / rate
+
+    def snapshot(self, processed: int = 0, total: int = 0) -> Dict:
+        """Stage timings and throughput for the progress document and the result."""
+        rate = self.rows_per_sec
+        eta = self.eta_seconds(processed, total)
+        return {
+            "elapsed_seconds": round(time.perf_counter() - self.started, 3),
+            "rows_per_sec": round(rate, 1) if rate is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "stages": {
+                name: {
+                    "seconds": round(stage["seconds"], 3),
+                    "items": stage["items"],
+                    "items_per_sec": round(stage["items"] / stage["seconds"], 1) if stage["seconds"] > 0 else None,
+                }
+                for name, stage in self.stages.items()
+            },
+        }
@@ -0,0 +1,113 @@
+"""Drop-directory ingestion: files placed on the server's disk, imported in place.
+
+Files written to <UPLOAD_DIR>/<INGEST_DIR_NAME>/ are plain imports; files
+in a subdirectory named after an import feed (<ingest dir>/<feed name>/)
+are snapshots of that feed. A file is claimed by renaming it to the upload
+path of its import: the ingest directory lies inside UPLOAD_DIR, so the
+rename is atomic and copies nothing, and of two scans racing for a file
+only one rename succeeds.
+
+Writers should create a file under a dot-name or with a .tmp/.part suffix
+and rename it when complete; in any case a file is only claimed once it
+has not been modified for INGEST_SETTLE_SECONDS.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from app.config import settings
+
+# Ledger client_id of imports started from the ingest directory
+INGEST_CLIENT_ID = "ingest"
+
+# Files that could not be imported are moved here, inside the ingest directory
+REJECTED_DIR = ".rejected"
+
+# Files still being written by a well-behaved writer
+TEMP_SUFFIXES = (".tmp", ".part")
+
+
+@dataclass
+class IngestFile:
+    """A file waiting in the ingest directory."""
+    path: str
+    name: str
+    feed_name: Optional[str]  # subdirectory name, None at the top level
+    size: int
+    mtime: float
+
+
+def ingest_dir() -> Optional[str]:
+    """The watched directory, or None if ingestion is disabled."""
+    if not settings.INGEST_DIR_NAME:
+        return None
+    return os.path.join(settings.UPLOAD_DIR, settings.INGEST_DIR_NAME)
+
+
+def _is_candidate(entry: os.DirEntry) -> bool:
+    return (
+        entry.is_file(follow_symlinks=False)
+        and not entry.name.startswith(".")
+        and not entry.name.endswith(TEMP_SUFFIXES)
+    )
+
+
+def find_ready_files() -> List[IngestFile]:
+    """
+    Files of the ingest directory and its feed subdirectories that are ready to claim.
+    
+    Returns:
+        Files not modified for INGEST_SETTLE_SECONDS, oldest first
+    """
+    root = ingest_dir()
+    if not root or not os.path.isdir(root):
+        return []
+    settled_before = time.time() - settings.INGEST_SETTLE_SECONDS
+    
+    def scan(directory: str, feed_name: Optional[str]):
+        found = []
+        for entry in os.scandir(directory):
+            if feed_name is None and entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                found += scan(entry.path, entry.name)
+            elif _is_candidate(entry):
+                stat = entry.stat(follow_symlinks=False)
+                # ctime too: a copy that preserves timestamps sets an old mtime while still writing
+                if max(stat.st_mtime, stat.st_ctime) <= settled_before:
+                    found.append(IngestFile(entry.path, entry.name, feed_name, stat.st_size, stat.st_mtime))
+        return found
+    
+    return sorted(scan(root, None), key=lambda f: (f.mtime, f.path))
+
+
+def claim_file(ingest_file: IngestFile, target_path: str) -> bool:
+    """
+    Move a file to its import's upload path.
+    
+    Returns:
+        False if the file is gone (claimed by another scan or removed)
+    """
+    try:
+        os.rename(ingest_file.path, target_path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def return_file(ingest_file: IngestFile, claimed_path: str) -> None:
+    """Put a claimed file back where it was found, for the next scan."""
+    os.rename(claimed_path, ingest_file.path)
+
+
+def reject_file(ingest_file: IngestFile, claimed_path: str) -> str:
+    """
+    Move a claimed file that cannot be imported to the rejected directory.
+    
+    Returns:
+        Its new path
+    """
+    rejected_dir = os.path.join(ingest_dir(), REJECTED_DIR)
+    os.makedirs(rejected_dir, exist_ok=True)
+    prefix = f"{ingest_file.feed_name}." if ingest_file.feed_name else ""
+    rejected_path = os.path.join(rejected_dir, f"{int(time.time())}.{prefix}{ingest_file.name}")
+    os.rename(claimed_path, rejected_path)
+    return rejected_path
@@ -0,0 +1,275 @@
+"""Service-wide metrics in Prometheus text format.
+
+Each process (uvicorn worker, Celery worker child) keeps its own counters and
+histograms and publishes a snapshot to Redis. The metrics endpoint renders
+every published snapshot with a ``process`` label, so any web worker can
+answer a scrape for the whole service. A publisher thread refreshes the
+snapshot every PUBLISH_INTERVAL, and it expires soon after: the series of a
+process that exits (Celery recycles its children) leave the scrape within
+SNAPSHOT_TTL, or at once when it shuts down cleanly.
+"""
+import bisect
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import redis
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+SNAPSHOT_KEY_PREFIX = "metrics:process:"
+PUBLISH_INTERVAL = 5.0  # seconds between throttled publishes
+SNAPSHOT_TTL = 30  # seconds; a live process republishes every PUBLISH_INTERVAL
+
+
+class _Metric:
+    """Base class for a metric family with a fixed set of label names."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+
+    @property
+    def family_name(self) -> str:
+        return self.name
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    @property
+    def family_name(self) -> str:
+        return f"{self.name}_total"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List:
+        with self._lock:
+            return [[f"{self.name}_total", self._labels(key), value] for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def samples(self) -> List:
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    samples.append([f"{self.name}_bucket", {**labels, "le": repr(bound)}, cumulative])
+                samples.append([f"{self.name}_bucket", {**labels, "le": "+Inf"}, state["count"]])
+                samples.append([f"{self.name}_sum", labels, state["sum"]])
+                samples.append([f"{self.name}_count", labels, state["count"]])
+        return samples
+
+
+class Registry:
+    """Metrics of this process."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> List[Dict]:
+        """JSON-serializable state of all metrics."""
+        return [
+            {
+                "name": metric.family_name,
+                "type": metric.kind,
+                "help": metric.documentation,
+                "samples": metric.samples(),
+            }
+            for metric in self._metrics.values()
+        ]
+
+
+registry = Registry()
+
+# Imports
+IMPORTS = registry.counter(
+    "product_importer_imports", "Finished imports by final status", ["status"]
+)
+IMPORT_ROWS = registry.counter(
+    "product_importer_import_rows", "Imported rows by outcome (created, updated, error)", ["outcome"]
+)
+IMPORT_STAGE_SECONDS = registry.counter(
+    "product_importer_import_stage_seconds", "Wall time spent per import stage", ["stage"]
+)
+IMPORT_CHUNK_SECONDS = registry.histogram(
+    "product_importer_import_chunk_seconds", "Time to upsert and commit one import chunk"
+)
+IMPORT_CHUNK_RETRIES = registry.counter(
+    "product_importer_import_chunk_retries",
+    "Import chunks rolled back and retried, by reason (deadlock, serialization_failure, unique_violation)",
+    ["reason"]
+)
+
+# Webhooks
+WEBHOOK_SECONDS = registry.histogram(
+    "product_importer_webhook_seconds", "Webhook delivery latency", ["event", "success"]
+)
+
+# HTTP
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "product_importer_http_request_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+
+
+_redis_client: Optional[redis.Redis] = None
+_last_publish = 0.0
+_publisher_stop: Optional[threading.Event] = None
+
+
+def _client() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def process_key() -> str:
+    """Identifies this process in published snapshots."""
+    from app import database  # the role changes when Celery forks a worker child
+    return f"{database.engine_role}:{socket.gethostname()}:{os.getpid()}"
+
+
+def publish_due() -> bool:
+    """Whether a throttled publish() would write now (checked without touching Redis)."""
+    return time.monotonic() - _last_publish >= PUBLISH_INTERVAL
+
+
+def publish(force: bool = True):
+    """Publish this process's snapshot to Redis (throttled unless forced)."""
+    global _last_publish
+    now = time.monotonic()
+    if not force and now - _last_publish < PUBLISH_INTERVAL:
+        return
+    _last_publish = now
+    _client().setex(SNAPSHOT_KEY_PREFIX + process_key(), SNAPSHOT_TTL, json.dumps(registry.snapshot()))
+
+
+def _publish_periodically(stop: threading.Event):
+    while not stop.wait(PUBLISH_INTERVAL):
+        try:
+            publish(force=False)
+        except Exception as e:
+            logger.debug(f"Error publishing metrics: {str(e)}")
+
+
+def start_publisher():
+    """Publish this process's snapshot every PUBLISH_INTERVAL from a daemon thread, so idle processes stay listed."""
+    global _publisher_stop
+    if _publisher_stop is not None:
+        return
+    _publisher_stop = threading.Event()
+    threading.Thread(
+        target=_publish_periodically, args=(_publisher_stop,), name="metrics-publisher", daemon=True
+    ).start()
+
+
+def unpublish():
+    """Stop publishing and remove this process's snapshot, so its series leave the scrape (on shutdown)."""
+    global _publisher_stop
+    if _publisher_stop is not None:
+        _publisher_stop.set()
+        _publisher_stop = None
+    _client().delete(SNAPSHOT_KEY_PREFIX + process_key())
+
+
+def collect_snapshots() -> Dict[str, List[Dict]]:
+    """Snapshots of all processes that published recently, including this one."""
+    snapshots = {process_key(): registry.snapshot()}
+    client = _client()
+    for key in client.scan_iter(SNAPSHOT_KEY_PREFIX + "*"):
+        process = key.decode("utf-8")[len(SNAPSHOT_KEY_PREFIX):]
+        if process in snapshots:
+            continue
+        data = client.get(key)
+        if data:
+            snapshots[process] = json.loads(data)
+    return snapshots
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render(snapshots: Dict[str, List[Dict]]) -> str:
+    """Render snapshots in the Prometheus text exposition format."""
+    families: Dict[str, Dict] = {}
+    for process, metrics in snapshots.items():
+        for metric in metrics:
+            family = families.setdefault(metric["name"], {
+                "type": metric["type"], "help": metric["help"], "lines": []
+            })
+            for sample_name, labels, value in metric["samples"]:
+                labels = {"process": process, **labels}
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                family["lines"].append(f"{sample_name}{{{label_text}}} {_format_value(value)}")
+
+    output = []
+    for name, family in families.items():
+        output.append(f"# HELP {name} {family['help']}")
+        output.append(f"# TYPE {name} {family['type']}")
+        output.extend(family["lines"])
+    return "\n".join(output) + "\n"
@@ -1,8 +1,31 @@
 """Product service for business logic."""
+import random
+import time
+import zlib
+from contextlib import nullcontext
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
-from typing import Optional, List, Dict
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, Iterable, Optional, List, Dict, Sequence, TypeVar
+from app.config import settings
 from app.models import Product
+from app.services.import_stats import ImportStageStats
+
+T = TypeVar("T")
+
+# First key of the two-key advisory locks taken by import chunks
+IMPORT_LOCK_NAMESPACE = 0x5049  # "PI"
+
+# SQLSTATEs after which a rolled-back chunk can simply be retried
+RETRYABLE_SQLSTATES = {
+    "40P01": "deadlock",
+    "40001": "serialization_failure",
+    "23505": "unique_violation",  # a concurrent writer inserted the same SKU first
+}
+
+# Product columns a listing can be projected to (fields=), in response order
+PRODUCT_FIELDS = ("id", "sku", "name", "description", "active", "created_at", "updated_at")
 
 
 def get_product_by_sku(db: Session, sku: str) -> Optional[Product]:
@@ -49,54 +72,262 @@ def upsert_product(db: Session, product_data: Dict) -> Product:
         return create_product(db, product_data)
 
 
-def bulk_upsert_products(db: Session, products: List[Dict]) -> tuple[int, int]:
+def sku_lock_bucket(sku_lower: str) -> int:
+    """Advisory lock bucket of a lowercased SKU (0 when locking is disabled)."""
+    buckets = settings.IMPORT_LOCK_BUCKETS
+    return zlib.crc32(sku_lower.encode('utf-8')) % buckets if buckets else 0
+
+
+def write_order_key(product: Dict) -> tuple:
     """
-    Bulk upsert products using PostgreSQL INSERT ... ON CONFLICT.
-    Uses the case-insensitive unique index on lower(sku).
+    Sort key for the products of an import: lock bucket, then SKU.
+    
+    Chunks cut from a list in this order each cover a few buckets, so
+    concurrent imports mostly lock disjoint buckets and write in parallel.
+    The order is deterministic, so a paused import resumes at the same row.
+    """
+    sku_lower = product['sku'].lower()
+    return sku_lock_bucket(sku_lower), sku_lower
+
+
+def lock_sku_buckets(db: Session, skus_lower: Iterable[str]) -> int:
+    """
+    Take the transaction-level advisory locks of the SKUs' buckets.
+    
+    Locks are taken in ascending bucket order in one statement, so writers
+    that all go through here wait for each other instead of deadlocking.
+    They are released by the commit or rollback. Postgres only.
     
     Returns:
-        Tuple of (created_count, updated_count)
+        Number of buckets locked
     """
-    if not products:
-        return 0, 0
+    if not settings.IMPORT_LOCK_BUCKETS or db.get_bind().dialect.name != "postgresql":
+        return 0
+    buckets = sorted({sku_lock_bucket(sku) for sku in skus_lower})
+    db.execute(
+        text(
+            "SELECT pg_advisory_xact_lock(:namespace, bucket) "
+            "FROM unnest(CAST(:buckets AS integer[])) AS bucket"
+        ),
+        {"namespace": IMPORT_LOCK_NAMESPACE, "buckets": buckets}
+    )
+    return len(buckets)
+
+
+def retryable_write_error(exc: Exception) -> Optional[str]:
+    """Why a failed write may succeed if retried (e.g. "deadlock"), or None."""
+    if not isinstance(exc, DBAPIError):
+        return None
+    sqlstate = getattr(exc.orig, "pgcode", None) or getattr(exc.orig, "sqlstate", None)
+    return RETRYABLE_SQLSTATES.get(sqlstate)
+
+
+def retry_write(
+    db: Session,
+    write: Callable[[], T],
+    on_retry: Optional[Callable[[str, int], None]] = None
+) -> T:
+    """
+    Run a write that commits its own transaction, retrying transient conflicts.
+    
+    On a deadlock, serialization failure or unique violation the session is
+    rolled back and the write is run again from the start, up to
+    IMPORT_CHUNK_RETRIES times with jittered exponential backoff.
+    
+    Args:
+        db: Database session the write uses
+        write: Callable doing the work, e.g. one bulk_upsert_products() chunk
+        on_retry: Called with (reason, attempt) before each retry
+    
+    Returns:
+        What write returned
+    """
+    attempt = 0
+    while True:
+        try:
+            return write()
+        except DBAPIError as e:
+            db.rollback()
+            reason = retryable_write_error(e)
+            if reason is None or attempt >= settings.IMPORT_CHUNK_RETRIES:
+                raise
+            attempt += 1
+            if on_retry:
+                on_retry(reason, attempt)
+            time.sleep(settings.IMPORT_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+
+def _plan_upsert(
+    db: Session,
+    products: List[Dict],
+    stats: Optional[ImportStageStats] = None,
+    lock: bool = False
+) -> tuple[List[Dict], Dict[int, Dict], int]:
+    """
+    Split a batch of products into inserts, updates and unchanged rows.
+    
+    Inserts and updates come out ordered by lowercased SKU, so concurrent
+    writers lock rows in the same order.
+    
+    Returns:
+        Tuple of (products to insert, products to update keyed by product id,
+        unchanged_count)
+    """
+    # Repeated SKUs within the batch (case-insensitive): the last row wins,
+    # as it would if the rows had landed in separate batches
+    products_by_sku = {p['sku'].lower(): p for p in products}
+    
+    # Lock before looking up, so two imports cannot both decide to insert a SKU
+    if lock:
+        with stats.stage("lock", len(products_by_sku)) if stats else nullcontext():
+            lock_sku_buckets(db, products_by_sku)
     
     # Check existing SKUs (case-insensitive) before bulk operation
-    skus_lower = {p['sku'].lower() for p in products}
-    existing_products = db.query(Product).filter(
-        func.lower(Product.sku).in_(skus_lower)
-    ).all()
-    existing_skus_lower = {p.sku.lower() for p in existing_products}
+    with stats.stage("lookup", len(products_by_sku)) if stats else nullcontext():
+        existing_products = db.query(Product).filter(
+            func.lower(Product.sku).in_(products_by_sku.keys())
+        ).all()
+        existing_by_sku = {ep.sku.lower(): ep for ep in existing_products}
     
-    # Separate into inserts and updates
+    # Separate into inserts, updates and rows that would not change anything
     to_insert = []
     to_update_map = {}
+    unchanged = 0
     
-    for p in products:
-        sku_lower = p['sku'].lower()
-        if sku_lower in existing_skus_lower:
-            # Find the existing product (case-insensitive match)
-            existing = next(ep for ep in existing_products if ep.sku.lower() == sku_lower)
-            to_update_map[existing.id] = p
-        else:
+    for sku_lower, p in sorted(products_by_sku.items()):
+        existing = existing_by_sku.get(sku_lower)
+        if existing is None:
             to_insert.append(p)
+        elif all(getattr(existing, k) == v for k, v in p.items() if k != 'sku'):
+            unchanged += 1
+        else:
+            to_update_map[existing.id] = p
     
-    # Bulk insert new products
-    if to_insert:
-        db.bulk_insert_mappings(Product, to_insert)
+    return to_insert, to_update_map, unchanged
+
+
+def bulk_upsert_products(
+    db: Session,
+    products: List[Dict],
+    stats: Optional[ImportStageStats] = None
+) -> tuple[int, int, int]:
+    """
+    Bulk upsert products using PostgreSQL INSERT ... ON CONFLICT.
+    Uses the case-insensitive unique index on lower(sku).
+    Existing products whose fields already match the row are left untouched.
     
-    # Bulk update existing products
-    if to_update_map:
-        update_mappings = []
-        for product_id, product_data in to_update_map.items():
-            update_data = {k: v for k, v in product_data.items() if k != 'sku'}
-            update_data['id'] = product_id
-            update_mappings.append(update_data)
-        db.bulk_update_mappings(Product, update_mappings)
+    Safe to run concurrently from several imports: the chunk's SKU-bucket
+    advisory locks are taken before the lookup and rows are written in SKU
+    order. Wrap calls in retry_write() to retry the remaining conflicts
+    (e.g. with writers that do not take the locks).
     
-    # Single commit for all operations
-    db.commit()
+    Args:
+        db: Database session
+        products: Product dicts to insert or update
+        stats: Optional import stats; the lock wait, the SKU lookup and the
+            writes are timed as the "lock", "lookup" and "write" stages
+    
+    Returns:
+        Tuple of (created_count, updated_count, unchanged_count)
+    """
+    if not products:
+        return 0, 0, 0
+    
+    to_insert, to_update_map, unchanged = _plan_upsert(db, products, stats, lock=True)
+    
+    with stats.stage("write", len(to_insert) + len(to_update_map) + unchanged) if stats else nullcontext():
+        # Bulk insert new products
+        if to_insert:
+            db.bulk_insert_mappings(Product, to_insert)
+        
+        # Bulk update existing products
+        if to_update_map:
+            update_mappings = []
+            for product_id, product_data in to_update_map.items():
+                update_data = {k: v for k, v in product_data.items() if k != 'sku'}
+                update_data['id'] = product_id
+                update_mappings.append(update_data)
+            db.bulk_update_mappings(Product, update_mappings)
+        
+        # Single commit for all operations
+        db.commit()
+    
+    return len(to_insert), len(to_update_map), unchanged
+
+
+def classify_products(
+    db: Session,
+    products: List[Dict],
+    stats: Optional[ImportStageStats] = None,
+    planned: Optional[Dict[str, Dict]] = None
+) -> tuple[int, int, int]:
+    """
+    Count what bulk_upsert_products() would do with a batch, without writing.
+    
+    Only the SKU lookup runs (timed as the "lookup" stage); the session is
+    left as it was. Nothing being written, a SKU that an earlier batch of
+    the same run would create or update is compared against that batch's
+    row instead of the database.
+    
+    Args:
+        db: Database session
+        products: Product dicts of the batch
+        stats: Optional import stats
+        planned: Rows the earlier batches would write, by lowercased SKU;
+            updated with this batch's
+    
+    Returns:
+        Tuple of (would_create, would_update, unchanged_count)
+    """
+    if not products:
+        return 0, 0, 0
+    
+    to_insert, to_update_map, _ = _plan_upsert(db, products, stats)
+    # Drop the looked-up products so long dry runs do not grow the identity map
+    db.expunge_all()
+    planned = {} if planned is None else planned
+    inserts = {p['sku'].lower() for p in to_insert}
+    writes = inserts | {p['sku'].lower() for p in to_update_map.values()}
     
-    return len(to_insert), len(to_update_map)
+    created = updated = unchanged = 0
+    # Last row per SKU wins, as in _plan_upsert()
+    for sku_lower, p in {p['sku'].lower(): p for p in products}.items():
+        earlier = planned.get(sku_lower)
+        if earlier is not None:
+            changed = any(earlier.get(k) != v for k, v in p.items() if k != 'sku')
+        else:
+            changed = sku_lower in writes
+        if not changed:
+            unchanged += 1
+            continue
+        if earlier is None and sku_lower in inserts:
+            created += 1
+        else:
+            updated += 1
+        planned[sku_lower] = p
+    return created, updated, unchanged
+
+
+def _product_filters(
+    sku_filter: Optional[str] = None,
+    name_filter: Optional[str] = None,
+    description_filter: Optional[str] = None,
+    active_filter: Optional[bool] = None
+) -> List:
+    """WHERE clauses for the product list filters."""
+    filters = []
+    if sku_filter:
+        filters.append(Product.sku.ilike(f"%{sku_filter}%"))
+    
+    if name_filter:
+        filters.append(Product.name.ilike(f"%{name_filter}%"))
+    
+    if description_filter:
+        filters.append(Product.description.ilike(f"%{description_filter}%"))
+    
+    if active_filter is not None:
+        filters.append(Product.active == active_filter)
+    return filters
 
 
 def get_products(
@@ -114,20 +345,10 @@ def get_products(
     Returns:
         Tuple of (products_list, total_count)
     """
-    query = db.query(Product)
-    
     # Apply filters
-    if sku_filter:
-        query = query.filter(Product.sku.ilike(f"%{sku_filter}%"))
-    
-    if name_filter:
-        query = query.filter(Product.name.ilike(f"%{name_filter}%"))
-    
-    if description_filter:
-        query = query.filter(Product.description.ilike(f"%{description_filter}%"))
-    
-    if active_filter is not None:
-        query = query.filter(Product.active == active_filter)
+    query = db.query(Product).filter(
+        *_product_filters(sku_filter, name_filter, description_filter, active_filter)
+    )
     
     # Get total count
     total = query.count()
@@ -139,6 +360,46 @@ def get_products(
     return products, total
 
 
+async def get_product_rows_async(
+    db: AsyncSession,
+    fields: Sequence[str] = PRODUCT_FIELDS,
+    page: int = 1,
+    per_page: int = 50,
+    sku_filter: Optional[str] = None,
+    name_filter: Optional[str] = None,
+    description_filter: Optional[str] = None,
+    active_filter: Optional[bool] = None
+) -> tuple[List[tuple], int]:
+    """
+    Async get_products() returning only the given columns, as row tuples.
+    
+    Same filters, ordering and pagination. Only the requested columns are
+    selected (e.g. no description text when it is not wanted) and no ORM
+    entities are built.
+    
+    Args:
+        fields: Product columns to select, from PRODUCT_FIELDS
+    
+    Returns:
+        Tuple of (rows with values in fields order, total_count)
+    """
+    filters = _product_filters(sku_filter, name_filter, description_filter, active_filter)
+    
+    # Get total count
+    total = await db.scalar(
+        select(func.count()).select_from(select(Product.id).where(*filters).subquery())
+    )
+    
+    # Apply pagination
+    offset = (page - 1) * per_page
+    result = await db.execute(
+        select(*(getattr(Product, field) for field in fields))
+        .where(*filters).order_by(Product.id.desc()).offset(offset).limit(per_page)
+    )
+    
+    return [tuple(row) for row in result], total
+
+
 def delete_all_products(db: Session) -> int:
     """Delete all products and return count."""
     count = db.query(Product).delete()
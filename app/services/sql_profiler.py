@@ -0,0 +1,202 @@
+"""SQL profiling service.
+
+SQLAlchemy cursor events record every statement against the unit of work that
+is active in the current context (an HTTP request or an import chunk). Each
+unit tracks query count, total DB time, its slowest statements and statements
+repeated often enough to suggest an N+1 pattern. Finished units are folded into
+a per-process aggregate that the monitoring endpoints expose.
+"""
+import heapq
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_KEPT = 5
+MAX_STATEMENT_LENGTH = 500
+
+
+def _shorten(statement: str) -> str:
+    """Collapse whitespace and cap statement length for reporting."""
+    statement = " ".join(statement.split())
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        return statement[:MAX_STATEMENT_LENGTH] + "..."
+    return statement
+
+
+def redact_parameters(parameters, executemany: bool = False) -> str:
+    """Describe bound parameters without revealing their values."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        return f"<{len(parameters)} parameter sets redacted>"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: <redacted>" for key in parameters) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return f"<{len(parameters)} values redacted>"
+    return "<redacted>"
+
+
+class QueryProfile:
+    """Database cost of one unit of work."""
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statement_counts: Dict[str, int] = {}
+        self._slowest: List[Tuple[float, str]] = []
+
+    def record(self, statement: str, duration: float):
+        self.query_count += 1
+        self.db_time += duration
+        self.statement_counts[statement] = self.statement_counts.get(statement, 0) + 1
+
+        entry = (duration, statement)
+        if len(self._slowest) < SLOWEST_KEPT:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest(self) -> List[Dict]:
+        return [
+            {"statement": _shorten(statement), "ms": round(duration * 1000, 3)}
+            for duration, statement in sorted(self._slowest, reverse=True)
+        ]
+
+    @property
+    def repeated_statements(self) -> List[Dict]:
+        """Statements executed at least SQL_REPEATED_STATEMENT_THRESHOLD times."""
+        threshold = settings.SQL_REPEATED_STATEMENT_THRESHOLD
+        return [
+            {"statement": _shorten(statement), "count": count}
+            for statement, count in self.statement_counts.items()
+            if count >= threshold
+        ]
+
+    def summary(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "query_count": self.query_count,
+            "db_time_ms": round(self.db_time * 1000, 3),
+            "slowest": self.slowest,
+            "repeated_statements": self.repeated_statements,
+        }
+
+
+class ProfileAggregate:
+    """Per-process totals of finished units, keyed by kind and name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._units: Dict[str, Dict] = {}
+
+    def add(self, profile: QueryProfile):
+        key = f"{profile.kind}:{profile.name}"
+        repeated = profile.repeated_statements
+        with self._lock:
+            unit = self._units.setdefault(key, {
+                "kind": profile.kind,
+                "name": profile.name,
+                "calls": 0,
+                "query_count": 0,
+                "db_time_ms": 0.0,
+                "max_queries_per_call": 0,
+                "max_db_time_ms": 0.0,
+                "calls_with_repeated_statements": 0,
+                "slowest": [],
+            })
+            db_time_ms = profile.db_time * 1000
+            unit["calls"] += 1
+            unit["query_count"] += profile.query_count
+            unit["db_time_ms"] = round(unit["db_time_ms"] + db_time_ms, 3)
+            unit["max_queries_per_call"] = max(unit["max_queries_per_call"], profile.query_count)
+            unit["max_db_time_ms"] = round(max(unit["max_db_time_ms"], db_time_ms), 3)
+            if repeated:
+                unit["calls_with_repeated_statements"] += 1
+            slowest = unit["slowest"] + profile.slowest
+            unit["slowest"] = sorted(slowest, key=lambda s: s["ms"], reverse=True)[:SLOWEST_KEPT]
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            units = [dict(unit) for unit in self._units.values()]
+        for unit in units:
+            unit["avg_queries_per_call"] = round(unit["query_count"] / unit["calls"], 2)
+            unit["avg_db_time_ms"] = round(unit["db_time_ms"] / unit["calls"], 3)
+        return sorted(units, key=lambda u: u["db_time_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._units.clear()
+
+
+aggregate = ProfileAggregate()
+
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("sql_profile", default=None)
+
+
+def current_profile() -> Optional[QueryProfile]:
+    """Profile of the unit of work running in this context, if any."""
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_unit(kind: str, name: str) -> Iterator[QueryProfile]:
+    """
+    Attribute all statements executed inside the block to one unit of work.
+    
+    The name may be changed on the yielded profile before the block exits
+    (e.g. once the route of an HTTP request is known).
+    """
+    profile = QueryProfile(kind, name)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        if settings.SQL_PROFILING_ENABLED:
+            aggregate.add(profile)
+            repeated = profile.repeated_statements
+            if repeated:
+                logger.warning(
+                    f"Possible N+1 in {profile.kind} {profile.name}: "
+                    f"{profile.query_count} queries, repeated statements: {repeated}"
+                )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, duration)
+
+    if duration * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        logger.warning(
+            f"Slow query ({duration * 1000:.1f}ms): {_shorten(statement)} "
+            f"params={redact_parameters(parameters, executemany)}"
+        )
+
+
+def install():
+    """Register the cursor event listeners on every Engine."""
+    if not settings.SQL_PROFILING_ENABLED:
+        return
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
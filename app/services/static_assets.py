@@ -0,0 +1,182 @@
+"""Static assets of the SPA: fingerprinted URLs, precompressed variants and cache headers.
+
+Each file under app/static is read once, hashed and compressed (gzip, and
+brotli when the optional ``brotli`` package is installed), then served from
+memory. index.html references assets by fingerprinted URL
+(``/static/js/app.<hash>.js``), rewritten from the asset manifest, so those
+URLs can be cached as immutable and a new deploy changes them. index.html
+itself and unfingerprinted asset URLs are revalidated on each use (ETag).
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from fastapi import Request, Response
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+URL_PREFIX = "/static/"
+INDEX_FILE = "index.html"
+FINGERPRINT_LENGTH = 12
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Served encodings in order of preference
+ENCODINGS = ("br", "gzip")
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# app.3f2a9c0d1e4b.js -> ("app", "3f2a9c0d1e4b", ".js")
+FINGERPRINTED_NAME = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % FINGERPRINT_LENGTH)
+
+
+@dataclass
+class Asset:
+    """One static file with its fingerprint and encoded bodies."""
+    path: str  # relative to the static directory, e.g. "js/app.js"
+    media_type: str
+    digest: str
+    bodies: Dict[str, bytes] = field(default_factory=dict)  # encoding ("identity", "gzip", "br") -> body
+    
+    @property
+    def url(self) -> str:
+        """Fingerprinted URL."""
+        stem, ext = os.path.splitext(self.path)
+        return f"{URL_PREFIX}{stem}.{self.digest}{ext}"
+
+
+def _compress(asset: Asset, content: bytes) -> None:
+    """Add the gzip (and brotli) variants that are smaller than the file."""
+    asset.bodies["identity"] = content
+    if not asset.media_type.startswith(COMPRESSIBLE_TYPES):
+        return
+    variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(content)
+    for encoding, body in variants.items():
+        if len(body) < len(content):
+            asset.bodies[encoding] = body
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Best encoding of `available` the client accepts (Accept-Encoding with q-values), else identity."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+class StaticAssets:
+    """Assets of a static directory, loaded on first use (and reloaded on change with STATIC_ASSETS_RELOAD)."""
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets: Dict[str, Asset] = {}
+        self.index: Optional[Asset] = None
+        self._mtimes: Optional[Dict[str, float]] = None
+    
+    def _scan_mtimes(self) -> Dict[str, float]:
+        mtimes = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                full_path = os.path.join(root, name)
+                mtimes[os.path.relpath(full_path, self.directory).replace(os.sep, "/")] = os.path.getmtime(full_path)
+        return mtimes
+    
+    def _load(self, mtimes: Dict[str, float]) -> None:
+        assets = {}
+        for path in sorted(mtimes):
+            if path == INDEX_FILE:
+                continue
+            with open(os.path.join(self.directory, path), "rb") as f:
+                content = f.read()
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            asset = Asset(path, media_type, hashlib.sha256(content).hexdigest()[:FINGERPRINT_LENGTH])
+            _compress(asset, content)
+            assets[path] = asset
+        
+        index = None
+        if INDEX_FILE in mtimes:
+            with open(os.path.join(self.directory, INDEX_FILE), "rb") as f:
+                html = f.read().decode("utf-8")
+            # Point the page at the fingerprinted URLs of the manifest
+            for path, asset in assets.items():
+                html = re.sub(rf'(["\']){re.escape(URL_PREFIX + path)}(["\'?#])', rf"\g<1>{asset.url}\g<2>", html)
+            content = html.encode("utf-8")
+            index = Asset(INDEX_FILE, "text/html", hashlib.sha256(content).hexdigest()[:FINGERPRINT_LENGTH])
+            _compress(index, content)
+        
+        self.assets, self.index, self._mtimes = assets, index, mtimes
+    
+    def _ensure_loaded(self) -> None:
+        if self._mtimes is None:
+            self._load(self._scan_mtimes())
+        elif settings.STATIC_ASSETS_RELOAD:
+            mtimes = self._scan_mtimes()
+            if mtimes != self._mtimes:
+                self._load(mtimes)
+    
+    def lookup(self, path: str) -> Tuple[Optional[Asset], bool]:
+        """
+        Asset for a URL path under /static/.
+        
+        Returns:
+            Tuple of (asset or None, whether the URL carries its current
+            fingerprint and may be cached as immutable)
+        """
+        self._ensure_loaded()
+        if path in self.assets:
+            return self.assets[path], False
+        directory, name = os.path.split(path)
+        match = FINGERPRINTED_NAME.match(name)
+        if not match:
+            return None, False
+        asset = self.assets.get(os.path.join(directory, match["stem"] + match["ext"]).replace(os.sep, "/"))
+        if asset is None:
+            return None, False
+        # An outdated fingerprint (page from an earlier deploy) gets the current file, revalidated
+        return asset, match["hash"] == asset.digest
+    
+    def get_index(self) -> Optional[Asset]:
+        self._ensure_loaded()
+        return self.index
+
+
+def asset_response(request: Request, asset: Asset, immutable: bool = False) -> Response:
+    """
+    Response with the best encoding the client accepts, or 304 for a matching If-None-Match.
+    
+    Each encoding has its own strong ETag; Vary: Accept-Encoding lets caches
+    keep the variants apart.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), asset.bodies)
+    etag = f'"{asset.digest}"' if encoding == "identity" else f'"{asset.digest}-{encoding}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=asset.bodies[encoding], media_type=asset.media_type, headers=headers)
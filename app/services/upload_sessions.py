@@ -0,0 +1,408 @@
+"""Resumable upload sessions: a file sent as numbered chunks, in any order and in parallel.
+
+The session's file is created at its full size up front and each chunk is
+written at its own offset with os.pwrite(), so chunks can arrive in any
+order over several connections and finalising only renames the file.
+Session metadata and the SHA-256 of each received chunk live in Redis and
+expire after UPLOAD_SESSION_TTL seconds of inactivity; the maintenance task
+removes files of sessions that expired.
+"""
+import hashlib
+import os
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+import redis
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+
+redis_client = redis.from_url(settings.REDIS_URL)
+
+PART_SUFFIX = ".part"
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Read size when hashing the assembled file
+HASH_READ_SIZE = 1024 * 1024
+# Chunk bodies are written and hashed in blocks of this size, each in the threadpool
+WRITE_BLOCK_SIZE = 1024 * 1024
+# A chunk write that has not written a block for this long is presumed dead
+# (its request crashed) and no longer holds up finalisation
+CHUNK_WRITE_STALE_SECONDS = 60
+# How long finalisation waits for chunk writes in flight to end
+FINALISE_WAIT_SECONDS = 10
+
+
+class UploadSessionError(Exception):
+    """A request that does not fit the session; status_code is the HTTP status to answer with."""
+    
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _session_key(upload_id: str) -> str:
+    return f"upload_session:{upload_id}"
+
+
+def _chunks_key(upload_id: str) -> str:
+    return f"upload_session:{upload_id}:chunks"
+
+
+def _finalising_key(upload_id: str) -> str:
+    return f"upload_session:{upload_id}:finalising"
+
+
+def _writes_key(upload_id: str) -> str:
+    return f"upload_session:{upload_id}:writes"
+
+
+def part_file_path(upload_id: str) -> str:
+    """Where the chunks of a session are written."""
+    return os.path.join(settings.UPLOAD_DIR, f"{upload_id}{PART_SUFFIX}")
+
+
+def _touch(upload_id: str) -> None:
+    """Restart the session's expiry after activity."""
+    with redis_client.pipeline() as pipe:
+        pipe.expire(_session_key(upload_id), settings.UPLOAD_SESSION_TTL)
+        pipe.expire(_chunks_key(upload_id), settings.UPLOAD_SESSION_TTL)
+        pipe.execute()
+
+
+def create_session(
+    file_name: str,
+    file_size: int,
+    chunk_size: Optional[int] = None,
+    feed_id: Optional[int] = None,
+    stage: bool = False,
+    dry_run: bool = False,
+    skip_duplicates: bool = False,
+    client_id: Optional[str] = None
+) -> Dict:
+    """
+    Start an upload session and create its file at full size.
+    
+    Args:
+        file_name: Name of the file being uploaded
+        file_size: Exact size of the file in bytes
+        chunk_size: Chunk size in bytes (default UPLOAD_SESSION_CHUNK_SIZE);
+            every chunk but the last has exactly this size
+        feed_id, stage, dry_run, skip_duplicates, client_id: Upload options,
+            applied when the session is finalised (as for POST /api/upload)
+    
+    Returns:
+        Session dict (see get_session())
+    
+    Raises:
+        UploadSessionError: Invalid size or chunk size
+    """
+    chunk_size = chunk_size or settings.UPLOAD_SESSION_CHUNK_SIZE
+    if file_size <= 0:
+        raise UploadSessionError(400, "file_size must be positive")
+    if file_size > settings.MAX_UPLOAD_SIZE:
+        raise UploadSessionError(
+            400,
+            f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE / (1024*1024)}MB"
+        )
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise UploadSessionError(400, f"chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes")
+    
+    upload_id = str(uuid.uuid4())
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    # Sparse on most filesystems: blocks are allocated as chunks are written
+    with open(part_file_path(upload_id), "wb") as f:
+        f.truncate(file_size)
+    
+    session = {
+        "file_name": file_name,
+        "file_size": file_size,
+        "chunk_size": chunk_size,
+        "total_chunks": -(-file_size // chunk_size),
+        "stage": int(stage),
+        "dry_run": int(dry_run),
+        "skip_duplicates": int(skip_duplicates),
+    }
+    if feed_id is not None:
+        session["feed_id"] = feed_id
+    if client_id:
+        session["client_id"] = client_id
+    with redis_client.pipeline() as pipe:
+        pipe.hset(_session_key(upload_id), mapping=session)
+        pipe.expire(_session_key(upload_id), settings.UPLOAD_SESSION_TTL)
+        pipe.execute()
+    return get_session(upload_id)
+
+
+def get_session(upload_id: str) -> Dict:
+    """
+    State of an upload session.
+    
+    Returns:
+        Dict with upload_id, file_name, file_size, chunk_size, total_chunks,
+        received_chunks, missing_chunks, bytes_received, task_id (once
+        finalised), expires_in and the upload options (feed_id, stage,
+        dry_run, skip_duplicates, client_id)
+    
+    Raises:
+        UploadSessionError: Unknown or expired session (404)
+    """
+    with redis_client.pipeline() as pipe:
+        pipe.hgetall(_session_key(upload_id))
+        pipe.hkeys(_chunks_key(upload_id))
+        pipe.ttl(_session_key(upload_id))
+        raw, chunk_keys, ttl = pipe.execute()
+    if not raw:
+        raise UploadSessionError(404, "Upload session not found or expired")
+    
+    session = {key.decode(): value.decode() for key, value in raw.items()}
+    file_size = int(session["file_size"])
+    chunk_size = int(session["chunk_size"])
+    total_chunks = int(session["total_chunks"])
+    received = sorted(int(index) for index in chunk_keys)
+    received_set = set(received)
+    return {
+        "upload_id": upload_id,
+        "file_name": session["file_name"],
+        "file_size": file_size,
+        "chunk_size": chunk_size,
+        "total_chunks": total_chunks,
+        "received_chunks": received,
+        "missing_chunks": [index for index in range(total_chunks) if index not in received_set],
+        "bytes_received": sum(_chunk_length(index, file_size, chunk_size) for index in received),
+        "task_id": session.get("task_id"),
+        "expires_in": max(ttl, 0),
+        "feed_id": int(session["feed_id"]) if "feed_id" in session else None,
+        "stage": session["stage"] == "1",
+        "dry_run": session["dry_run"] == "1",
+        "skip_duplicates": session["skip_duplicates"] == "1",
+        "client_id": session.get("client_id"),
+    }
+
+
+def _chunk_length(index: int, file_size: int, chunk_size: int) -> int:
+    return min(chunk_size, file_size - index * chunk_size)
+
+
+def _heartbeat_write(upload_id: str, write_id: str) -> None:
+    """Register a chunk write in flight, or show that it is still alive."""
+    with redis_client.pipeline() as pipe:
+        pipe.hset(_writes_key(upload_id), write_id, time.time())
+        pipe.expire(_writes_key(upload_id), settings.UPLOAD_SESSION_TTL)
+        pipe.execute()
+
+
+def _end_write(upload_id: str, write_id: str) -> None:
+    redis_client.hdel(_writes_key(upload_id), write_id)
+
+
+def _start_chunk(upload_id: str, index: int, write_id: str) -> Dict:
+    """
+    Check that a chunk may be written, register the write and stop counting an earlier copy of it.
+    
+    The write is registered before the finalising flag is checked, and
+    finalisation sets the flag before looking for writes, so one of the two
+    always sees the other.
+    """
+    session = get_session(upload_id)
+    if session["task_id"]:
+        raise UploadSessionError(409, "Upload session is already finalised")
+    if not 0 <= index < session["total_chunks"]:
+        raise UploadSessionError(416, f"Chunk index must be between 0 and {session['total_chunks'] - 1}")
+    
+    _heartbeat_write(upload_id, write_id)
+    if redis_client.exists(_finalising_key(upload_id)):
+        _end_write(upload_id, write_id)
+        raise UploadSessionError(409, "Upload session is being finalised")
+    
+    # Until its checksum is verified again, a resent chunk does not count
+    redis_client.hdel(_chunks_key(upload_id), str(index))
+    return session
+
+
+def _write_block(fd: int, sha256, block: bytes, offset: int) -> None:
+    sha256.update(block)
+    view = memoryview(block)
+    while view:
+        count = os.pwrite(fd, view, offset)
+        view = view[count:]
+        offset += count
+
+
+def _record_chunk(upload_id: str, index: int, sha256_hex: str) -> int:
+    """Count a verified chunk; returns the number of chunks received."""
+    with redis_client.pipeline() as pipe:
+        pipe.hset(_chunks_key(upload_id), str(index), sha256_hex)
+        pipe.hlen(_chunks_key(upload_id))
+        received = pipe.execute()[1]
+    _touch(upload_id)
+    return received
+
+
+async def write_chunk(upload_id: str, index: int, sha256_hex: str, body: AsyncIterator[bytes]) -> Dict:
+    """
+    Write one chunk at its offset and record it once its checksum matches.
+    
+    A chunk can be sent again (e.g. after a dropped connection); the last
+    write with a matching checksum counts. Chunks of one session may be
+    written concurrently, since each goes to its own byte range. Only
+    reading the body runs on the event loop: the body is written and hashed
+    in WRITE_BLOCK_SIZE blocks in the threadpool, as are the Redis calls.
+    The write is registered in Redis until it ends, so finalisation waits
+    for it instead of reading a file still being written.
+    
+    Args:
+        upload_id: Session ID
+        index: Chunk number, from 0
+        sha256_hex: Expected SHA-256 of the chunk (hex)
+        body: The chunk's bytes, streamed
+    
+    Returns:
+        Dict with upload_id, index, size, received_chunks (count) and total_chunks
+    
+    Raises:
+        UploadSessionError: Unknown session (404), finalised session (409),
+            index out of range (416), wrong length or checksum (400)
+    """
+    write_id = str(uuid.uuid4())
+    session = await run_in_threadpool(_start_chunk, upload_id, index, write_id)
+    expected_length = _chunk_length(index, session["file_size"], session["chunk_size"])
+    offset = index * session["chunk_size"]
+    sha256 = hashlib.sha256()
+    written = 0
+    block = bytearray()
+    try:
+        fd = await run_in_threadpool(os.open, part_file_path(upload_id), os.O_WRONLY)
+        try:
+            async for data in body:
+                if written + len(block) + len(data) > expected_length:
+                    raise UploadSessionError(400, f"Chunk {index} must be {expected_length} bytes")
+                block += data
+                if len(block) >= WRITE_BLOCK_SIZE:
+                    await run_in_threadpool(_write_block, fd, sha256, block, offset + written)
+                    await run_in_threadpool(_heartbeat_write, upload_id, write_id)
+                    written += len(block)
+                    block = bytearray()
+            if block:
+                await run_in_threadpool(_write_block, fd, sha256, block, offset + written)
+                written += len(block)
+        finally:
+            os.close(fd)
+        
+        if written != expected_length:
+            raise UploadSessionError(400, f"Chunk {index} must be {expected_length} bytes, received {written}")
+        if sha256.hexdigest() != sha256_hex.lower():
+            raise UploadSessionError(400, f"Checksum mismatch for chunk {index}; send it again")
+        
+        received = await run_in_threadpool(_record_chunk, upload_id, index, sha256_hex.lower())
+    finally:
+        await run_in_threadpool(_end_write, upload_id, write_id)
+    return {
+        "upload_id": upload_id,
+        "index": index,
+        "size": written,
+        "received_chunks": received,
+        "total_chunks": session["total_chunks"],
+    }
+
+
+def claim_finalisation(upload_id: str) -> bool:
+    """
+    Take the session's finalisation lock, so two finalise requests cannot both queue an import.
+    
+    New chunk writes are refused from then on; call wait_for_writes()
+    before reading the file, for the writes already in flight.
+    """
+    return bool(redis_client.set(_finalising_key(upload_id), 1, ex=settings.UPLOAD_SESSION_TTL, nx=True))
+
+
+def wait_for_writes(upload_id: str, timeout: float = FINALISE_WAIT_SECONDS) -> bool:
+    """
+    Wait until no chunk write of the session is in flight.
+    
+    Writes that have not written a block for CHUNK_WRITE_STALE_SECONDS
+    are ignored. Blocks the calling thread.
+    
+    Returns:
+        False if writes were still in flight after timeout seconds
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        stale_before = time.time() - CHUNK_WRITE_STALE_SECONDS
+        beats = redis_client.hvals(_writes_key(upload_id))
+        if not any(float(beat) > stale_before for beat in beats):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.1)
+
+
+def release_finalisation(upload_id: str) -> None:
+    redis_client.delete(_finalising_key(upload_id))
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file, read in HASH_READ_SIZE blocks."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(HASH_READ_SIZE):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def mark_finalised(upload_id: str, task_id: str) -> None:
+    """Record the import the session became; later finalise requests return it."""
+    with redis_client.pipeline() as pipe:
+        pipe.hset(_session_key(upload_id), "task_id", task_id)
+        pipe.delete(_chunks_key(upload_id), _writes_key(upload_id))
+        pipe.execute()
+    _touch(upload_id)
+
+
+def delete_session(upload_id: str) -> None:
+    """Abort a session and remove its file."""
+    with redis_client.pipeline() as pipe:
+        pipe.delete(
+            _session_key(upload_id), _chunks_key(upload_id), _finalising_key(upload_id), _writes_key(upload_id)
+        )
+        pipe.execute()
+    if os.path.exists(part_file_path(upload_id)):
+        os.remove(part_file_path(upload_id))
+
+
+def open_session_bytes() -> int:
+    """
+    Bytes held on disk by sessions not yet finalised (or expired but not yet pruned).
+    
+    Each session's file is created at its full declared size.
+    """
+    if not os.path.isdir(settings.UPLOAD_DIR):
+        return 0
+    return sum(
+        entry.stat().st_size for entry in os.scandir(settings.UPLOAD_DIR)
+        if entry.name.endswith(PART_SUFFIX) and entry.is_file()
+    )
+
+
+def prune_expired_sessions() -> List[str]:
+    """
+    Remove files of sessions whose Redis state has expired.
+    
+    Returns:
+        IDs of the sessions removed
+    """
+    if not os.path.isdir(settings.UPLOAD_DIR):
+        return []
+    removed = []
+    cutoff = time.time() - settings.UPLOAD_SESSION_TTL
+    for name in os.listdir(settings.UPLOAD_DIR):
+        if not name.endswith(PART_SUFFIX):
+            continue
+        upload_id = name[:-len(PART_SUFFIX)]
+        path = os.path.join(settings.UPLOAD_DIR, name)
+        if redis_client.exists(_session_key(upload_id)) or os.path.getmtime(path) > cutoff:
+            continue
+        os.remove(path)
+        removed.append(upload_id)
+    return removed
@@ -4,6 +4,7 @@ import asyncio
 from typing import List, Dict, Optional
 from app.models import Webhook, WebhookEventType
 from sqlalchemy.orm import Session
+from app.services import metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,9 +32,15 @@ async def trigger_webhook(webhook: Webhook, payload: Dict, timeout: int = 10) ->
             )
             end_time = asyncio.get_event_loop().time()
             response_time_ms = (end_time - start_time) * 1000
+            success = 200 <= response.status_code < 300
+            metrics.WEBHOOK_SECONDS.observe(
+                end_time - start_time,
+                event=getattr(webhook.event_type, "value", webhook.event_type),
+                success=success
+            )
             
             return {
-                "success": 200 <= response.status_code < 300,
+                "success": success,
                 "status_code": response.status_code,
                 "response_time_ms": response_time_ms,
                 "response_body": response.text[:500],  # Limit response body length
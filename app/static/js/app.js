@@ -7,6 +7,7 @@ let currentFilters = {};
 let currentProductId = null;
 let currentWebhookId = null;
 let eventSource = null;
+let currentTaskId = null;
 
 // Tab switching
 document.querySelectorAll('.tab-btn').forEach(btn => {
@@ -58,11 +59,7 @@ fileInput.addEventListener('change', (e) => {
 });
 
 async function handleFileUpload(file) {
-    if (!file.name.endsWith('.csv')) {
-        showToast('Please upload a CSV file', 'error');
-        return;
-    }
-
+    // The server detects the format from the file content
     const formData = new FormData();
     formData.append('file', file);
 
@@ -83,12 +80,21 @@ async function handleFileUpload(file) {
             body: formData
         });
 
+        if (response.status === 429) {
+            const busy = (await response.json()).detail;
+            throw new Error(`${busy.detail}. Try again in ${busy.retry_after}s`);
+        }
         if (!response.ok) {
             throw new Error('Upload failed');
         }
 
         const data = await response.json();
         const taskId = data.task_id;
+        currentTaskId = taskId;
+        if (data.duplicate_of) {
+            showToast('This file was already imported recently', 'success');
+        }
+        setImportControls('running');
 
         // Connect to SSE for progress updates
         connectProgressStream(taskId);
@@ -128,6 +134,7 @@ function connectProgressStream(taskId) {
 
         if (data.status === 'completed') {
             eventSource.close();
+            setImportControls('finished');
             resultMessage.style.display = 'block';
             resultMessage.className = 'result-message success';
             resultMessage.textContent = `Import completed! ${data.message || ''}`;
@@ -137,10 +144,14 @@ function connectProgressStream(taskId) {
             }
         } else if (data.status === 'error') {
             eventSource.close();
+            setImportControls('finished');
             resultMessage.style.display = 'block';
             resultMessage.className = 'result-message error';
             resultMessage.textContent = `Import failed: ${data.message || 'Unknown error'}`;
             showToast('Import failed', 'error');
+        } else if (data.status === 'cancelled' || data.status === 'paused') {
+            eventSource.close();
+            showImportStopped(data);
         }
     };
 
@@ -175,8 +186,12 @@ function pollProgress(taskId) {
                 progressErrors.innerHTML = `<strong>Errors:</strong><ul>${data.errors.map(e => `<li>${e}</li>`).join('')}</ul>`;
             }
 
-            if (data.status === 'completed' || data.status === 'error') {
+            if (data.status === 'cancelled' || data.status === 'paused') {
                 clearInterval(interval);
+                showImportStopped(data);
+            } else if (data.status === 'completed' || data.status === 'error') {
+                clearInterval(interval);
+                setImportControls('finished');
                 if (data.status === 'completed') {
                     resultMessage.style.display = 'block';
                     resultMessage.className = 'result-message success';
@@ -198,6 +213,55 @@ function pollProgress(taskId) {
     }, 2000);
 }
 
+// Import controls (pause / resume / cancel)
+function setImportControls(state) {
+    document.getElementById('pause-import-btn').style.display = state === 'running' ? 'inline-block' : 'none';
+    document.getElementById('resume-import-btn').style.display = state === 'paused' ? 'inline-block' : 'none';
+    document.getElementById('cancel-import-btn').style.display = state === 'finished' ? 'none' : 'inline-block';
+}
+
+function showImportStopped(data) {
+    const resultMessage = document.getElementById('upload-result');
+    resultMessage.style.display = 'block';
+    resultMessage.className = data.status === 'paused' ? 'result-message' : 'result-message error';
+    resultMessage.textContent = data.message || `Import ${data.status}`;
+    setImportControls(data.status === 'paused' ? 'paused' : 'finished');
+}
+
+async function sendImportControl(action) {
+    if (!currentTaskId) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`${API_BASE}/imports/${currentTaskId}/${action}`, {
+            method: 'POST'
+        });
+        const data = await response.json();
+
+        if (!response.ok) {
+            throw new Error(data.detail || `Failed to ${action} import`);
+        }
+
+        showToast(data.message, 'success');
+        if (action === 'resume') {
+            document.getElementById('upload-result').style.display = 'none';
+            setImportControls('running');
+            connectProgressStream(currentTaskId);
+        }
+    } catch (error) {
+        showToast(error.message, 'error');
+    }
+}
+
+document.getElementById('pause-import-btn').addEventListener('click', () => sendImportControl('pause'));
+document.getElementById('resume-import-btn').addEventListener('click', () => sendImportControl('resume'));
+document.getElementById('cancel-import-btn').addEventListener('click', () => {
+    if (confirm('Cancel this import? Products already imported are kept.')) {
+        sendImportControl('cancel');
+    }
+});
+
 // Products Management
 async function loadProducts() {
     const tbody = document.getElementById('products-tbody');
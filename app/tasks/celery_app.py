@@ -1,12 +1,35 @@
 """Celery application configuration."""
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from kombu import Exchange, Queue
+import redis
 from app.config import settings
+from app.database import configure_engine
+from app.services import metrics
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Use environment variables if available, otherwise use settings defaults
 broker_url = os.getenv("CELERY_BROKER_URL", settings.CELERY_BROKER_URL)
 backend_url = os.getenv("CELERY_RESULT_BACKEND", settings.CELERY_RESULT_BACKEND)
 
+# Queues (lanes). Each lane is served by its own worker pool (see start.sh),
+# so long imports never hold the slots short jobs need.
+QUEUE_IMPORTS_BULK = "imports.bulk"
+QUEUE_IMPORTS_SMALL = "imports.small"
+QUEUE_WEBHOOKS = "webhooks"
+QUEUE_MAINTENANCE = "maintenance"
+QUEUES = (QUEUE_IMPORTS_BULK, QUEUE_IMPORTS_SMALL, QUEUE_WEBHOOKS, QUEUE_MAINTENANCE)
+
+# Priorities within a queue. With the Redis transport 0 is the highest
+# priority; each step is a separate Redis list.
+PRIORITY_STEPS = [0, 3, 6, 9]
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 3
+PRIORITY_LOW = 6
+
 celery_app = Celery(
     "product_importer",
     broker=broker_url,
@@ -22,9 +45,86 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=3600,  # 1 hour max
     worker_max_tasks_per_child=50,
-    imports=('app.tasks.import_tasks',)  # Import tasks so they're discovered
+    task_queues=tuple(Queue(name, Exchange(name), routing_key=name) for name in QUEUES),
+    task_default_queue=QUEUE_MAINTENANCE,
+    task_routes={
+        "import_products": {"queue": QUEUE_IMPORTS_BULK},
+        "deliver_webhooks": {"queue": QUEUE_WEBHOOKS},
+        "maintenance.*": {"queue": QUEUE_MAINTENANCE},
+    },
+    task_default_priority=PRIORITY_NORMAL,
+    broker_transport_options={
+        "priority_steps": PRIORITY_STEPS,
+        "queue_order_strategy": "priority",
+    },
+    # Reserve one task at a time so priorities and lanes take effect and
+    # queued work stays visible in the queue depth
+    worker_prefetch_multiplier=1,
+    # Periodic maintenance jobs, run by a single `celery beat` process
+    beat_schedule={
+        "prune-product-tombstones": {
+            "task": "maintenance.prune_product_tombstones",
+            "schedule": settings.TOMBSTONE_PRUNE_INTERVAL_SECONDS,
+        },
+        "compact-catalog-stats": {
+            "task": "maintenance.compact_catalog_stats",
+            "schedule": settings.CATALOG_STATS_COMPACT_SECONDS,
+        },
+        "reconcile-catalog-stats": {
+            "task": "maintenance.reconcile_catalog_stats",
+            "schedule": settings.CATALOG_STATS_RECONCILE_SECONDS,
+        },
+        "prune-upload-sessions": {
+            "task": "maintenance.prune_upload_sessions",
+            "schedule": 3600,
+        },
+        "scan-ingest-dir": {
+            "task": "maintenance.scan_ingest_dir",
+            "schedule": settings.INGEST_SCAN_SECONDS,
+        },
+    },
+    imports=('app.tasks.import_tasks', 'app.tasks.webhook_tasks', 'app.tasks.maintenance_tasks')  # Import tasks so they're discovered
 )
 
+
+def get_queue_depths() -> dict:
+    """
+    Number of messages waiting in each queue, split by priority step.
+    
+    Reads the broker's Redis lists directly; tasks already reserved by a
+    worker are not counted.
+    """
+    client = redis.from_url(broker_url)
+    separator = "\x06\x16"  # kombu's default priority separator
+    depths = {}
+    with client.pipeline() as pipe:
+        for queue in QUEUES:
+            for step in PRIORITY_STEPS:
+                pipe.llen(f"{queue}{separator}{step}" if step else queue)
+        counts = iter(pipe.execute())
+    for queue in QUEUES:
+        by_priority = {str(step): next(counts) for step in PRIORITY_STEPS}
+        depths[queue] = {"depth": sum(by_priority.values()), "by_priority": by_priority}
+    return depths
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Give each forked worker child its own, worker-sized connection pool, and publish its metrics."""
+    configure_engine("worker")
+    metrics.start_publisher()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """Withdraw a recycled or stopping worker child's metrics, so the scrape stops counting them."""
+    try:
+        metrics.unpublish()
+    except Exception as e:
+        logger.debug(f"Error withdrawing metrics: {str(e)}")
+
+
 # Import tasks to register them
 from app.tasks import import_tasks  # noqa
-
+from app.tasks import webhook_tasks  # noqa
+from app.tasks import maintenance_tasks  # noqa
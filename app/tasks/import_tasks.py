@@ -1,14 +1,26 @@
-"""Celery tasks for CSV import."""
+"""Celery tasks for product file imports."""
 import os
 import json
+import socket
+import time
 import redis
-from typing import List
-from app.tasks.celery_app import celery_app
+from celery import chain
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from app.tasks.celery_app import (
+    celery_app, QUEUE_IMPORTS_BULK, QUEUE_IMPORTS_SMALL, PRIORITY_HIGH, PRIORITY_NORMAL
+)
 from app.database import SessionLocal
-from app.services.csv_processor import parse_csv_file, validate_csv_row, row_to_product_dict
-from app.services.product_service import bulk_upsert_products
-from app.services.webhook_service import trigger_webhooks_sync
-from app.models import WebhookEventType
+from app.services.import_formats import detect_format, describe_format, iter_import_batches
+from app.services.product_service import (
+    bulk_upsert_products, classify_products, retry_write, write_order_key
+)
+from app.services.feed_service import mark_feed_skus, reconcile_feed
+from app.services.import_stats import ImportStageStats
+from app.services import import_job_service
+from app.tasks.webhook_tasks import enqueue_webhooks
+from app.services import metrics, sql_profiler
+from app.models import WebhookEventType, ImportFeed, FeedMissingAction
 from app.config import settings
 import logging
 
@@ -17,9 +29,29 @@ logger = logging.getLogger(__name__)
 # Redis connection for progress tracking
 redis_client = redis.from_url(settings.REDIS_URL)
 
+# Control requests, checked by the task between chunks
+CONTROL_CANCEL = "cancel"
+CONTROL_PAUSE = "pause"
+CONTROL_TTL = 86400  # 1 day
+CHECKPOINT_TTL = 7 * 86400  # paused imports can be resumed for a week
 
-def update_progress(task_id: str, status: str, progress: int, total: int, message: str = None, errors: List[str] = None):
-    """Update progress in Redis."""
+# Statuses after which the task no longer runs and cannot be resumed
+TERMINAL_STATUSES = ("completed", "error", "cancelled")
+# Uploaded but not imported: the file is kept for preview until the import
+# (or a dry run) is started; "validated" is the result of a dry run
+STAGED_STATUSES = ("staged", "validated")
+
+
+def update_progress(
+    task_id: str,
+    status: str,
+    progress: int,
+    total: int,
+    message: str = None,
+    errors: List[str] = None,
+    stats: ImportStageStats = None
+):
+    """Update progress in Redis, including stage timings and throughput when given."""
     progress_data = {
         "status": status,
         "progress": progress,
@@ -28,76 +60,510 @@ def update_progress(task_id: str, status: str, progress: int, total: int, messag
         "message": message or "",
         "errors": errors or []
     }
+    if stats is not None:
+        progress_data.update(stats.snapshot(progress, total))
     redis_client.setex(f"import_progress:{task_id}", 3600, json.dumps(progress_data))  # 1 hour TTL
 
 
+def get_progress(task_id: str) -> Optional[Dict]:
+    """Read the progress document of a task, if it has not expired."""
+    progress_data = redis_client.get(f"import_progress:{task_id}")
+    if not progress_data:
+        return None
+    return json.loads(progress_data.decode('utf-8'))
+
+
+def get_import_control(task_id: str) -> Optional[str]:
+    """Pending control request (cancel/pause) for a task, if any."""
+    action = redis_client.get(f"import_control:{task_id}")
+    return action.decode('utf-8') if action else None
+
+
+def set_import_control(task_id: str, action: str):
+    """Ask a running or queued import to cancel or pause after its current chunk."""
+    redis_client.setex(f"import_control:{task_id}", CONTROL_TTL, action)
+
+
+def clear_import_control(task_id: str):
+    """Withdraw a pending control request."""
+    redis_client.delete(f"import_control:{task_id}")
+
+
+def get_checkpoint(task_id: str) -> Optional[Dict]:
+    """Checkpoint of a paused import, if any."""
+    checkpoint = redis_client.get(f"import_checkpoint:{task_id}")
+    return json.loads(checkpoint.decode('utf-8')) if checkpoint else None
+
+
+def save_checkpoint(task_id: str, checkpoint: Dict):
+    """Store where a paused import stopped so it can be resumed."""
+    redis_client.setex(f"import_checkpoint:{task_id}", CHECKPOINT_TTL, json.dumps(checkpoint))
+
+
+def clear_checkpoint(task_id: str):
+    """Drop the checkpoint of a paused import."""
+    redis_client.delete(f"import_checkpoint:{task_id}")
+
+
+def import_route_options(file_size: int) -> Dict:
+    """
+    Choose queue and priority for an import by file size.
+    
+    Small files go to the fast lane so they never wait behind multi-GB imports.
+    """
+    if file_size <= settings.SMALL_IMPORT_MAX_BYTES:
+        return {"queue": QUEUE_IMPORTS_SMALL, "priority": PRIORITY_HIGH}
+    return {"queue": QUEUE_IMPORTS_BULK, "priority": PRIORITY_NORMAL}
+
+
+def queue_import(
+    task_id: str,
+    file_path: str,
+    file_size: int,
+    feed_id: Optional[int] = None,
+    dry_run: bool = False
+):
+    """
+    Reset the progress document of an import and queue its task.
+    
+    Raises:
+        Exception: The task could not be queued; the caller cleans up
+    """
+    message = "Dry run queued, waiting to start..." if dry_run else "Task queued, waiting to start..."
+    update_progress(task_id, "queued", 0, 0, message)
+    import_products_task.apply_async(
+        args=[task_id, file_path],
+        kwargs={"feed_id": feed_id, "dry_run": dry_run},
+        **import_route_options(file_size)
+    )
+
+
+def queue_import_sequence(imports: List[Tuple[str, str, int]], feed_id: Optional[int] = None):
+    """
+    Queue imports that must run one after another, in the given order.
+    
+    Used for several snapshots of one feed arriving together: run
+    concurrently, each would deactivate the other's products. Every import
+    still goes to the lane its size calls for. If an import of the chain
+    does not complete (paused, cancelled, failed), the later ones are not
+    started but staged (see defer_sequence()).
+    
+    Args:
+        imports: (task_id, file_path, file_size) of each import
+        feed_id: Import feed the files are snapshots of
+    
+    Raises:
+        Exception: The tasks could not be queued; the caller cleans up
+    """
+    signatures = []
+    for task_id, file_path, file_size in imports:
+        update_progress(task_id, "queued", 0, 0, "Task queued, waiting to start...")
+        signatures.append(
+            import_products_task.si(task_id, file_path, feed_id=feed_id).set(**import_route_options(file_size))
+        )
+    chain(*signatures).apply_async()
+
+
+def publish_sql_profile():
+    """Publish this worker process's aggregated SQL profile for the monitoring API."""
+    key = f"sql_profile:worker:{socket.gethostname()}:{os.getpid()}"
+    redis_client.setex(key, 86400, json.dumps(sql_profiler.aggregate.snapshot()))
+
+
+def record_import_job(task_id: str, **fields):
+    """
+    Write to the import job ledger.
+    
+    Uses its own short-lived session so a failed ledger write can neither
+    fail the import nor roll back its chunk.
+    """
+    db = SessionLocal()
+    try:
+        import_job_service.update_import_job(db, task_id, **fields)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error updating import job {task_id}: {str(e)}")
+    finally:
+        db.close()
+
+
+def finish_import_job(task_id: str, status: str, stats: ImportStageStats, rows: int = 0, **fields):
+    """Record the final status, duration, rows/sec and stage timings of a run."""
+    snapshot = stats.snapshot()
+    elapsed = snapshot["elapsed_seconds"]
+    record_import_job(
+        task_id,
+        status=status,
+        finished_at=datetime.now(timezone.utc),
+        duration_seconds=elapsed,
+        rows_per_sec=round(rows / elapsed, 1) if rows and elapsed else None,
+        stats=snapshot["stages"],
+        **fields
+    )
+
+
+def handle_import_control(
+    task_id: str,
+    file_path: str,
+    processed: int,
+    total: int,
+    created: int,
+    updated: int,
+    errors: List[str],
+    stats: ImportStageStats = None,
+    unchanged: int = 0,
+    feed_id: int = None,
+    dry_run: bool = False
+) -> Optional[str]:
+    """
+    Honour a pending cancel or pause request.
+    
+    Called between chunks, after the previous chunk has been committed.
+    
+    Returns:
+        The action taken (CONTROL_CANCEL or CONTROL_PAUSE), or None to continue
+    """
+    action = get_import_control(task_id)
+    if action == CONTROL_CANCEL:
+        clear_import_control(task_id)
+        clear_checkpoint(task_id)
+        message = f"Import cancelled after {processed} products. Created: {created}, Updated: {updated}"
+        update_progress(task_id, "cancelled", processed, total, message, errors, stats)
+        metrics.IMPORTS.inc(status="cancelled")
+        record_import_job(
+            task_id,
+            status="cancelled",
+            message=message,
+            finished_at=datetime.now(timezone.utc),
+            errors=errors,
+        )
+        return action
+    if action == CONTROL_PAUSE:
+        save_checkpoint(task_id, {
+            "file_path": file_path,
+            "processed": processed,
+            "created": created,
+            "updated": updated,
+            "unchanged": unchanged,
+            "feed_id": feed_id,
+            "dry_run": dry_run,
+        })
+        clear_import_control(task_id)
+        message = f"Import paused after {processed} products. Resume to continue."
+        update_progress(task_id, "paused", processed, total, message, errors, stats)
+        record_import_job(task_id, status="paused", message=message, errors=errors)
+        return action
+    return None
+
+
 @celery_app.task(bind=True, name="import_products")
-def import_products_task(self, task_id: str, file_path: str):
+def import_products_task(
+    self,
+    task_id: str,
+    file_path: str,
+    checkpoint: Dict = None,
+    feed_id: int = None,
+    dry_run: bool = False
+):
     """
-    Celery task to import products from CSV file.
+    Celery task to import products from an uploaded file.
+    
+    The format (CSV, NDJSON or Parquet, optionally gzip/zstd-compressed)
+    is detected from the content; every format goes through the same
+    validation and upsert stages.
+    
+    Checks for cancel/pause requests before starting and between chunks;
+    a paused import keeps its file and is resumed from its checkpoint.
+    Cumulative time per stage, rows/sec and ETA are reported in the
+    progress document and in the task result, and counters and
+    throughput are written to the import job ledger after every chunk.
+    
+    A feed import is a full snapshot: the SKUs it contains are recorded for
+    the feed, and once it completes the feed's products missing from it
+    are deactivated or deleted in bulk. A snapshot older than one already
+    completed for the feed is not imported (nor reconciled), since it would
+    restore stale data; in a chain of snapshots (queue_import_sequence())
+    the later ones are only started once this one completes.
+    
+    A dry run goes through the same parsing, validation and SKU lookups but
+    writes nothing to products (nor to the feed's SKUs): it reports how
+    many products would be created, updated or left unchanged, ends with
+    status "validated" and keeps the file so the import can be started.
     
     Args:
         task_id: Unique task identifier
-        file_path: Path to uploaded CSV file
+        file_path: Path to uploaded file
+        checkpoint: Progress of a paused run to resume from
+        feed_id: Import feed the file is a snapshot of
+        dry_run: Count what the import would do without writing
+    
+    Returns:
+        Import summary with counts and stage timings
     """
-    db = SessionLocal()
+    result = _run_import(task_id, file_path, checkpoint, feed_id, dry_run)
+    if self.request.chain and result.get("status") != "completed":
+        defer_sequence(self.request.chain, task_id, result.get("status"))
+        # Celery starts the next link after this returns, unless the chain is cleared
+        self.request.chain = None
+    return result
+
+
+def defer_sequence(links: List[Dict], task_id: str, status: str):
+    """
+    Stage the imports left in a chain whose import did not complete.
+    
+    Their files are kept; each can be started with POST
+    /api/imports/{task_id}/start once the earlier snapshot is dealt with.
+    
+    Args:
+        links: Remaining chain (Celery signature dicts, last one next)
+        task_id: Import that ended the chain
+        status: How it ended
+    """
+    message = f"Not started: earlier snapshot {task_id} of this feed ended {status}"
+    for link in links:
+        deferred_task_id = link["args"][0]
+        update_progress(deferred_task_id, "staged", 0, 0, message)
+        record_import_job(deferred_task_id, status="staged", message=message)
+
+
+def _run_import(
+    task_id: str,
+    file_path: str,
+    checkpoint: Dict = None,
+    feed_id: int = None,
+    dry_run: bool = False
+) -> Dict:
+    """Body of import_products_task()."""
+    checkpoint = checkpoint or {}
     errors = []
-    processed = 0
-    created = 0
-    updated = 0
+    processed = checkpoint.get("processed", 0)
+    created = checkpoint.get("created", 0)
+    updated = checkpoint.get("updated", 0)
+    unchanged = checkpoint.get("unchanged", 0)
+    feed_id = feed_id or checkpoint.get("feed_id")
+    dry_run = dry_run or checkpoint.get("dry_run", False)
+    resumed_from = processed
+    keep_file = False
+    stats = ImportStageStats()
+    result = {"task_id": task_id, "status": "error"}
+    
+    # Cancelled or paused while still queued
+    action = handle_import_control(task_id, file_path, processed, 0, created, updated, errors)
+    if action is not None:
+        if action == CONTROL_PAUSE:
+            return {"task_id": task_id, "status": "paused"}
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception as e:
+            logger.error(f"Error cleaning up file: {str(e)}")
+        return {"task_id": task_id, "status": "cancelled"}
+    
+    db = SessionLocal()
+    feed = db.get(ImportFeed, feed_id) if feed_id else None
+    superseded_by = import_job_service.find_newer_feed_import(db, feed.id, task_id) if feed and not dry_run else None
+    if superseded_by:
+        message = f"Not imported: newer snapshot {superseded_by.task_id} of this feed already completed"
+        update_progress(task_id, "cancelled", processed, 0, message)
+        metrics.IMPORTS.inc(status="cancelled")
+        record_import_job(task_id, status="cancelled", message=message, finished_at=datetime.now(timezone.utc))
+        clear_checkpoint(task_id)
+        db.close()
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception as e:
+            logger.error(f"Error cleaning up file: {str(e)}")
+        return {"task_id": task_id, "status": "cancelled", "message": message}
+    
+    record_import_job(
+        task_id,
+        status="reading",
+        message="Dry run: parsing file..." if dry_run else "Parsing file...",
+        started_at=datetime.now(timezone.utc)
+    )
     
     try:
-        # Read file
-        update_progress(task_id, "reading", 0, 0, "Reading CSV file...")
-        
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
+        # Parse and validate the file in blocks, streaming it from disk
+        file_format, compression = detect_format(file_path)
+        format_label = describe_format(file_format, compression)
+        update_progress(task_id, "parsing", 0, 0, f"Parsing {format_label} file...")
         
-        # Parse CSV
-        update_progress(task_id, "parsing", 0, 0, "Parsing CSV file...")
-        rows = list(parse_csv_file(file_content))
-        total_rows = len(rows)
+        products_to_import = []
+        total_rows = 0
+        # SKUs of rejected rows still count as present in a feed snapshot,
+        # so a bad row never removes its product
+        rejected_skus = set()
+        for batch in iter_import_batches(
+            file_path, file_format, compression, csv_engine=settings.CSV_ENGINE, stats=stats
+        ):
+            total_rows += batch.rows
+            products_to_import.extend(batch.products)
+            errors.extend(batch.errors)
+            if feed and not dry_run:
+                rejected_skus.update(batch.rejected_skus)
+            update_progress(
+                task_id, "validating", 0, 0, f"Validated {total_rows} rows...", errors, stats
+            )
         
         if total_rows == 0:
-            update_progress(task_id, "error", 0, 0, "CSV file is empty", [])
-            return
+            update_progress(task_id, "error", 0, 0, "File is empty", [], stats)
+            metrics.IMPORTS.inc(status="error")
+            finish_import_job(task_id, "error", stats, message="File is empty")
+            result["message"] = "File is empty"
+            return result
         
-        update_progress(task_id, "validating", 0, total_rows, f"Validating {total_rows} rows...")
+        if not dry_run:
+            metrics.IMPORT_ROWS.inc(len(errors), outcome="error")
+        total = len(products_to_import)
+        # Write in lock-bucket/SKU order so concurrent imports neither
+        # deadlock nor wait on each other for long (see write_order_key)
+        products_to_import.sort(key=write_order_key)
         
-        # Validate and prepare products
-        products_to_import = []
-        for idx, row in enumerate(rows, start=1):
-            is_valid, error_msg = validate_csv_row(row, idx)
-            if not is_valid:
-                errors.append(error_msg)
-                continue
-            
-            try:
-                product_dict = row_to_product_dict(row)
-                products_to_import.append(product_dict)
-            except Exception as e:
-                errors.append(f"Row {idx}: {str(e)}")
-                continue
+        def chunk_retried(reason: str, attempt: int):
+            logger.warning(f"Import {task_id}: retrying chunk after {reason} (attempt {attempt})")
+            metrics.IMPORT_CHUNK_RETRIES.inc(reason=reason)
+        
+        # Process in chunks, skipping what a paused run already committed
+        start_message = "Dry run: checking products..." if dry_run else "Importing products..."
+        update_progress(task_id, "importing", processed, total, start_message, stats=stats)
+        record_import_job(
+            task_id, status="importing", message=start_message, total_rows=total_rows, errors=errors
+        )
+        stats.mark_progress(processed)
         
-        # Process in chunks
-        update_progress(task_id, "importing", 0, len(products_to_import), "Importing products...")
+        # Dry run: rows a chunk would write, by lowercased SKU, so a SKU whose
+        # rows span chunks is not counted as created twice. Rows of a SKU are
+        # adjacent, so a resumed run only needs the last row already checked
+        planned_writes = {}
+        if dry_run and processed:
+            classify_products(db, products_to_import[processed - 1:processed], planned=planned_writes)
         
         chunk_size = 1000
-        for i in range(0, len(products_to_import), chunk_size):
+        for i in range(processed, total, chunk_size):
+            action = handle_import_control(
+                task_id, file_path, processed, total, created, updated, errors, stats, unchanged, feed_id, dry_run
+            )
+            if action is not None:
+                keep_file = action == CONTROL_PAUSE
+                result["status"] = "paused" if keep_file else "cancelled"
+                return result
+            
             chunk = products_to_import[i:i + chunk_size]
-            chunk_created, chunk_updated = bulk_upsert_products(db, chunk)
+            if dry_run:
+                chunk_created, chunk_updated, chunk_unchanged = classify_products(db, chunk, stats, planned_writes)
+                created += chunk_created
+                updated += chunk_updated
+                unchanged += chunk_unchanged
+                processed += len(chunk)
+                stats.mark_progress(processed)
+                progress_msg = f"Dry run: checked {processed}/{total} products..."
+                update_progress(task_id, "importing", processed, total, progress_msg, errors, stats)
+                record_import_job(
+                    task_id,
+                    message=progress_msg,
+                    processed=processed,
+                    created_count=created,
+                    updated_count=updated,
+                    unchanged_count=unchanged,
+                    rows_per_sec=stats.rows_per_sec,
+                )
+                continue
+            
+            chunk_started = time.perf_counter()
+            with sql_profiler.profile_unit("import_chunk", "import_products"):
+                chunk_created, chunk_updated, chunk_unchanged = retry_write(
+                    db, lambda: bulk_upsert_products(db, chunk, stats), chunk_retried
+                )
+                if feed:
+                    with stats.stage("feed", len(chunk)):
+                        chunk_skus = {p['sku'].lower() for p in chunk}
+                        retry_write(db, lambda: mark_feed_skus(db, feed.id, task_id, chunk_skus), chunk_retried)
+            metrics.IMPORT_CHUNK_SECONDS.observe(time.perf_counter() - chunk_started)
+            metrics.IMPORT_ROWS.inc(chunk_created, outcome="created")
+            metrics.IMPORT_ROWS.inc(chunk_updated, outcome="updated")
+            metrics.IMPORT_ROWS.inc(chunk_unchanged, outcome="unchanged")
             created += chunk_created
             updated += chunk_updated
+            unchanged += chunk_unchanged
             processed += len(chunk)
+            stats.mark_progress(processed)
             
             # Update progress
-            progress_msg = f"Imported {processed}/{len(products_to_import)} products..."
-            update_progress(task_id, "importing", processed, len(products_to_import), progress_msg, errors)
+            progress_msg = f"Imported {processed}/{total} products..."
+            update_progress(task_id, "importing", processed, total, progress_msg, errors, stats)
+            record_import_job(
+                task_id,
+                message=progress_msg,
+                processed=processed,
+                created_count=created,
+                updated_count=updated,
+                unchanged_count=unchanged,
+                rows_per_sec=stats.rows_per_sec,
+            )
+            metrics.publish(force=False)
+        
+        if dry_run:
+            final_message = (
+                f"Dry run complete! Would create: {created}, Would update: {updated}, "
+                f"Unchanged: {unchanged}, Errors: {len(errors)}"
+            )
+            update_progress(task_id, "validated", processed, total, final_message, errors, stats)
+            metrics.IMPORTS.inc(status="validated")
+            finish_import_job(
+                task_id,
+                "validated",
+                stats,
+                rows=processed - resumed_from,
+                message=final_message,
+                processed=processed,
+                created_count=created,
+                updated_count=updated,
+                unchanged_count=unchanged,
+                errors=errors,
+            )
+            # The import itself may be started next
+            keep_file = True
+            result.update({
+                "status": "validated",
+                "dry_run": True,
+                "total_rows": total_rows,
+                "processed": processed,
+                "would_create": created,
+                "would_update": updated,
+                "unchanged": unchanged,
+                "errors": len(errors),
+            })
+            return result
+        
+        # Remove the feed's products that this snapshot no longer contains
+        removed = 0
+        removed_label = None
+        kept_message = ""
+        superseded_by = import_job_service.find_newer_feed_import(db, feed.id, task_id) if feed else None
+        if superseded_by:
+            # A newer snapshot completed while this one ran; its view of the feed stands
+            kept_message = f" Feed not reconciled: newer snapshot {superseded_by.task_id} completed first."
+        elif feed:
+            update_progress(
+                task_id, "importing", processed, total, "Removing products missing from the feed...", errors, stats
+            )
+            with stats.stage("feed"):
+                retry_write(db, lambda: mark_feed_skus(db, feed.id, task_id, rejected_skus), chunk_retried)
+                reconciliation = retry_write(db, lambda: reconcile_feed(db, feed, task_id), chunk_retried)
+            removed = reconciliation["removed"]
+            if reconciliation["skipped"]:
+                kept_message = (
+                    f" {reconciliation['missing']} feed products missing from the file were kept "
+                    f"(over FEED_MAX_MISSING_RATIO)."
+                )
+            else:
+                removed_label = "Deleted" if feed.missing_action == FeedMissingAction.DELETE else "Deactivated"
         
         # Trigger webhook for import completion
         try:
-            trigger_webhooks_sync(
-                db,
+            enqueue_webhooks(
                 WebhookEventType.IMPORT_COMPLETED,
                 {
                     "task_id": task_id,
@@ -105,6 +571,8 @@ def import_products_task(self, task_id: str, file_path: str):
                     "processed": processed,
                     "created": created,
                     "updated": updated,
+                    "unchanged": unchanged,
+                    "removed": removed,
                     "errors": len(errors)
                 }
             )
@@ -112,18 +580,58 @@ def import_products_task(self, task_id: str, file_path: str):
             logger.error(f"Error triggering webhook: {str(e)}")
         
         # Final status
-        final_message = f"Import complete! Created: {created}, Updated: {updated}, Errors: {len(errors)}"
-        update_progress(task_id, "completed", processed, len(products_to_import), final_message, errors)
-        
+        final_message = f"Import complete! Created: {created}, Updated: {updated}, Unchanged: {unchanged}"
+        if removed_label:
+            final_message += f", {removed_label}: {removed}"
+        final_message += f", Errors: {len(errors)}{kept_message}"
+        update_progress(task_id, "completed", processed, total, final_message, errors, stats)
+        metrics.IMPORTS.inc(status="completed")
+        finish_import_job(
+            task_id,
+            "completed",
+            stats,
+            rows=processed - resumed_from,
+            message=final_message,
+            processed=processed,
+            created_count=created,
+            updated_count=updated,
+            unchanged_count=unchanged,
+            removed_count=removed,
+            errors=errors,
+        )
+        result.update({
+            "status": "completed",
+            "total_rows": total_rows,
+            "processed": processed,
+            "created": created,
+            "updated": updated,
+            "unchanged": unchanged,
+            "removed": removed,
+            "errors": len(errors),
+        })
+        return result
+    
     except Exception as e:
         logger.error(f"Import task error: {str(e)}", exc_info=True)
-        update_progress(task_id, "error", processed, 0, f"Import failed: {str(e)}", errors + [str(e)])
+        update_progress(task_id, "error", processed, 0, f"Import failed: {str(e)}", errors + [str(e)], stats)
+        metrics.IMPORTS.inc(status="error")
+        finish_import_job(
+            task_id, "error", stats, message=f"Import failed: {str(e)}", errors=errors + [str(e)]
+        )
+        result["message"] = str(e)
+        return result
     finally:
         db.close()
-        # Clean up file
+        # Mutates the dict already being returned, so every exit path carries timings
+        result.update(stats.snapshot())
         try:
-            if os.path.exists(file_path):
+            publish_sql_profile()
+            metrics.publish()
+        except Exception as e:
+            logger.error(f"Error publishing profiling data: {str(e)}")
+        # Clean up file (a paused import needs it to resume)
+        try:
+            if not keep_file and os.path.exists(file_path):
                 os.remove(file_path)
         except Exception as e:
             logger.error(f"Error cleaning up file: {str(e)}")
-
@@ -0,0 +1,210 @@
+"""Periodic housekeeping tasks (maintenance lane, scheduled by Celery beat)."""
+import os
+import uuid
+from typing import Dict, List, Optional, Tuple
+from app.tasks.celery_app import celery_app
+# Module import: import_tasks loads celery_app, which imports this module
+from app.tasks import import_tasks
+from app.config import settings
+from app.database import SessionLocal
+from app.services import import_job_service
+from app.services.admission import check_admission
+from app.services.catalog_stats import compact_catalog_stats, reconcile_catalog_stats
+from app.services.change_feed import compact_catalog_generation, prune_tombstones
+from app.services.feed_service import get_feed_by_name
+from app.services.import_formats import UnsupportedFormatError, detect_format, describe_format
+from app.services.ingest import (
+    INGEST_CLIENT_ID, IngestFile, claim_file, find_ready_files, reject_file, return_file
+)
+from app.services.product_service import retry_write
+from app.services.upload_sessions import hash_file, prune_expired_sessions
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="maintenance.prune_product_tombstones", ignore_result=True)
+def prune_product_tombstones_task():
+    """Delete change feed tombstones older than TOMBSTONE_RETENTION_DAYS."""
+    db = SessionLocal()
+    try:
+        pruned = prune_tombstones(db)
+        if pruned:
+            logger.info(f"Pruned {pruned} product tombstones")
+    finally:
+        db.close()
+
+
+@celery_app.task(name="maintenance.compact_catalog_stats", ignore_result=True)
+def compact_catalog_stats_task():
+    """Fold the pending catalog count deltas and generation bumps into their rows."""
+    db = SessionLocal()
+    try:
+        compact_catalog_stats(db)
+        compact_catalog_generation(db)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="maintenance.reconcile_catalog_stats")
+def reconcile_catalog_stats_task():
+    """Count the products table and correct drift of the maintained catalog counts."""
+    db = SessionLocal()
+    try:
+        # Retried if a compaction updates the counts row at the same time
+        drift = retry_write(db, lambda: reconcile_catalog_stats(db))
+        if drift["total_drift"] or drift["active_drift"]:
+            logger.warning(f"Corrected catalog stats drift: {drift}")
+        return drift
+    finally:
+        db.close()
+
+
+@celery_app.task(name="maintenance.prune_upload_sessions", ignore_result=True)
+def prune_upload_sessions_task():
+    """Delete files of resumable upload sessions that expired."""
+    removed = prune_expired_sessions()
+    if removed:
+        logger.info(f"Removed files of {len(removed)} expired upload sessions")
+
+
+def _register_claimed_file(
+    db, ingest_file: IngestFile, task_id: str, file_path: str, feed_id: Optional[int], batch_id: str
+) -> Optional[str]:
+    """
+    Record a claimed file in the ledger, unless it is a duplicate or not importable.
+    
+    Returns:
+        None once the import is recorded, otherwise "duplicate" or "rejected"
+    """
+    try:
+        file_format = describe_format(*detect_format(file_path))
+    except UnsupportedFormatError as e:
+        rejected_path = reject_file(ingest_file, file_path)
+        import_job_service.create_import_job(
+            db, task_id, ingest_file.name, ingest_file.size, None,
+            status="error", client_id=INGEST_CLIENT_ID, feed_id=feed_id, batch_id=batch_id,
+            message=f"{str(e)} File moved to {rejected_path}"
+        )
+        return "rejected"
+    
+    content_hash = hash_file(file_path)
+    if settings.INGEST_SKIP_DUPLICATES:
+        duplicate = import_job_service.find_completed_import(
+            db, content_hash, settings.DUPLICATE_UPLOAD_WINDOW_HOURS
+        )
+        if duplicate:
+            os.remove(file_path)
+            logger.info(f"Ingest file {ingest_file.path} was already imported by task {duplicate.task_id}; removed")
+            return "duplicate"
+    
+    import_job_service.create_import_job(
+        db, task_id, ingest_file.name, ingest_file.size, content_hash,
+        client_id=INGEST_CLIENT_ID, feed_id=feed_id, file_format=file_format, batch_id=batch_id
+    )
+    return None
+
+
+def _fail_queued(claimed: List[Tuple[IngestFile, str, str]], error: Exception) -> None:
+    """Mark imports that could not be queued as failed and put their files back for the next scan."""
+    message = f"Error starting import task: {str(error)}. File returned to the ingest directory."
+    for ingest_file, task_id, file_path in claimed:
+        return_file(ingest_file, file_path)
+        import_tasks.update_progress(task_id, "error", 0, 0, message)
+        import_tasks.record_import_job(task_id, status="error", message=message)
+
+
+@celery_app.task(name="maintenance.scan_ingest_dir")
+def scan_ingest_dir_task() -> Optional[Dict]:
+    """
+    Claim the settled files of the ingest directory and queue their imports as one batch.
+    
+    Files are imported where they are (renamed to their upload path, never
+    copied) and reported like uploads: progress, ledger entries (client_id
+    "ingest", sharing a batch_id) and webhooks. Snapshots of one feed in a
+    batch run one after another, oldest first; other imports run in
+    parallel. Admission limits apply: once one is hit, the remaining files
+    wait for a later scan, as do files of a feed subdirectory with no
+    matching feed. Overlapping scans are safe, since each file can be
+    claimed only once.
+    
+    Returns:
+        None if no file was ready, otherwise a dict with batch_id, the
+        queued task IDs and the numbers of duplicate, rejected and deferred
+        files
+    """
+    files = find_ready_files()
+    if not files:
+        return None
+    
+    batch_id = str(uuid.uuid4())
+    summary = {"batch_id": batch_id, "queued": [], "duplicates": 0, "rejected": 0, "deferred": 0}
+    # feed_id (None for plain imports) -> claimed files in arrival order
+    claimed: Dict[Optional[int], List[Tuple[IngestFile, str, str]]] = {}
+    feed_ids: Dict[str, Optional[int]] = {}
+    db = SessionLocal()
+    try:
+        for position, ingest_file in enumerate(files):
+            feed_id = None
+            if ingest_file.feed_name is not None:
+                if ingest_file.feed_name not in feed_ids:
+                    feed = get_feed_by_name(db, ingest_file.feed_name)
+                    feed_ids[ingest_file.feed_name] = feed.id if feed else None
+                    if not feed:
+                        logger.warning(f"Ingest directory {ingest_file.feed_name}/ matches no feed; its files wait")
+                feed_id = feed_ids[ingest_file.feed_name]
+                if feed_id is None:
+                    summary["deferred"] += 1
+                    continue
+            
+            # The file is on disk already: no upload bytes to admit
+            rejection = check_admission(db, 0, INGEST_CLIENT_ID)
+            if rejection:
+                logger.info(f"Ingest scan stopped: {rejection['detail']}")
+                summary["deferred"] += len(files) - position
+                break
+            
+            task_id = str(uuid.uuid4())
+            file_path = import_job_service.upload_file_path(task_id)
+            if not claim_file(ingest_file, file_path):
+                continue
+            try:
+                outcome = _register_claimed_file(db, ingest_file, task_id, file_path, feed_id, batch_id)
+            except Exception:
+                db.rollback()
+                return_file(ingest_file, file_path)
+                raise
+            if outcome == "duplicate":
+                summary["duplicates"] += 1
+            elif outcome == "rejected":
+                summary["rejected"] += 1
+            else:
+                claimed.setdefault(feed_id, []).append((ingest_file, task_id, file_path))
+    finally:
+        db.close()
+    
+    for feed_id, group in claimed.items():
+        # Plain imports are queued one by one; a feed's sequence in one call
+        queued = []
+        try:
+            if feed_id is None:
+                for ingest_file, task_id, file_path in group:
+                    import_tasks.queue_import(task_id, file_path, ingest_file.size)
+                    queued.append(task_id)
+            else:
+                import_tasks.queue_import_sequence(
+                    [(task_id, file_path, ingest_file.size) for ingest_file, task_id, file_path in group], feed_id
+                )
+                queued = [task_id for _, task_id, _ in group]
+        except Exception as e:
+            logger.error(f"Error queueing ingest batch {batch_id}: {str(e)}")
+            # Imports already sent to the broker keep their files
+            _fail_queued([claim for claim in group if claim[1] not in queued], e)
+        summary["queued"] += queued
+    
+    if summary["queued"] or summary["duplicates"] or summary["rejected"]:
+        logger.info(
+            f"Ingest batch {batch_id}: {len(summary['queued'])} imports queued, {summary['duplicates']} duplicates, "
+            f"{summary['rejected']} rejected, {summary['deferred']} deferred"
+        )
+    return summary
@@ -0,0 +1,38 @@
+"""Celery tasks for webhook delivery."""
+from typing import Dict
+from app.tasks.celery_app import celery_app
+from app.database import SessionLocal
+from app.services.webhook_service import trigger_webhooks_sync
+from app.models import WebhookEventType
+from app.services import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="deliver_webhooks", ignore_result=True)
+def deliver_webhooks_task(event_type: str, payload: Dict):
+    """
+    Celery task to deliver an event to all enabled webhooks.
+    
+    Args:
+        event_type: WebhookEventType value (e.g. "product.created")
+        payload: JSON-serializable event data
+    """
+    db = SessionLocal()
+    try:
+        results = trigger_webhooks_sync(db, WebhookEventType(event_type), payload)
+        failed = [r for r in results if not r.get("success")]
+        if failed:
+            logger.warning(f"{len(failed)}/{len(results)} webhooks failed for {event_type}")
+    finally:
+        db.close()
+        try:
+            metrics.publish(force=False)
+        except Exception as e:
+            logger.error(f"Error publishing metrics: {str(e)}")
+
+
+def enqueue_webhooks(event_type: WebhookEventType, payload: Dict):
+    """Queue delivery of an event on the webhooks lane."""
+    deliver_webhooks_task.delay(event_type.value, payload)
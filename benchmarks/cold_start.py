@@ -0,0 +1,68 @@
+"""
+Measure cold start of the web app: process spawn to first served request.
+
+Starts uvicorn in a subprocess, polls ``/api/health`` until it answers and
+reports the wall time together with the app's own startup metrics.
+
+Usage:
+    python -m benchmarks.cold_start [--runs 5] [--workers 1] [--port 8765]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def measure_once(port: int, workers: int, timeout: float = 60.0) -> dict:
+    """Start the app once and return timings for the first health check."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ]
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/api/health"
+        while time.perf_counter() - started < timeout:
+            try:
+                response = httpx.get(url, timeout=1.0)
+                if response.status_code == 200:
+                    return {
+                        "spawn_to_first_response_ms": round((time.perf_counter() - started) * 1000, 1),
+                        "app": response.json().get("startup", {}),
+                    }
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.05)
+        raise RuntimeError(f"App did not answer on {url} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    runs = [measure_once(args.port, args.workers) for _ in range(args.runs)]
+    totals = [r["spawn_to_first_response_ms"] for r in runs]
+    report = {
+        "workers": args.workers,
+        "runs": runs,
+        "median_ms": statistics.median(totals),
+        "max_ms": max(totals),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Shared helpers for the benchmark scripts."""
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # ru_maxrss is the lifetime peak (KiB on Linux); best effort elsewhere
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageMeter:
+    """
+    Measures wall time and peak RSS of one benchmark stage.
+    
+    RSS is sampled from a background thread, so the peak is per stage rather
+    than the process-lifetime maximum.
+    """
+
+    def __init__(self, name: str, interval: float = 0.01):
+        self.name = name
+        self.interval = interval
+        self.items = 0
+        self.seconds = 0.0
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_rss = current_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._started
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, current_rss())
+        return False
+
+    def result(self) -> Dict:
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "seconds": round(self.seconds, 4),
+            "rows_per_sec": round(self.items / self.seconds, 1) if self.seconds > 0 else None,
+            "peak_rss_mb": round(self.peak_rss / (1024 * 1024), 1),
+        }
+
+
+def make_session_factory(database_url: Optional[str]):
+    """
+    Session factory for the benchmark database.
+    
+    Without a URL a temporary SQLite file stands in for Postgres, which is
+    good for comparing Python-side stages but not for absolute DB numbers.
+    """
+    from app.database import Base
+    import app.models  # noqa: F401
+
+    if not database_url:
+        handle, path = tempfile.mkstemp(prefix="bench_", suffix=".db")
+        os.close(handle)
+        database_url = f"sqlite:///{path}"
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def environment_info(engine=None) -> Dict:
+    """Describe the machine and code revision a result was produced on."""
+    try:
+        revision = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "database": engine.dialect.name if engine is not None else None,
+    }
+
+
+def save_result(name: str, result: Dict, output: Optional[str] = None) -> str:
+    """Write a result document as JSON and return its path."""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    return output
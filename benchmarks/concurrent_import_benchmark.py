@@ -0,0 +1,214 @@
+"""
+Concurrent import benchmark.
+
+Runs 1, 2, 4, ... imports at the same time, each in its own process and
+database session, writing chunks exactly as import_products_task does
+(write_order_key() order, bulk_upsert_products() wrapped in retry_write()).
+Each import carries its own SKUs plus a share of SKUs common to all of
+them (--overlap), so the imports contend for the same rows.
+
+For every concurrency level it reports the aggregate rows/sec (all rows
+written / wall time), the per-import rows/sec, the time spent waiting for
+SKU-bucket advisory locks, chunk retries by reason and failed imports.
+Run with --lock-buckets 0 --unordered to reproduce the old behaviour
+(no locks, file order) for comparison.
+
+Needs a dedicated Postgres database; its products table is emptied before
+each concurrency level.
+
+Results are printed and saved as JSON under benchmarks/results/ (or
+--output).
+
+Usage:
+    python -m benchmarks.concurrent_import_benchmark --database-url postgresql://.../bench \
+        [--rows 50000] [--concurrency 1,2,4,8] [--overlap 0.5] [--chunk-size 1000] \
+        [--lock-buckets 1024] [--unordered]
+"""
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import environment_info, make_session_factory, save_result
+from benchmarks.generate_catalog import sku_for
+from app.config import settings
+from app.models import Product
+from app.services.import_stats import ImportStageStats
+from app.services.product_service import bulk_upsert_products, retry_write, write_order_key
+
+# Processes start together at a common wall-clock time, after engine setup
+START_DELAY_SECONDS = 2.0
+
+
+def make_products(index: int, rows: int, overlap: float, seed: int) -> list:
+    """Products of one import: the shared SKUs (named per import) plus its own."""
+    shared = int(rows * overlap)
+    products = [
+        {"sku": sku_for(i), "name": f"Import {index} product {i}", "description": None, "active": True}
+        for i in range(shared)
+    ]
+    first_own = 1_000_000_000 - (index + 1) * rows
+    products += [
+        {"sku": sku_for(first_own + i), "name": f"Import {index} own {i}", "description": None, "active": True}
+        for i in range(rows - shared)
+    ]
+    random.Random(seed + index).shuffle(products)  # file order
+    return products
+
+
+def run_import(
+    database_url: str,
+    index: int,
+    rows: int,
+    overlap: float,
+    chunk_size: int,
+    lock_buckets: int,
+    unordered: bool,
+    seed: int,
+    start_at: float
+) -> dict:
+    """One import, run in a worker process; returns its timings and counters."""
+    settings.IMPORT_LOCK_BUCKETS = lock_buckets
+    engine = create_engine(database_url, pool_size=1)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    products = make_products(index, rows, overlap, seed)
+    if not unordered:
+        products.sort(key=write_order_key)
+
+    retries = Counter()
+    stats = ImportStageStats()
+    created = updated = unchanged = 0
+    error = None
+    db = Session()
+    time.sleep(max(0.0, start_at - time.time()))
+    started = time.perf_counter()
+    try:
+        for i in range(0, len(products), chunk_size):
+            chunk = products[i:i + chunk_size]
+            chunk_created, chunk_updated, chunk_unchanged = retry_write(
+                db,
+                lambda: bulk_upsert_products(db, chunk, stats),
+                lambda reason, attempt: retries.update([reason])
+            )
+            created += chunk_created
+            updated += chunk_updated
+            unchanged += chunk_unchanged
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e).splitlines()[0]}"
+    finally:
+        db.close()
+        engine.dispose()
+    seconds = time.perf_counter() - started
+    return {
+        "import": index,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+        "created": created,
+        "updated": updated,
+        "unchanged": unchanged,
+        "lock_wait_seconds": round(stats.stages.get("lock", {}).get("seconds", 0.0), 4),
+        "retries": dict(retries),
+        "error": error,
+    }
+
+
+def empty_products(Session):
+    db = Session()
+    try:
+        db.query(Product).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_level(args, Session, concurrency: int) -> dict:
+    """Run `concurrency` imports at once and aggregate their results."""
+    empty_products(Session)
+    start_at = time.time() + START_DELAY_SECONDS
+    with ProcessPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(
+                run_import, args.database_url, index, args.rows, args.overlap, args.chunk_size,
+                args.lock_buckets, args.unordered, args.seed, start_at
+            )
+            for index in range(concurrency)
+        ]
+        imports = [future.result() for future in futures]
+
+    wall = max(i["seconds"] for i in imports)
+    written = sum(args.rows for i in imports if i["error"] is None)
+    retries = Counter()
+    for i in imports:
+        retries.update(i["retries"])
+    return {
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 4),
+        "rows_written": written,
+        "aggregate_rows_per_sec": round(written / wall, 1) if wall > 0 else None,
+        "lock_wait_seconds": round(sum(i["lock_wait_seconds"] for i in imports), 4),
+        "retries": dict(retries),
+        "failed_imports": sum(1 for i in imports if i["error"] is not None),
+        "imports": imports,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Dedicated Postgres benchmark database")
+    parser.add_argument("--rows", type=int, default=50000, help="Rows per import")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated numbers of concurrent imports")
+    parser.add_argument("--overlap", type=float, default=0.5, help="Share of each import's SKUs common to all imports")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--lock-buckets", type=int, default=settings.IMPORT_LOCK_BUCKETS,
+                        help="SKU-hash advisory lock buckets (0 disables locking)")
+    parser.add_argument("--unordered", action="store_true",
+                        help="Write chunks in file order instead of write_order_key() order")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    engine, Session = make_session_factory(args.database_url)
+    if engine.dialect.name != "postgresql":
+        parser.error("--database-url must point to a Postgres database")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    results = []
+    for concurrency in levels:
+        level = run_level(args, Session, concurrency)
+        print(
+            f"{concurrency:>3} imports: {level['aggregate_rows_per_sec']} rows/s, "
+            f"lock wait {level['lock_wait_seconds']}s, retries {level['retries']}, "
+            f"failed {level['failed_imports']}"
+        )
+        results.append(level)
+
+    baseline = results[0]["aggregate_rows_per_sec"] if results else None
+    for level in results:
+        rate = level["aggregate_rows_per_sec"]
+        level["speedup"] = round(rate / baseline, 2) if baseline and rate else None
+
+    result = {
+        "benchmark": "concurrent_import",
+        "environment": environment_info(engine),
+        "parameters": {
+            "rows_per_import": args.rows,
+            "concurrency": levels,
+            "overlap": args.overlap,
+            "chunk_size": args.chunk_size,
+            "lock_buckets": args.lock_buckets,
+            "ordered": not args.unordered,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    print(json.dumps(result, indent=2))
+    print(f"Saved to {save_result('concurrent_import', result, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Synthetic product catalog generator for import benchmarks.
+
+Writes a CSV with the importer's columns (sku, name, description) plus
+optional filler columns. The mix of new and existing SKUs, in-file
+duplicates and invalid rows is configurable and reproducible via --seed.
+
+SKUs are SKU-000000000 .. ; the first ``rows * update_ratio`` distinct SKUs
+form the "existing catalog" that the import benchmark seeds before the
+upsert stage (see existing_skus()).
+
+Usage:
+    python -m benchmarks.generate_catalog --rows 100000 --output /tmp/catalog.csv \
+        [--description-bytes 200] [--duplicate-ratio 0.01] [--invalid-ratio 0.001] \
+        [--update-ratio 0.5] [--extra-columns 0] [--seed 42]
+"""
+import argparse
+import csv
+import random
+import string
+from typing import Iterator
+
+WORDS = (
+    "steel", "cotton", "wireless", "compact", "premium", "organic", "classic", "portable",
+    "ergonomic", "waterproof", "vintage", "smart", "deluxe", "eco", "heavy-duty", "mini",
+    "lamp", "chair", "bottle", "speaker", "jacket", "backpack", "kettle", "monitor",
+    "notebook", "sneaker", "blender", "drill", "tent", "watch", "mug", "cable",
+)
+
+
+def sku_for(index: int) -> str:
+    return f"SKU-{index:09d}"
+
+
+def existing_skus(rows: int, update_ratio: float) -> Iterator[str]:
+    """SKUs that should already exist in the database for an update mix."""
+    for index in range(int(rows * update_ratio)):
+        yield sku_for(index)
+
+
+def _text(rng: random.Random, size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def generate_rows(
+    rows: int,
+    description_bytes: int = 200,
+    duplicate_ratio: float = 0.0,
+    invalid_ratio: float = 0.0,
+    update_ratio: float = 0.0,
+    extra_columns: int = 0,
+    seed: int = 42,
+) -> Iterator[list]:
+    """Yield data rows (without header) for a synthetic catalog."""
+    rng = random.Random(seed)
+    existing = int(rows * update_ratio)
+    next_existing = 0
+    next_new = existing
+    emitted = []
+
+    for _ in range(rows):
+        roll = rng.random()
+        if emitted and roll < duplicate_ratio:
+            # Same SKU again, sometimes in a different case
+            sku = rng.choice(emitted)
+            if rng.random() < 0.5:
+                sku = sku.lower()
+        elif next_existing < existing and rng.random() < update_ratio:
+            sku = sku_for(next_existing)
+            next_existing += 1
+        else:
+            sku = sku_for(next_new)
+            next_new += 1
+
+        if len(emitted) < 100000:
+            emitted.append(sku)
+        else:
+            emitted[rng.randrange(len(emitted))] = sku
+
+        name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {rng.randint(1, 9999)}"
+        size = rng.randint(description_bytes // 2, description_bytes * 3 // 2) if description_bytes else 0
+        description = _text(rng, size) if size else ""
+
+        if rng.random() < invalid_ratio:
+            if rng.random() < 0.5:
+                sku = ""
+            else:
+                name = "  "
+
+        row = [sku, name, description]
+        for _ in range(extra_columns):
+            row.append("".join(rng.choices(string.ascii_letters, k=8)))
+        yield row
+
+
+def write_catalog(path: str, rows: int, extra_columns: int = 0, **kwargs) -> int:
+    """Write a synthetic catalog CSV and return its size in bytes."""
+    header = ["sku", "name", "description"] + [f"attr_{i}" for i in range(extra_columns)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(generate_rows(rows, extra_columns=extra_columns, **kwargs))
+        return f.tell()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Generator options, shared with the benchmarks that generate their own input."""
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--description-bytes", type=int, default=200)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0)
+    parser.add_argument("--invalid-ratio", type=float, default=0.0)
+    parser.add_argument("--update-ratio", type=float, default=0.0,
+                        help="Fraction of rows that update SKUs already in the catalog")
+    parser.add_argument("--extra-columns", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def generator_options(args) -> dict:
+    return {
+        "rows": args.rows,
+        "description_bytes": args.description_bytes,
+        "duplicate_ratio": args.duplicate_ratio,
+        "invalid_ratio": args.invalid_ratio,
+        "update_ratio": args.update_ratio,
+        "extra_columns": args.extra_columns,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    size = write_catalog(args.output, **generator_options(args))
+    print(f"Wrote {args.rows} rows ({size / (1024 * 1024):.1f}MB) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Import pipeline benchmark.
+
+Generates a synthetic catalog (or uses --input), then runs the stages of
+import_products_task one after another and reports rows/sec and peak RSS
+for each:
+
+    read      load the file from disk
+    parse     parse_csv_file()
+    validate  validate_csv_row() + row_to_product_dict()
+    upsert    bulk_upsert_products() in chunks, against --database-url
+
+With --engine, read, parse and validate are replaced by one streaming
+stage, iter_csv_batches() with that engine (as the import task runs it);
+its split between parsing and validation is reported under "engine".
+
+Without --database-url the upsert stage runs against a temporary SQLite
+database. Use a dedicated Postgres database for realistic upsert numbers;
+its products table is emptied before the run.
+
+Results are printed and saved as JSON under benchmarks/results/ (or
+--output) so runs can be compared over time.
+
+Usage:
+    python -m benchmarks.import_benchmark --rows 100000 --update-ratio 0.3 \
+        [--database-url postgresql://.../bench] [--chunk-size 1000] \
+        [--engine rows|batched|pyarrow]
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.common import StageMeter, environment_info, make_session_factory, save_result
+from benchmarks.generate_catalog import add_arguments, existing_skus, generator_options, write_catalog
+from app.models import Product
+from app.services.csv_processor import (
+    CSV_ENGINES, iter_csv_batches, parse_csv_file, validate_csv_row, row_to_product_dict
+)
+from app.services.import_stats import ImportStageStats
+from app.services.product_service import bulk_upsert_products
+
+
+def seed_existing(Session, skus, batch_size: int = 10000) -> int:
+    """Empty the products table and insert the existing catalog for an update mix."""
+    db = Session()
+    try:
+        db.query(Product).delete()
+        batch = []
+        count = 0
+        for sku in skus:
+            batch.append({"sku": sku, "name": f"Existing {sku}", "description": None, "active": True})
+            if len(batch) >= batch_size:
+                db.bulk_insert_mappings(Product, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            db.bulk_insert_mappings(Product, batch)
+            count += len(batch)
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def parse_per_row(file_path: str):
+    """Read, parse and validate the file whole, one dict per row; returns rows, products, errors and meters."""
+    with StageMeter("read") as read:
+        with open(file_path, "rb") as f:
+            file_content = f.read()
+
+    with StageMeter("parse") as parse:
+        rows = list(parse_csv_file(file_content))
+    total_rows = len(rows)
+    read.items = parse.items = total_rows
+    del file_content
+
+    errors = []
+    products = []
+    with StageMeter("validate") as validate:
+        for idx, row in enumerate(rows, start=1):
+            is_valid, error_msg = validate_csv_row(row, idx)
+            if not is_valid:
+                errors.append(error_msg)
+                continue
+            products.append(row_to_product_dict(row))
+    validate.items = total_rows
+    del rows
+    return total_rows, products, errors, [read, parse, validate]
+
+
+def parse_with_engine(file_path: str, engine: str):
+    """Parse and validate with iter_csv_batches(); returns rows, products, errors and the meter."""
+    stats = ImportStageStats()
+    total_rows = 0
+    products = []
+    errors = []
+    with StageMeter(f"parse+validate ({engine})") as meter:
+        with open(file_path, "rb") as f:
+            for batch in iter_csv_batches(f, engine, stats=stats):
+                total_rows += batch.rows
+                products.extend(batch.products)
+                errors.extend(batch.errors)
+    meter.items = total_rows
+    split = {
+        name: {"seconds": round(stats.stages[name]["seconds"], 4), "items": stats.stages[name]["items"]}
+        for name in ("parse", "validate")
+    }
+    return total_rows, products, errors, meter, split
+
+
+def run(file_path: str, Session, chunk_size: int, engine: str = None) -> dict:
+    """Run the import stages on a file and return per-stage results."""
+    stages = []
+    engine_split = None
+
+    if engine:
+        total_rows, products, errors, meter, engine_split = parse_with_engine(file_path, engine)
+        meters = [meter]
+    else:
+        total_rows, products, errors, meters = parse_per_row(file_path)
+
+    created = updated = unchanged = 0
+    db = Session()
+    try:
+        with StageMeter("upsert") as upsert:
+            for i in range(0, len(products), chunk_size):
+                chunk_created, chunk_updated, chunk_unchanged = bulk_upsert_products(
+                    db, products[i:i + chunk_size]
+                )
+                created += chunk_created
+                updated += chunk_updated
+                unchanged += chunk_unchanged
+        upsert.items = len(products)
+    finally:
+        db.close()
+
+    for meter in meters + [upsert]:
+        stages.append(meter.result())
+
+    total_seconds = sum(s["seconds"] for s in stages)
+    result = {
+        "rows": total_rows,
+        "valid_rows": len(products),
+        "errors": len(errors),
+        "created": created,
+        "updated": updated,
+        "unchanged": unchanged,
+        "total_seconds": round(total_seconds, 4),
+        "rows_per_sec": round(total_rows / total_seconds, 1) if total_seconds else None,
+        "stages": stages,
+    }
+    if engine_split:
+        result["engine"] = {"name": engine, **engine_split}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--input", help="Existing CSV to import instead of generating one")
+    parser.add_argument("--database-url", help="Dedicated benchmark database (default: temporary SQLite)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--engine", choices=CSV_ENGINES,
+                        help="Stream through iter_csv_batches() with this engine (default: per-row stages)")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    engine, Session = make_session_factory(args.database_url)
+    options = generator_options(args)
+
+    generated = None
+    file_path = args.input
+    if file_path is None:
+        handle, generated = tempfile.mkstemp(prefix="catalog_", suffix=".csv")
+        os.close(handle)
+        write_catalog(generated, **options)
+        file_path = generated
+
+    try:
+        seeded = seed_existing(Session, existing_skus(args.rows, args.update_ratio) if not args.input else [])
+        result = {
+            "benchmark": "import",
+            "environment": environment_info(engine),
+            "parameters": {
+                **(options if not args.input else {"input": args.input}),
+                "chunk_size": args.chunk_size,
+                "engine": args.engine,
+                "file_bytes": os.path.getsize(file_path),
+                "seeded_products": seeded,
+            },
+            "results": run(file_path, Session, args.chunk_size, args.engine),
+        }
+    finally:
+        if generated:
+            os.remove(generated)
+
+    print(json.dumps(result, indent=2))
+    print(f"Saved to {save_result('import', result, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
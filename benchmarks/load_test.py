@@ -0,0 +1,334 @@
+"""
+API load test for product listing, search and CRUD at catalog scale.
+
+Seeds a catalog of --catalog-size products, registers webhooks pointing at
+a local stub receiver and drives the API with --concurrency clients over a
+weighted request mix for --duration seconds. Reports latency percentiles
+and throughput per endpoint and saves the result as JSON.
+
+By default the FastAPI app runs in-process (httpx ASGI transport) against
+--database-url, with webhook deliveries executed eagerly so they reach the
+stub receiver without a Celery worker. With --base-url a running server is
+load-tested instead; --database-url must then point at that server's
+database (for seeding) and its workers must be able to reach the stub.
+
+The products table of --database-url is emptied before seeding; use a
+dedicated database.
+
+Usage:
+    python -m benchmarks.load_test --database-url postgresql://.../loadtest \
+        --catalog-size 1000000 --concurrency 32 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+# Weighted request mix: (label, weight)
+REQUEST_MIX = [
+    ("list_first_page", 25),
+    ("list_deep_page", 10),
+    ("search_sku", 15),
+    ("search_name", 10),
+    ("filter_active", 5),
+    ("get_product", 20),
+    ("create_product", 6),
+    ("update_product", 6),
+    ("delete_product", 3),
+]
+
+WEBHOOK_EVENTS = ("product.created", "product.updated", "product.deleted")
+
+
+def seed_catalog(database_url: str, size: int) -> Dict:
+    """Empty the products table, insert ``size`` products and return the id range."""
+    from sqlalchemy import text
+    from benchmarks.common import make_session_factory
+    from app.models import Product
+
+    engine, Session = make_session_factory(database_url)
+    db = Session()
+    try:
+        db.query(Product).delete()
+        if engine.dialect.name == "postgresql":
+            db.execute(text(
+                "INSERT INTO products (sku, name, description, active) "
+                "SELECT 'LOAD-' || lpad(g::text, 9, '0'), 'Load product ' || g, "
+                "'Seeded description for product ' || g, g % 10 <> 0 "
+                "FROM generate_series(1, :size) AS g"
+            ), {"size": size})
+        else:
+            batch_size = 10000
+            for start in range(1, size + 1, batch_size):
+                db.bulk_insert_mappings(Product, [
+                    {
+                        "sku": f"LOAD-{g:09d}",
+                        "name": f"Load product {g}",
+                        "description": f"Seeded description for product {g}",
+                        "active": g % 10 != 0,
+                    }
+                    for g in range(start, min(start + batch_size, size + 1))
+                ])
+        db.commit()
+        if engine.dialect.name == "postgresql":
+            db.execute(text("ANALYZE products"))
+            db.commit()
+        min_id, max_id = db.execute(text("SELECT min(id), max(id) FROM products")).one()
+        return {"min_id": min_id or 0, "max_id": max_id or 0}
+    finally:
+        db.close()
+        engine.dispose()
+
+
+class WebhookStub:
+    """Minimal HTTP server that accepts webhook POSTs and counts them."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.received = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            self.received += 1
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok")
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return f"http://{self.host}:{self.port}/webhook"
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+class LoadRunner:
+    """Drives the API with concurrent clients and records latencies per endpoint."""
+
+    def __init__(self, client: httpx.AsyncClient, id_range: Dict, catalog_size: int, seed: int):
+        self.client = client
+        self.min_id = id_range["min_id"]
+        self.max_id = id_range["max_id"]
+        self.catalog_size = catalog_size
+        self.rng = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.created_ids: List[int] = []
+        self._labels = [label for label, _ in REQUEST_MIX]
+        self._weights = [weight for _, weight in REQUEST_MIX]
+        self._counter = 0
+
+    def _random_id(self) -> int:
+        return self.rng.randint(self.min_id, self.max_id) if self.max_id else 1
+
+    async def _request(self, label: str):
+        rng = self.rng
+        if label == "list_first_page":
+            return await self.client.get("/api/products", params={"page": 1, "per_page": 50})
+        if label == "list_deep_page":
+            deepest = max(self.catalog_size // 50, 1)
+            page = rng.randint(max(deepest // 2, 1), deepest)
+            return await self.client.get("/api/products", params={"page": page, "per_page": 50})
+        if label == "search_sku":
+            return await self.client.get("/api/products", params={"sku": f"{rng.randint(0, 99999):05d}"})
+        if label == "search_name":
+            return await self.client.get("/api/products", params={"name": f"product {rng.randint(1, 9999)}"})
+        if label == "filter_active":
+            return await self.client.get("/api/products", params={"active": "false", "page": rng.randint(1, 20)})
+        if label == "get_product":
+            return await self.client.get(f"/api/products/{self._random_id()}")
+        if label == "create_product":
+            self._counter += 1
+            response = await self.client.post("/api/products", json={
+                "sku": f"LT-{os.getpid()}-{time.time_ns()}-{self._counter}",
+                "name": "Load test product",
+                "description": "Created by the load test",
+            })
+            if response.status_code == 201:
+                self.created_ids.append(response.json()["id"])
+            return response
+        if label == "update_product":
+            return await self.client.put(
+                f"/api/products/{self._random_id()}",
+                json={"name": f"Updated {rng.randint(1, 10 ** 6)}"}
+            )
+        if label == "delete_product":
+            # Only delete products the test created, to keep the catalog size stable
+            if not self.created_ids:
+                return None
+            return await self.client.delete(f"/api/products/{self.created_ids.pop()}")
+        raise ValueError(label)
+
+    async def _client_loop(self, deadline: float):
+        while time.perf_counter() < deadline:
+            label = self.rng.choices(self._labels, self._weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await self._request(label)
+            except httpx.HTTPError:
+                self.errors[label] += 1
+                continue
+            if response is None:
+                continue
+            elapsed = time.perf_counter() - started
+            # 404 on random ids is expected (deleted products), not an error
+            if response.status_code >= 500 or response.status_code in (400, 422):
+                self.errors[label] += 1
+            else:
+                self.latencies[label].append(elapsed)
+
+    async def run(self, concurrency: int, duration: float) -> float:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(self._client_loop(deadline) for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for label, _ in REQUEST_MIX:
+            samples = sorted(self.latencies.get(label, []))
+            if not samples:
+                endpoints[label] = {"requests": 0, "errors": self.errors.get(label, 0)}
+                continue
+            endpoints[label] = {
+                "requests": len(samples),
+                "errors": self.errors.get(label, 0),
+                "throughput_rps": round(len(samples) / elapsed, 1),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p90_ms": round(percentile(samples, 90) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+                "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "total_requests": total,
+            "total_errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 1),
+            "endpoints": endpoints,
+        }
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    index = max(0, min(len(sorted_samples) - 1, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+async def run_load_test(args, id_range: Dict) -> Dict:
+    stub = WebhookStub()
+    stub_url = await stub.start()
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from app.main import app
+        from app.tasks.celery_app import celery_app
+
+        # Deliver webhooks inline so writes reach the stub without a worker
+        celery_app.conf.task_always_eager = True
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60
+        )
+
+    webhook_ids = []
+    try:
+        for event_type in WEBHOOK_EVENTS:
+            response = await client.post("/api/webhooks", json={"url": stub_url, "event_type": event_type})
+            response.raise_for_status()
+            webhook_ids.append(response.json()["id"])
+
+        runner = LoadRunner(client, id_range, args.catalog_size, args.seed)
+        if args.warmup:
+            await runner.run(args.concurrency, args.warmup)
+            runner.latencies.clear()
+            runner.errors.clear()
+        elapsed = await runner.run(args.concurrency, args.duration)
+        report = runner.report(elapsed)
+
+        # Give in-flight deliveries a moment to land
+        await asyncio.sleep(1)
+        report["webhooks_received"] = stub.received
+        return report
+    finally:
+        for webhook_id in webhook_ids:
+            try:
+                await client.delete(f"/api/webhooks/{webhook_id}")
+            except httpx.HTTPError:
+                pass
+        await client.aclose()
+        await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Dedicated load-test database")
+    parser.add_argument("--base-url", help="Load-test a running server instead of the in-process app")
+    parser.add_argument("--catalog-size", type=int, default=100000)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the catalog from a previous run")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    # The in-process app must use the load-test database
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from benchmarks.common import environment_info, save_result
+
+    if args.skip_seed:
+        from sqlalchemy import create_engine, text
+        engine = create_engine(args.database_url)
+        with engine.connect() as conn:
+            min_id, max_id = conn.execute(text("SELECT min(id), max(id) FROM products")).one()
+        engine.dispose()
+        id_range = {"min_id": min_id or 0, "max_id": max_id or 0}
+    else:
+        started = time.perf_counter()
+        id_range = seed_catalog(args.database_url, args.catalog_size)
+        print(f"Seeded {args.catalog_size} products in {time.perf_counter() - started:.1f}s")
+
+    report = asyncio.run(run_load_test(args, id_range))
+    result = {
+        "benchmark": "load_test",
+        "environment": environment_info(),
+        "parameters": {
+            "catalog_size": args.catalog_size,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mode": "remote" if args.base_url else "in-process",
+            "request_mix": dict(REQUEST_MIX),
+        },
+        "results": report,
+    }
+    print(json.dumps(result, indent=2))
+    print(f"Saved to {save_result('load_test', result, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
-"""Initialize database tables."""
-from app.database import engine, Base
-from app.models import Product, Webhook
+"""Initialize database tables by applying all Alembic migrations."""
+from alembic import command
+from alembic.config import Config
 
 if __name__ == "__main__":
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully!")
-
+    print("Applying database migrations...")
+    command.upgrade(Config("alembic.ini"), "head")
+    print("Database is up to date!")
@@ -0,0 +1,71 @@
+"""Initial schema: products and webhooks.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Databases created earlier with ``Base.metadata.create_all`` already have
+these tables; mark them as migrated with ``alembic stamp 0001``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'products',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sku', sa.String(length=255), nullable=False),
+        sa.Column('name', sa.String(length=500), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_products_id', 'products', ['id'])
+    op.create_index('ix_products_sku', 'products', ['sku'], unique=True)
+    op.create_index('ix_products_active', 'products', ['active'])
+    op.create_index('ix_products_sku_lower', 'products', [sa.text('lower(sku)')], unique=True)
+
+    op.create_table(
+        'webhooks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(length=1000), nullable=False),
+        sa.Column(
+            'event_type',
+            sa.Enum(
+                'PRODUCT_CREATED', 'PRODUCT_UPDATED', 'PRODUCT_DELETED', 'IMPORT_COMPLETED',
+                name='webhookeventtype'
+            ),
+            nullable=False
+        ),
+        sa.Column('enabled', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_webhooks_id', 'webhooks', ['id'])
+    op.create_index('ix_webhooks_event_type', 'webhooks', ['event_type'])
+    op.create_index('ix_webhooks_enabled', 'webhooks', ['enabled'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhooks_enabled', table_name='webhooks')
+    op.drop_index('ix_webhooks_event_type', table_name='webhooks')
+    op.drop_index('ix_webhooks_id', table_name='webhooks')
+    op.drop_table('webhooks')
+    sa.Enum(name='webhookeventtype').drop(op.get_bind(), checkfirst=True)
+
+    op.drop_index('ix_products_sku_lower', table_name='products')
+    op.drop_index('ix_products_active', table_name='products')
+    op.drop_index('ix_products_sku', table_name='products')
+    op.drop_index('ix_products_id', table_name='products')
+    op.drop_table('products')
@@ -0,0 +1,25 @@
+"""Client of each import, for per-client upload quotas.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('client_id', sa.String(length=255), nullable=True))
+    op.create_index('ix_import_jobs_client_id', 'import_jobs', ['client_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_import_jobs_client_id', table_name='import_jobs')
+    op.drop_column('import_jobs', 'client_id')
@@ -0,0 +1,69 @@
+"""Import feeds and the SKUs each feed owns.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'import_feeds',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column(
+            'missing_action',
+            sa.Enum('DEACTIVATE', 'DELETE', name='feedmissingaction'),
+            nullable=False
+        ),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_import_feeds_id', 'import_feeds', ['id'])
+    op.create_index('ix_import_feeds_name', 'import_feeds', ['name'], unique=True)
+
+    op.create_table(
+        'feed_skus',
+        sa.Column('feed_id', sa.Integer(), nullable=False),
+        sa.Column('sku_lower', sa.String(length=255), nullable=False),
+        sa.Column('last_seen_task', sa.String(length=36), nullable=False),
+        sa.ForeignKeyConstraint(['feed_id'], ['import_feeds.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('feed_id', 'sku_lower'),
+    )
+    op.create_index('ix_feed_skus_sku_lower', 'feed_skus', ['sku_lower'])
+
+    op.add_column('import_jobs', sa.Column('feed_id', sa.Integer(), nullable=True))
+    op.add_column(
+        'import_jobs',
+        sa.Column('removed_count', sa.Integer(), server_default='0', nullable=False)
+    )
+    op.create_foreign_key(
+        'fk_import_jobs_feed_id', 'import_jobs', 'import_feeds', ['feed_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index('ix_import_jobs_feed_id', 'import_jobs', ['feed_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_import_jobs_feed_id', table_name='import_jobs')
+    op.drop_constraint('fk_import_jobs_feed_id', 'import_jobs', type_='foreignkey')
+    op.drop_column('import_jobs', 'removed_count')
+    op.drop_column('import_jobs', 'feed_id')
+
+    op.drop_index('ix_feed_skus_sku_lower', table_name='feed_skus')
+    op.drop_table('feed_skus')
+
+    op.drop_index('ix_import_feeds_name', table_name='import_feeds')
+    op.drop_index('ix_import_feeds_id', table_name='import_feeds')
+    op.drop_table('import_feeds')
+    sa.Enum(name='feedmissingaction').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,23 @@
+"""Detected format of each import file.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('file_format', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'file_format')
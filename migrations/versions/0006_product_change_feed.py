@@ -0,0 +1,87 @@
+"""Product change feed: change positions stamped by triggers and delete tombstones.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE product_change_seq")
+
+    op.add_column('products', sa.Column('change_txid', sa.BigInteger(), nullable=True))
+    op.add_column('products', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+    # Existing products form the first batch of the feed
+    op.execute("UPDATE products SET change_txid = txid_current(), change_seq = nextval('product_change_seq')")
+    op.alter_column('products', 'change_txid', nullable=False)
+    op.alter_column('products', 'change_seq', nullable=False)
+    op.create_index('ix_products_change', 'products', ['change_txid', 'change_seq'])
+
+    op.execute("""
+        CREATE FUNCTION products_stamp_change() RETURNS trigger AS $$
+        BEGIN
+            NEW.change_txid := txid_current();
+            NEW.change_seq := nextval('product_change_seq');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER products_stamp_change
+        BEFORE INSERT OR UPDATE ON products
+        FOR EACH ROW EXECUTE PROCEDURE products_stamp_change()
+    """)
+
+    op.create_table(
+        'product_tombstones',
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('change_txid', sa.BigInteger(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('sku', sa.String(length=255), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('change_seq'),
+    )
+    op.create_index('ix_product_tombstones_change', 'product_tombstones', ['change_txid', 'change_seq'])
+    op.create_index('ix_product_tombstones_deleted_at', 'product_tombstones', ['deleted_at'])
+
+    # One statement-level trigger per DELETE, so bulk deletes insert their
+    # tombstones in a single INSERT ... SELECT
+    op.execute("""
+        CREATE FUNCTION products_record_tombstones() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO product_tombstones (change_seq, change_txid, product_id, sku)
+            SELECT nextval('product_change_seq'), txid_current(), id, sku FROM deleted_products;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER products_record_tombstones
+        AFTER DELETE ON products
+        REFERENCING OLD TABLE AS deleted_products
+        FOR EACH STATEMENT EXECUTE PROCEDURE products_record_tombstones()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER products_record_tombstones ON products")
+    op.execute("DROP FUNCTION products_record_tombstones()")
+    op.drop_index('ix_product_tombstones_deleted_at', table_name='product_tombstones')
+    op.drop_index('ix_product_tombstones_change', table_name='product_tombstones')
+    op.drop_table('product_tombstones')
+
+    op.execute("DROP TRIGGER products_stamp_change ON products")
+    op.execute("DROP FUNCTION products_stamp_change()")
+    op.drop_index('ix_products_change', table_name='products')
+    op.drop_column('products', 'change_seq')
+    op.drop_column('products', 'change_txid')
+    op.execute("DROP SEQUENCE product_change_seq")
@@ -0,0 +1,59 @@
+"""Catalog generation: product writes counted by statement-level triggers (list ETags).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'catalog_generation',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('generation', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'catalog_generation_bumps',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute("INSERT INTO catalog_generation (id, generation) VALUES (1, 1)")
+    
+    # Triggers append one row per statement that changed products instead of
+    # updating the generation row, so concurrent writers never wait on each
+    # other for it. One function serves all three events: each trigger names
+    # its transition table changed_products
+    op.execute("""
+        CREATE FUNCTION catalog_generation_bump() RETURNS trigger AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM changed_products) THEN
+                INSERT INTO catalog_generation_bumps DEFAULT VALUES;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for event, transition in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+        op.execute(f"""
+            CREATE TRIGGER catalog_generation_after_{event} AFTER {event.upper()} ON products
+            REFERENCING {transition} TABLE AS changed_products
+            FOR EACH STATEMENT EXECUTE PROCEDURE catalog_generation_bump()
+        """)
+
+
+def downgrade() -> None:
+    for event in ('insert', 'update', 'delete'):
+        op.execute(f"DROP TRIGGER catalog_generation_after_{event} ON products")
+    op.execute("DROP FUNCTION catalog_generation_bump()")
+    op.drop_table('catalog_generation_bumps')
+    op.drop_table('catalog_generation')
@@ -0,0 +1,101 @@
+"""Catalog statistics: product counts kept up to date by statement-level triggers.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'catalog_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.BigInteger(), nullable=False),
+        sa.Column('active', sa.BigInteger(), nullable=False),
+        sa.Column('compacted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'catalog_stats_deltas',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('total_delta', sa.BigInteger(), nullable=False),
+        sa.Column('active_delta', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+    # Triggers append one delta row per statement instead of updating the
+    # counts row, so concurrent imports never wait on each other for it.
+    # Transition tables allow a single event per trigger.
+    op.execute("""
+        CREATE FUNCTION catalog_stats_after_insert() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO catalog_stats_deltas (total_delta, active_delta)
+            SELECT count(*), count(*) FILTER (WHERE active) FROM new_products HAVING count(*) > 0;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION catalog_stats_after_update() RETURNS trigger AS $$
+        DECLARE
+            delta bigint;
+        BEGIN
+            SELECT (SELECT count(*) FILTER (WHERE active) FROM new_products)
+                 - (SELECT count(*) FILTER (WHERE active) FROM old_products)
+            INTO delta;
+            IF delta <> 0 THEN
+                INSERT INTO catalog_stats_deltas (total_delta, active_delta) VALUES (0, delta);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION catalog_stats_after_delete() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO catalog_stats_deltas (total_delta, active_delta)
+            SELECT -count(*), -count(*) FILTER (WHERE active) FROM old_products HAVING count(*) > 0;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER catalog_stats_after_insert AFTER INSERT ON products
+        REFERENCING NEW TABLE AS new_products
+        FOR EACH STATEMENT EXECUTE PROCEDURE catalog_stats_after_insert()
+    """)
+    op.execute("""
+        CREATE TRIGGER catalog_stats_after_update AFTER UPDATE ON products
+        REFERENCING OLD TABLE AS old_products NEW TABLE AS new_products
+        FOR EACH STATEMENT EXECUTE PROCEDURE catalog_stats_after_update()
+    """)
+    op.execute("""
+        CREATE TRIGGER catalog_stats_after_delete AFTER DELETE ON products
+        REFERENCING OLD TABLE AS old_products
+        FOR EACH STATEMENT EXECUTE PROCEDURE catalog_stats_after_delete()
+    """)
+
+    # Counts of the existing catalog (the table is locked by the triggers' DDL above)
+    op.execute("""
+        INSERT INTO catalog_stats (id, total, active, compacted_at, reconciled_at)
+        SELECT 1, count(*), count(*) FILTER (WHERE active), now(), now() FROM products
+    """)
+
+
+def downgrade() -> None:
+    for event in ('insert', 'update', 'delete'):
+        op.execute(f"DROP TRIGGER catalog_stats_after_{event} ON products")
+        op.execute(f"DROP FUNCTION catalog_stats_after_{event}()")
+    op.drop_table('catalog_stats_deltas')
+    op.drop_table('catalog_stats')
@@ -0,0 +1,25 @@
+"""Batch of each import claimed from the ingest directory.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('batch_id', sa.String(length=36), nullable=True))
+    op.create_index('ix_import_jobs_batch_id', 'import_jobs', ['batch_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_import_jobs_batch_id', table_name='import_jobs')
+    op.drop_column('import_jobs', 'batch_id')
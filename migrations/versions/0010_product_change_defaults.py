@@ -0,0 +1,27 @@
+"""Default change_txid/change_seq to 0 where the stamping trigger does not run.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # products_stamp_change overwrites the defaults; they match the model,
+    # which relies on them wherever the trigger is missing
+    op.alter_column('products', 'change_txid', server_default=sa.text('0'))
+    op.alter_column('products', 'change_seq', server_default=sa.text('0'))
+
+
+def downgrade() -> None:
+    op.alter_column('products', 'change_seq', server_default=None)
+    op.alter_column('products', 'change_txid', server_default=None)
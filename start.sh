@@ -1,12 +1,25 @@
 #!/bin/bash
-# Start both web server and Celery worker in the same process
+# Start web server and Celery workers in the same process
 
-# Start Celery worker in the background
-celery -A app.tasks.celery_app.celery_app worker --loglevel=info --concurrency=2 &
-CELERY_PID=$!
+# Apply schema migrations once, before any worker starts
+alembic upgrade head || exit 1
+
+# Bulk imports get their own worker so they never occupy the slots that
+# small imports, webhook deliveries and maintenance jobs need
+celery -A app.tasks.celery_app.celery_app worker --loglevel=info \
+    -Q imports.bulk -n bulk@%h --concurrency=${CELERY_BULK_CONCURRENCY:-1} &
+BULK_PID=$!
+
+celery -A app.tasks.celery_app.celery_app worker --loglevel=info \
+    -Q imports.small,webhooks,maintenance -n fast@%h --concurrency=${CELERY_FAST_CONCURRENCY:-2} &
+FAST_PID=$!
+
+# Schedules maintenance jobs (tombstone pruning, catalog stats); exactly one beat per deployment
+celery -A app.tasks.celery_app.celery_app beat --loglevel=info &
+BEAT_PID=$!
 
 # Start web server in the foreground
 uvicorn app.main:app --host 0.0.0.0 --port $PORT
 
-# If web server exits, kill Celery worker
-kill $CELERY_PID 2>/dev/null
+# If web server exits, kill Celery workers
+kill $BULK_PID $FAST_PID $BEAT_PID 2>/dev/null